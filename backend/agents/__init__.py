@@ -1,13 +1,22 @@
-from .base_agent import BaseAgent
-from .bull_agent import bull_agent, BullAgent
-from .bear_agent import bear_agent, BearAgent
-from .risk_manager import risk_manager, RiskManager
-from .debate_engine import debate_engine, DebateEngine
-
-__all__ = [
-    "BaseAgent",
-    "bull_agent", "BullAgent",
-    "bear_agent", "BearAgent",
-    "risk_manager", "RiskManager",
-    "debate_engine", "DebateEngine"
-]
+"""
+Agents package - exports load on first attribute access (PEP 562)
+so importing one agent doesn't pull in the rest. Singletons come from
+their providers (get_bull_agent() etc.) or their own modules.
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    "BaseAgent": "base_agent",
+    "BullAgent": "bull_agent", "get_bull_agent": "bull_agent",
+    "BearAgent": "bear_agent", "get_bear_agent": "bear_agent",
+    "RiskManager": "risk_manager", "get_risk_manager": "risk_manager",
+    "DebateEngine": "debate_engine",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,13 +3,81 @@ Base agent class for all AI agents
 Uses AWS Bedrock for LLM inference
 """
 import json
+import os
 import re
-import boto3
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
 from config.settings import settings
 from data.data_models import MarketData, DebateMessage
+from agents.bedrock_pool import bedrock_pool
+from agents.conversation_memory import ConversationMemory
+
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# Bedrock prompt caching: everything up to a block marked with this is a cacheable prefix
+CACHE_POINT = {"type": "ephemeral"}
+
+# Market context of the debate cycle running in this task: (symbol, text). Sent once as a
+# shared system block so Bull, Bear and Risk Manager hit the same cached prefix.
+cycle_context: ContextVar[Optional[Tuple[str, str]]] = ContextVar("cycle_context", default=None)
+
+
+@lru_cache(maxsize=None)
+def load_prompt(filename: str) -> Optional[str]:
+    """Read a system prompt once per process (None if the file is missing)"""
+    try:
+        with open(os.path.join(PROMPTS_DIR, filename), "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def begin_cycle(market_data: MarketData, signals: list) -> Token:
+    """Share this cycle's market data and signals with every agent called from this task"""
+    text = f"{format_market_context(market_data)}\n{format_signals(signals)}"
+    return cycle_context.set((market_data.symbol, text))
+
+
+def end_cycle(token: Token):
+    cycle_context.reset(token)
+
+
+def format_market_context(market_data: MarketData) -> str:
+    """Format market data for LLM context"""
+    ticker = market_data.ticker
+    orderbook = market_data.orderbook
+    
+    context = f"""
+CURRENT MARKET DATA for {market_data.symbol}:
+- Current Price: ${ticker.last_price:,.2f}
+- 24h Change: {ticker.change_pct_24h:+.2f}%
+- 24h High: ${ticker.high_24h:,.2f}
+- 24h Low: ${ticker.low_24h:,.2f}
+- 24h Volume: ${ticker.volume_24h:,.0f}
+- Bid: ${ticker.bid:,.2f} | Ask: ${ticker.ask:,.2f}
+- Spread: {orderbook.spread_pct:.4f}%
+- Funding Rate: {market_data.funding_rate * 100:.4f}%
+
+ORDER BOOK DEPTH:
+- Top 3 Bids: {', '.join([f'${b.price:,.0f} ({b.quantity:.2f})' for b in orderbook.bids[:3]])}
+- Top 3 Asks: {', '.join([f'${a.price:,.0f} ({a.quantity:.2f})' for a in orderbook.asks[:3]])}
+"""
+    return context
+
+
+def format_signals(signals: list) -> str:
+    """Format technical signals for LLM context"""
+    if not signals:
+        return "No signals available."
+    
+    lines = ["TECHNICAL SIGNALS:"]
+    for signal in signals:
+        lines.append(f"- {signal.name}: {signal.value:.2f} ({signal.signal.value}) - {signal.description}")
+    return "\n".join(lines)
 
 
 class BaseAgent(ABC):
@@ -18,23 +86,23 @@ class BaseAgent(ABC):
     def __init__(self, name: str, emoji: str, prompt_file: str):
         self.name = name
         self.emoji = emoji
-        self.bedrock_client = boto3.client(
-            'bedrock-runtime',
-            region_name=settings.aws_region,
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key
-        )
         self.model_id = settings.bedrock_model_id
         self.system_prompt = self._load_prompt(prompt_file)
-        self.message_history = []
+        self.memory = ConversationMemory()
         
+    @property
+    def message_history(self) -> list:
+        """Recent turns kept verbatim (older ones live in the memory's summary)"""
+        return self.memory.messages
+    
+    @property
+    def bedrock_client(self):
+        """Bedrock runtime client, shared by all agents"""
+        return bedrock_pool.client
+    
     def _load_prompt(self, filename: str) -> str:
         """Load system prompt from file"""
-        try:
-            with open(f"agents/prompts/{filename}", "r") as f:
-                return f.read()
-        except FileNotFoundError:
-            return f"You are the {self.name} agent."
+        return load_prompt(filename) or f"You are the {self.name} agent."
     
     def _extract_json(self, text: str) -> Optional[dict]:
         """Extract JSON from LLM response"""
@@ -63,77 +131,67 @@ class BaseAgent(ABC):
         return None
     
     def _format_market_context(self, market_data: MarketData) -> str:
-        """Format market data for LLM context"""
-        ticker = market_data.ticker
-        orderbook = market_data.orderbook
-        
-        context = f"""
-CURRENT MARKET DATA for {market_data.symbol}:
-- Current Price: ${ticker.last_price:,.2f}
-- 24h Change: {ticker.change_pct_24h:+.2f}%
-- 24h High: ${ticker.high_24h:,.2f}
-- 24h Low: ${ticker.low_24h:,.2f}
-- 24h Volume: ${ticker.volume_24h:,.0f}
-- Bid: ${ticker.bid:,.2f} | Ask: ${ticker.ask:,.2f}
-- Spread: {orderbook.spread_pct:.4f}%
-- Funding Rate: {market_data.funding_rate * 100:.4f}%
-
-ORDER BOOK DEPTH:
-- Top 3 Bids: {', '.join([f'${b.price:,.0f} ({b.quantity:.2f})' for b in orderbook.bids[:3]])}
-- Top 3 Asks: {', '.join([f'${a.price:,.0f} ({a.quantity:.2f})' for a in orderbook.asks[:3]])}
-"""
-        return context
+        """Format market data for LLM context (a pointer if the cycle context already has it)"""
+        shared = cycle_context.get()
+        if shared and shared[0] == market_data.symbol:
+            return f"Market data for {market_data.symbol}: see CURRENT MARKET DATA in the system prompt."
+        return format_market_context(market_data)
     
     def _format_signals(self, signals: list) -> str:
         """Format technical signals for LLM context"""
-        if not signals:
-            return "No signals available."
+        if cycle_context.get():
+            return "Technical signals: see TECHNICAL SIGNALS in the system prompt."
+        return format_signals(signals)
+    
+    def _system(self, cached: bool) -> Union[str, List[dict]]:
+        """
+        System prompt, with the cycle context in front when a debate is running.
+        Cached form: shared context first (same prefix for every agent this cycle),
+        then this agent's static prompt, each ending a cacheable prefix.
+        """
+        shared = cycle_context.get()
+        if not cached:
+            return f"{shared[1]}\n\n{self.system_prompt}" if shared else self.system_prompt
         
-        lines = ["TECHNICAL SIGNALS:"]
-        for signal in signals:
-            lines.append(f"- {signal.name}: {signal.value:.2f} ({signal.signal.value}) - {signal.description}")
-        return "\n".join(lines)
+        blocks = []
+        if shared:
+            blocks.append({"type": "text", "text": shared[1], "cache_control": CACHE_POINT})
+        blocks.append({"type": "text", "text": self.system_prompt, "cache_control": CACHE_POINT})
+        return blocks
+    
+    def _request_body(self, messages: list, cached: bool) -> str:
+        return json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1000,
+            "system": self._system(cached),
+            "messages": messages,
+            "temperature": 0.7
+        })
     
     async def _call_llm(self, user_message: str) -> str:
         """Make LLM API call via AWS Bedrock"""
         
         try:
-            # Build messages array
-            messages = [
-                *self.message_history,
-                {"role": "user", "content": user_message}
-            ]
-            
-            # Prepare the request body for Claude
-            body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "system": self.system_prompt,
-                "messages": messages,
-                "temperature": 0.7
-            })
+            # Build messages array (history trimmed to the token budget)
+            messages, estimated_tokens = self.memory.build(user_message, self._system(cached=False))
+            cached = bedrock_pool.prompt_caching
             
             print(f"[{self.name}] Calling Bedrock model: {self.model_id}")
             
-            # Invoke Bedrock
-            response = self.bedrock_client.invoke_model(
-                modelId=self.model_id,
-                body=body,
-                contentType="application/json",
-                accept="application/json"
-            )
-            
-            # Parse response
-            response_body = json.loads(response['body'].read())
+            # Invoke Bedrock (off the event loop, on the shared client)
+            try:
+                response_body = await bedrock_pool.invoke_model(self.model_id, self._request_body(messages, cached))
+            except Exception as e:
+                if not (cached and "ValidationException" in str(e)):
+                    raise
+                # Model may not support prompt caching - retry plain, and stop caching if that works
+                response_body = await bedrock_pool.invoke_model(self.model_id, self._request_body(messages, False))
+                bedrock_pool.disable_prompt_caching(f"{self.model_id} rejected cache_control ({e})")
             assistant_message = response_body['content'][0]['text']
+            self.memory.record_call(estimated_tokens, response_body.get("usage"))
             
             # Add to history for context
-            self.message_history.append({"role": "user", "content": user_message})
-            self.message_history.append({"role": "assistant", "content": assistant_message})
-            
-            # Keep history manageable
-            if len(self.message_history) > 10:
-                self.message_history = self.message_history[-10:]
+            self.memory.add_turn(user_message, assistant_message)
             
             return assistant_message
             
@@ -178,4 +236,4 @@ ORDER BOOK DEPTH:
     
     def clear_history(self):
         """Clear conversation history"""
-        self.message_history = []
+        self.memory.clear()
@@ -1,6 +1,7 @@
 """
 Bear Agent - Risk-focused skeptic and short opportunity finder
 """
+from functools import lru_cache
 from agents.base_agent import BaseAgent
 from data.data_models import MarketData, DebateMessage
 
@@ -123,5 +124,13 @@ Be specific about your concerns or support.
             return f" {reasoning}"
 
 
-# Singleton instance
-bear_agent = BearAgent()
+# Singleton, built on first use (keeps imports cheap)
+@lru_cache(maxsize=None)
+def get_bear_agent() -> BearAgent:
+    return BearAgent()
+
+
+def __getattr__(attr: str):
+    if attr == "bear_agent":
+        return get_bear_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
@@ -0,0 +1,130 @@
+"""
+Bedrock Pool - One process-wide Bedrock runtime client shared by every agent
+Tuned connection pool and retries; blocking calls run off the event loop
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from config.settings import settings
+
+
+class BedrockPool:
+    """
+    Shared bedrock-runtime client.
+
+    boto3 clients are thread-safe, so one client (and its urllib3 connection
+    pool) serves all agents. invoke_model is blocking, so calls run in worker
+    threads; a semaphore sized to the connection pool keeps callers from
+    queueing inside urllib3 where they'd hold a thread while waiting.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = settings.bedrock_max_connections,
+        max_attempts: int = settings.bedrock_max_attempts,
+        read_timeout: float = settings.bedrock_read_timeout_seconds
+    ):
+        self.max_connections = max_connections
+        self.max_attempts = max_attempts
+        self.read_timeout = read_timeout
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self.calls = 0
+        self.errors = 0
+
+        # Prompt caching - switched off for the process if the model rejects cache_control
+        self.prompt_caching = settings.bedrock_prompt_caching
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+
+    @property
+    def client(self):
+        """The shared client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    self._client = boto3.client(
+                        'bedrock-runtime',
+                        region_name=settings.aws_region,
+                        aws_access_key_id=settings.aws_access_key_id,
+                        aws_secret_access_key=settings.aws_secret_access_key,
+                        config=Config(
+                            max_pool_connections=self.max_connections,
+                            retries={"max_attempts": self.max_attempts, "mode": "adaptive"},
+                            connect_timeout=5,
+                            read_timeout=self.read_timeout,
+                            tcp_keepalive=True
+                        )
+                    )
+        return self._client
+
+    def _invoke_sync(self, model_id: str, body: str) -> Dict[str, Any]:
+        response = self.client.invoke_model(
+            modelId=model_id,
+            body=body,
+            contentType="application/json",
+            accept="application/json"
+        )
+        # Reading the streaming body is blocking too, so it stays on the worker thread
+        return json.loads(response['body'].read())
+
+    async def invoke_model(self, model_id: str, body: str) -> Dict[str, Any]:
+        """Invoke a model without blocking the event loop. Returns the parsed response body."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        async with self._semaphore:
+            started = time.monotonic()
+            self.calls += 1
+            try:
+                response_body = await asyncio.to_thread(self._invoke_sync, model_id, body)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self._latencies.append((time.monotonic() - started) * 1000)
+
+        self._record_usage(response_body.get("usage") or {})
+        return response_body
+
+    def _record_usage(self, usage: Dict[str, Any]):
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.output_tokens += usage.get("output_tokens", 0)
+        self.cache_read_tokens += usage.get("cache_read_input_tokens", 0)
+        self.cache_write_tokens += usage.get("cache_creation_input_tokens", 0)
+
+    def disable_prompt_caching(self, reason: str):
+        if self.prompt_caching:
+            self.prompt_caching = False
+            print(f"Bedrock prompt caching disabled: {reason}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        prompt_tokens = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "max_connections": self.max_connections,
+            "avg_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+            "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] if ordered else 0.0,
+            "prompt_caching": self.prompt_caching,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_input_tokens": self.cache_read_tokens,
+            "cache_write_input_tokens": self.cache_write_tokens,
+            "cache_hit_ratio": self.cache_read_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+
+
+# Singleton instance
+bedrock_pool = BedrockPool()
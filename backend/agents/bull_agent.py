@@ -1,16 +1,24 @@
 """
 Bull Agent - Evolution: Zero-Knowledge Alpha Predator
 """
+from functools import lru_cache
 from typing import Optional
 import logging
 import asyncio
 from agents.base_agent import BaseAgent
 from data.data_models import MarketData, DebateMessage, TradeAction
-from tools.analyst_network import analyst_tool
+from tools.analyst_network import analyst_tool, weighted_consensus
 from execution.bite_manager import bite_manager
 
 logger = logging.getLogger(__name__)
 
+# Sealed entry tranches: (amount_usdc, release condition). The network only
+# decrypts a tranche if confidence remains at its threshold.
+ENTRY_TRANCHES = [
+    (500, "CONFIDENCE > 0.8"),
+    (500, "CONFIDENCE > 0.9"),
+]
+
 class BullAgent(BaseAgent):
     """
     The Bull Agent looks for LONG opportunities.
@@ -54,41 +62,62 @@ We will use paid analysts to confirm.
             
             # --- AGENTIC COMMERCE (x402) ---
             # Pay 3 separate agents for distinct viewpoints
-            insights = await analyst_tool.gather_consensus("Building Consensus for BITE Execution")
+            insights = await analyst_tool.gather_consensus(
+                "Building Consensus for BITE Execution",
+                symbol=market_data.symbol
+            )
             
-            tech_score = insights['technical'].get('score', 0.5)
-            sent_score = insights['sentiment'].get('score', 0.5)
-            chain_score = insights['onchain'].get('score', 0.5)
+            tech_score = insights['technical'].get('score')
+            sent_score = insights['sentiment'].get('score')
+            chain_score = insights['onchain'].get('score')
             
             # Weighted Consensus Calculation
-            # Technical (30%), Sentiment (20%), On-Chain (50%)
-            consensus_score = (tech_score * 0.3) + (sent_score * 0.2) + (chain_score * 0.5)
+            # Technical (30%), Sentiment (20%), On-Chain (50%), reweighted over the analysts that answered
+            consensus_score = weighted_consensus(insights)
+            if consensus_score is None:
+                logger.warning("No analysts answered in time. Falling back to neutral consensus.")
+                consensus_score = 0.5
             
             logger.info(f"Consensus Reached: {consensus_score:.2f} (Tech: {tech_score}, Sent: {sent_score}, Chain: {chain_score})")
             
             result["consensus_score"] = consensus_score
             result["analyst_insights"] = insights
             
+            # A new consensus score may unlock previously sealed intents
+            released = bite_manager.evaluate_pending({"consensus_score": consensus_score})
+            if released:
+                result["bite_executed"] = released
+            
             # 3. Encrypted Execution (BITE v2)
             if consensus_score > 0.75:
                 # We have high conviction from the swarm.
-                # Prepare the "Sealed Strategy"
+                # Prepare the "Sealed Strategy": a scaled entry, each tranche
+                # only decrypted if confidence holds at (or climbs to) its threshold
                 
-                intent = {
-                    "action": "BUY",
-                    "asset": market_data.symbol,
-                    "amount_usdc": 1000,
-                    "rationale": f"Consensus {consensus_score:.2f} > 0.75. Whale accumulation confirmed."
-                }
-                
-                condition = "CONFIDENCE > 0.8" # The network will only decrypt if confidence remains high
+                items = [
+                    (
+                        {
+                            "action": "BUY",
+                            "asset": market_data.symbol,
+                            "amount_usdc": amount,
+                            "tranche": i + 1,
+                            "rationale": f"Consensus {consensus_score:.2f} > 0.75. Whale accumulation confirmed."
+                        },
+                        condition
+                    )
+                    for i, (amount, condition) in enumerate(ENTRY_TRANCHES)
+                ]
                 
                 # --- ENCRYPTION (BITE) ---
-                bite_tx = await bite_manager.encrypt_intent(intent, condition)
+                # All of this cycle's intents go to the bridge in one call
+                bite_txs = await bite_manager.encrypt_intents(items)
                 
                 result["action"] = "PROPOSE_ENCRYPTED_EXECUTION"
-                result["bite_tx"] = bite_tx
-                result["note"] = f"Strategy Encrypted with BITE v2. TxID: {bite_tx['bite_tx_id']}"
+                result["bite_tx"] = bite_txs[0]
+                result["bite_txs"] = bite_txs
+                result["note"] = (
+                    f"Strategy Encrypted with BITE v2. TxIDs: {', '.join(tx['bite_tx_id'] for tx in bite_txs)}"
+                )
                 result["confidence"] = consensus_score
                 
             else:
@@ -109,20 +138,37 @@ We will use paid analysts to confirm.
         """Format analysis into readable message for UI"""
         action = analysis.get("action", "HOLD")
         confidence = analysis.get("confidence", 0.5)
-        bite_tx = analysis.get("bite_tx", {})
+        bite_txs = analysis.get("bite_txs") or [analysis.get("bite_tx", {})]
+        sealed = "".join(
+            f"TxID: `{tx.get('bite_tx_id', 'N/A')}` | Condition: `{tx.get('condition', 'N/A')}`\n"
+            for tx in bite_txs
+        )
+        
+        # Earlier sealed intents whose condition this consensus satisfied
+        released = "".join(
+            f"\nDecrypted & executed: `{tx['bite_tx_id']}`" for tx in analysis.get("bite_executed", [])
+        )
         
         if action == "PROPOSE_ENCRYPTED_EXECUTION":
             return (
                 f" **ZERO-KNOWLEDGE EXECUTION DETECTED**\n"
                 f"Consensus Score: {confidence*100:.0f}%\n"
                 f"Strategy: **ENCRYPTED** (BITE v2)\n"
-                f"TxID: `{bite_tx.get('bite_tx_id', 'N/A')}`\n"
-                f"Condition: `{bite_tx.get('condition', 'N/A')}`\n\n"
+                f"{sealed}\n"
                 f"Waiting for network decryption..."
+                f"{released}"
             )
         else:
-            return f" **HOLDING** - Consensus {confidence:.2f} insufficient."
+            return f" **HOLDING** - Consensus {confidence:.2f} insufficient.{released}"
+
+
+# Singleton, built on first use (keeps imports cheap)
+@lru_cache(maxsize=None)
+def get_bull_agent() -> BullAgent:
+    return BullAgent()
 
 
-# Singleton instance
-bull_agent = BullAgent()
+def __getattr__(attr: str):
+    if attr == "bull_agent":
+        return get_bull_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
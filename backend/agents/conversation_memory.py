@@ -0,0 +1,205 @@
+"""
+Conversation Memory - Token-budgeted message history for the LLM agents
+Older turns fold into a rolling summary; stale market snapshots are stripped
+"""
+import math
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from config.settings import settings
+
+
+# Starting estimate for English/JSON prompts; corrected from the input_tokens Bedrock reports
+CHARS_PER_TOKEN = 4.0
+
+# Blocks from base_agent.format_market_context / format_signals. Only the newest
+# message needs them - in stored turns they're replaced with a short marker.
+STALE_BLOCKS = [
+    (
+        re.compile(r"CURRENT MARKET DATA for (\S+):\n(?:- [^\n]*\n?)*\s*(?:ORDER BOOK DEPTH:\n(?:- [^\n]*\n?)*)?"),
+        r"[earlier market snapshot for \1 omitted]\n"
+    ),
+    (re.compile(r"TECHNICAL SIGNALS:\n(?:- [^\n]*\n?)*"), "[earlier technical signals omitted]\n"),
+]
+
+ACTION_FIELD = re.compile(r'"(?:action|decision)"\s*:\s*"([^"]+)"')
+CONFIDENCE_FIELD = re.compile(r'"confidence"\s*:\s*([0-9.]+)')
+REASONING_FIELD = re.compile(r'"reasoning"\s*:\s*"([^"]*)')
+
+SUMMARY_PREFIX = "Summary of our earlier exchanges (oldest first):\n"
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class ConversationMemory:
+    """
+    Message history for one agent, kept under a token budget.
+
+    Each stored turn is a (user, assistant) pair with its token count. When a
+    turn is stored, the market-data and signal blocks in the user message are
+    replaced with markers, since the next call always carries a fresh
+    snapshot. Turns beyond `max_turns`, or that push history plus the new
+    message past `token_budget`, are folded into a rolling summary of one line
+    per turn (what was asked, what was decided), itself capped at
+    `summary_tokens`. The summary is sent as the first user/assistant pair so
+    messages keep alternating.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = settings.agent_memory_token_budget,
+        max_turns: int = settings.agent_memory_max_turns,
+        summary_tokens: int = settings.agent_memory_summary_tokens
+    ):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.chars_per_token = CHARS_PER_TOKEN
+        self._turns: Deque[Tuple[Dict[str, Any], Dict[str, Any]]] = deque()
+        self._summary: Deque[Tuple[str, int]] = deque()
+
+        # Metrics
+        self.calls = 0
+        self.prompt_tokens_total = 0
+        self.output_tokens_total = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.last_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.turns_summarised = 0
+        self.blocks_stripped = 0
+        self.tokens_stripped = 0
+
+    def count_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def _message(self, role: str, content: str) -> Dict[str, Any]:
+        return {"role": role, "content": content, "tokens": self.count_tokens(content)}
+
+    @property
+    def history_tokens(self) -> int:
+        summary = sum(tokens for _, tokens in self._summary)
+        return summary + sum(user["tokens"] + reply["tokens"] for user, reply in self._turns)
+
+    # ==================== Building Prompts ====================
+
+    def build(self, user_message: str, system: str = "") -> Tuple[List[Dict[str, str]], int]:
+        """
+        Messages to send for a new user message, plus the estimated prompt tokens
+        (system prompt included). Folds old turns first if the budget requires it.
+        """
+        new_tokens = self.count_tokens(user_message)
+        while self._turns and self.history_tokens + new_tokens > self.token_budget:
+            self._fold_oldest()
+
+        messages = []
+        if self._summary:
+            messages.append({"role": "user", "content": SUMMARY_PREFIX + "\n".join(line for line, _ in self._summary)})
+            messages.append({"role": "assistant", "content": "Noted."})
+        for user, reply in self._turns:
+            messages.append({"role": "user", "content": user["content"]})
+            messages.append({"role": "assistant", "content": reply["content"]})
+        messages.append({"role": "user", "content": user_message})
+
+        estimated = self.count_tokens(system) + sum(self.count_tokens(m["content"]) for m in messages)
+        return messages, estimated
+
+    def add_turn(self, user_message: str, assistant_message: str):
+        """Store a completed exchange (with its market snapshot stripped)"""
+        stripped = user_message
+        for pattern, marker in STALE_BLOCKS:
+            stripped, count = pattern.subn(marker, stripped)
+            self.blocks_stripped += count
+        self.tokens_stripped += self.count_tokens(user_message) - self.count_tokens(stripped)
+
+        self._turns.append((self._message("user", stripped.strip()), self._message("assistant", assistant_message)))
+        while len(self._turns) > self.max_turns:
+            self._fold_oldest()
+
+    # ==================== Summarisation ====================
+
+    def _fold_oldest(self):
+        user, reply = self._turns.popleft()
+        line = self._summarise(user["content"], reply["content"])
+        self._summary.append((line, self.count_tokens(line) + 1))
+        self.turns_summarised += 1
+
+        while len(self._summary) > 1 and sum(tokens for _, tokens in self._summary) > self.summary_tokens:
+            self._summary.popleft()
+
+    @staticmethod
+    def _summarise(user: str, reply: str) -> str:
+        """One line per turn: the request and the answer's decision fields"""
+        asked = next(
+            (line for line in user.splitlines() if line.strip() and not line.startswith("[earlier")),
+            "(market update)"
+        )
+
+        action = ACTION_FIELD.search(reply)
+        if action:
+            confidence = CONFIDENCE_FIELD.search(reply)
+            reasoning = REASONING_FIELD.search(reply)
+            answer = action.group(1)
+            if confidence:
+                answer += f" @ {confidence.group(1)}"
+            if reasoning and reasoning.group(1):
+                answer += f" - {_clip(reasoning.group(1), 120)}"
+        else:
+            answer = _clip(re.split(r"(?<=[.!?])\s", reply.strip(), maxsplit=1)[0], 160)
+
+        return f"- {_clip(asked, 80)} -> {answer}"
+
+    # ==================== Metrics ====================
+
+    def record_call(self, estimated_tokens: int, usage: Optional[Dict[str, Any]] = None):
+        """Track prompt size; Bedrock's usage figures also recalibrate the estimate"""
+        prompt_tokens = estimated_tokens
+        if usage and usage.get("input_tokens") is not None:
+            # With prompt caching, input_tokens only counts what came after the last cache breakpoint
+            cache_read = usage.get("cache_read_input_tokens", 0)
+            cache_write = usage.get("cache_creation_input_tokens", 0)
+            prompt_tokens = usage["input_tokens"] + cache_read + cache_write
+            if estimated_tokens > 0 and prompt_tokens > 0:
+                observed = self.chars_per_token * estimated_tokens / prompt_tokens
+                self.chars_per_token = min(max(0.8 * self.chars_per_token + 0.2 * observed, 1.5), 8.0)
+            self.output_tokens_total += usage.get("output_tokens", 0)
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += cache_write
+
+        self.calls += 1
+        self.prompt_tokens_total += prompt_tokens
+        self.last_prompt_tokens = prompt_tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "avg_prompt_tokens": self.prompt_tokens_total / self.calls if self.calls else 0.0,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "output_tokens": self.output_tokens_total,
+            "cache_read_input_tokens": self.cache_read_tokens,
+            "cache_write_input_tokens": self.cache_write_tokens,
+            "history_tokens": self.history_tokens,
+            "turns": len(self._turns),
+            "summary_lines": len(self._summary),
+            "turns_summarised": self.turns_summarised,
+            "blocks_stripped": self.blocks_stripped,
+            "tokens_stripped": self.tokens_stripped,
+            "chars_per_token": round(self.chars_per_token, 2),
+        }
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """Stored turns as plain role/content messages"""
+        return [
+            {"role": m["role"], "content": m["content"]}
+            for turn in self._turns for m in turn
+        ]
+
+    def clear(self):
+        self._turns.clear()
+        self._summary.clear()
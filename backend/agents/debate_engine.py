@@ -6,10 +6,11 @@ from typing import List, Optional, Callable
 from datetime import datetime
 from data.data_models import MarketData, DebateMessage, TradeDecision
 from data.market_data import market_data_service
-from signals.indicators import indicator_analyzer
-from agents.bull_agent import bull_agent
-from agents.bear_agent import bear_agent
-from agents.risk_manager import risk_manager
+from agents.bull_agent import get_bull_agent
+from agents.bear_agent import get_bear_agent
+from agents.risk_manager import get_risk_manager
+from agents.base_agent import begin_cycle, end_cycle
+from execution.order_manager import order_manager
 from config.settings import settings
 
 
@@ -20,14 +21,28 @@ class DebateEngine:
     """
     
     def __init__(self):
-        self.bull = bull_agent
-        self.bear = bear_agent
-        self.risk = risk_manager
         self.debate_history: List[DebateMessage] = []
         self.trade_count = 0
         self.message_callbacks: List[Callable] = []
         self.is_running = False
-        self.current_exposure_pct = 0.0
+    
+    # Agents are built on first debate, not at import
+    @property
+    def bull(self):
+        return get_bull_agent()
+    
+    @property
+    def bear(self):
+        return get_bear_agent()
+    
+    @property
+    def risk(self):
+        return get_risk_manager()
+    
+    @property
+    def current_exposure_pct(self) -> float:
+        """Current portfolio exposure, read from the order manager's position book"""
+        return order_manager.get_total_exposure()
     
     def add_message_callback(self, callback: Callable):
         """Add callback to be called when new debate message is generated"""
@@ -54,14 +69,19 @@ class DebateEngine:
         4. Return trade decision (or None if no trade)
         """
         symbol = symbol or settings.default_symbol
+        cycle = None
         
         try:
             # Fetch market data
             market_data = await market_data_service.get_market_data(symbol)
             
             # Calculate technical signals
+            from signals.indicators import indicator_analyzer  # pandas is imported on first debate
             signals = indicator_analyzer.analyze(market_data.candles)
             
+            # Market data + signals go out once as a shared (cacheable) system block for all three agents
+            cycle = begin_cycle(market_data, signals)
+            
             # === PHASE 1: Bull Analysis ===
             bull_analysis = await self.bull.analyze(market_data, signals)
             bull_message = DebateMessage(
@@ -124,6 +144,10 @@ class DebateEngine:
             )
             await self._broadcast_message(error_message)
             return None
+        
+        finally:
+            if cycle is not None:
+                end_cycle(cycle)
     
     async def run_continuous(
         self, 
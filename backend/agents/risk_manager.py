@@ -1,6 +1,7 @@
 """
 Risk Manager Agent - Final authority with veto power
 """
+from functools import lru_cache
 from agents.base_agent import BaseAgent
 from data.data_models import MarketData, DebateMessage, TradeDecision, TradeAction
 from signals.risk_metrics import risk_metrics
@@ -185,7 +186,8 @@ If Bull has violations, be stern in your response.
             size_pct=decision.get("final_size_pct", 0),
             stop_loss_pct=decision.get("final_stop_loss_pct", 2.0),
             take_profit_pct=decision.get("final_take_profit_pct", 4.0),
-            reasoning=decision.get("reasoning", "")
+            reasoning=decision.get("reasoning", ""),
+            trailing_stop_pct=decision.get("final_trailing_stop_pct")
         )
     
     def reset_violations(self):
@@ -193,5 +195,13 @@ If Bull has violations, be stern in your response.
         self.violations = {"Bull": 0, "Bear": 0}
 
 
-# Singleton instance
-risk_manager = RiskManager()
+# Singleton, built on first use (keeps imports cheap)
+@lru_cache(maxsize=None)
+def get_risk_manager() -> RiskManager:
+    return RiskManager()
+
+
+def __getattr__(attr: str):
+    if attr == "risk_manager":
+        return get_risk_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
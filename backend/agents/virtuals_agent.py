@@ -16,6 +16,7 @@ import asyncio
 import json
 import logging
 import time
+from functools import lru_cache
 from typing import List, Dict, Any, Callable, Optional
 from dataclasses import dataclass, field
 
@@ -89,28 +90,25 @@ class GameAgent:
 
 async def get_technical_analysis(symbol: str) -> str:
     """Pays for and retrieves technical analysis via x402."""
-    from agents.bull_agent import BullAgent
+    from tools.analyst_network import analyst_tool
     logger.info(f"   x402  Technical Analysis for {symbol}")
-    agent = BullAgent()
-    data = await agent.get_analyst_data("Technical", symbol)
+    data = await analyst_tool.query_analyst("technical", f"Virtuals worker request for {symbol}", symbol=symbol)
     return json.dumps(data) if isinstance(data, dict) else str(data)
 
 
 async def get_sentiment_analysis(symbol: str) -> str:
     """Pays for and retrieves sentiment analysis via x402."""
-    from agents.bull_agent import BullAgent
+    from tools.analyst_network import analyst_tool
     logger.info(f"   x402  Sentiment Analysis for {symbol}")
-    agent = BullAgent()
-    data = await agent.get_analyst_data("Sentiment", symbol)
+    data = await analyst_tool.query_analyst("sentiment", f"Virtuals worker request for {symbol}", symbol=symbol)
     return json.dumps(data) if isinstance(data, dict) else str(data)
 
 
 async def get_onchain_analysis(symbol: str) -> str:
     """Pays for and retrieves on-chain analysis via x402."""
-    from agents.bull_agent import BullAgent
+    from tools.analyst_network import analyst_tool
     logger.info(f"   x402  On-Chain Analysis for {symbol}")
-    agent = BullAgent()
-    data = await agent.get_analyst_data("On-Chain", symbol)
+    data = await analyst_tool.query_analyst("onchain", f"Virtuals worker request for {symbol}", symbol=symbol)
     return json.dumps(data) if isinstance(data, dict) else str(data)
 
 
@@ -206,9 +204,10 @@ class ZKAlphaPredatorVirtualsAgent:
             logger.info(f"[G.A.M.E.] Dispatching Worker  {worker.name}")
 
         # 3. Execute native consensus engine
-        from agents.bull_agent import BullAgent
-        native = BullAgent()
-        result = await native.run_full_cycle(symbol)
+        from agents.bull_agent import get_bull_agent
+        from data.market_data import market_data_service
+        market_data = await market_data_service.get_market_data(symbol)
+        result = await get_bull_agent().analyze(market_data, signals=[])
 
         elapsed = round(time.time() - start, 2)
         decision = result.get("decision", "HOLD") if isinstance(result, dict) else "UNKNOWN"
@@ -220,5 +219,13 @@ class ZKAlphaPredatorVirtualsAgent:
         return self.agent.list_capabilities()
 
 
-# Singleton  imported by main.py
-virtuals_agent = ZKAlphaPredatorVirtualsAgent()
+# Singleton, built on first use (keeps imports cheap) - used by main.py
+@lru_cache(maxsize=None)
+def get_virtuals_agent() -> ZKAlphaPredatorVirtualsAgent:
+    return ZKAlphaPredatorVirtualsAgent()
+
+
+def __getattr__(attr: str):
+    if attr == "virtuals_agent":
+        return get_virtuals_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
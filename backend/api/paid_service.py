@@ -1,4 +1,8 @@
+import secrets
+import time
+from decimal import Decimal
 from fastapi import APIRouter, Header, Response, HTTPException
+from pydantic import BaseModel
 from typing import Optional, Dict
 from execution.payment_manager import payment_manager
 
@@ -13,6 +17,23 @@ PRICES = {
 
 ASSET = "usdc"
 
+# Prepaid sessions: pay once, then spend the balance with X-Session-Token
+SESSION_TTL_SECONDS = 3600
+MIN_SESSION_DEPOSIT = 0.50
+_sessions: Dict[str, Dict] = {}
+
+# Deposit quotes: the 402 carries a quote id and the session is credited with the
+# quoted amount only, whatever the client claims when it returns with proof
+QUOTE_TTL_SECONDS = 600
+_quotes: Dict[str, Dict] = {}
+
+# Redeemed payment proofs -> when they can be forgotten
+PROOF_RETENTION_SECONDS = 24 * 3600
+_redeemed_proofs: Dict[str, float] = {}
+
+class SessionRequest(BaseModel):
+    amount: float = 2.0
+
 def create_402_response(service_type: str, cost: float) -> Response:
     """Helper to generate standardized 402 response"""
     deposit_address = payment_manager.get_address()
@@ -29,12 +50,118 @@ def create_402_response(service_type: str, cost: float) -> Response:
         media_type="application/json"
     )
 
+def _charge_session(token: str, service_type: str, response: Response) -> Optional[Response]:
+    """
+    Deduct the service price from a session balance.
+    Returns a 402 response if the session is unknown, expired or underfunded.
+    """
+    cost = PRICES[service_type]
+    session = _sessions.get(token)
+    if session is None or session["expires_at"] < time.time():
+        _sessions.pop(token, None)
+        denied = create_402_response(service_type, cost)
+        denied.headers["X-Session-Balance"] = "0"
+        return denied
+
+    price = Decimal(str(cost))
+    if session["balance"] < price:
+        denied = create_402_response(service_type, cost)
+        denied.headers["X-Session-Balance"] = str(session["balance"])
+        return denied
+
+    session["balance"] -= price
+    session["requests"] += 1
+    response.headers["X-Session-Balance"] = str(session["balance"])
+    response.headers["X-Session-Charged"] = str(cost)
+    return None
+
+def _require_payment(
+    service_type: str,
+    response: Response,
+    x_payment_token: Optional[str],
+    x_session_token: Optional[str]
+) -> Optional[Response]:
+    """Check per-request proof or session credit; returns a 402 response if unpaid"""
+    if x_session_token:
+        return _charge_session(x_session_token, service_type, response)
+    if not x_payment_token:
+        return create_402_response(service_type, PRICES[service_type])
+    return None
+
+def _prune_expired(now: float):
+    """Drop expired sessions, quotes and redeemed proofs"""
+    for store, key in ((_sessions, "expires_at"), (_quotes, "expires_at")):
+        for token in [t for t, entry in store.items() if entry[key] < now]:
+            del store[token]
+    for proof in [p for p, forget_at in _redeemed_proofs.items() if forget_at < now]:
+        del _redeemed_proofs[proof]
+
+@router.post("/session")
+async def open_session(
+    request: SessionRequest,
+    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token"),
+    x_payment_quote: Optional[str] = Header(None, alias="X-Payment-Quote")
+):
+    """
+    Open a prepaid session.
+    Without proof this answers 402 for the deposit amount with an X-Payment-Quote id;
+    after paying, repeat the call with X-Payment-Token and that X-Payment-Quote to
+    receive a reusable session token credited with the quoted amount.
+    """
+    now = time.time()
+    _prune_expired(now)
+
+    if not x_payment_token:
+        if request.amount < MIN_SESSION_DEPOSIT:
+            raise HTTPException(status_code=400, detail=f"Minimum session deposit is {MIN_SESSION_DEPOSIT} {ASSET}")
+        quote_id = secrets.token_urlsafe(16)
+        _quotes[quote_id] = {"amount": Decimal(str(request.amount)), "expires_at": now + QUOTE_TTL_SECONDS}
+        denied = create_402_response("session", request.amount)
+        denied.headers["X-Payment-Quote"] = quote_id
+        return denied
+
+    quote = _quotes.pop(x_payment_quote, None) if x_payment_quote else None
+    if quote is None:
+        raise HTTPException(status_code=400, detail="Unknown or expired payment quote")
+
+    if x_payment_token in _redeemed_proofs:
+        raise HTTPException(status_code=409, detail="Payment proof already redeemed")
+    _redeemed_proofs[x_payment_token] = now + PROOF_RETENTION_SECONDS
+
+    token = secrets.token_urlsafe(24)
+    _sessions[token] = {
+        "balance": quote["amount"],
+        "expires_at": now + SESSION_TTL_SECONDS,
+        "requests": 0
+    }
+    return {
+        "session_token": token,
+        "balance": float(quote["amount"]),
+        "expires_at": _sessions[token]["expires_at"],
+        "prices": PRICES
+    }
+
+@router.get("/session")
+async def get_session(x_session_token: str = Header(..., alias="X-Session-Token")):
+    """Get a session's remaining balance"""
+    session = _sessions.get(x_session_token)
+    if session is None or session["expires_at"] < time.time():
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {
+        "balance": float(session["balance"]),
+        "expires_at": session["expires_at"],
+        "requests": session["requests"]
+    }
+
 @router.get("/technical")
 async def get_technical_analysis(
-    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token")
+    response: Response,
+    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token"),
+    x_session_token: Optional[str] = Header(None, alias="X-Session-Token")
 ):
-    if not x_payment_token:
-        return create_402_response("technical", PRICES["technical"])
+    denied = _require_payment("technical", response, x_payment_token, x_session_token)
+    if denied:
+        return denied
         
     return {
         "analyst": "TechWizard_AI",
@@ -46,10 +173,13 @@ async def get_technical_analysis(
 
 @router.get("/sentiment")
 async def get_sentiment_analysis(
-    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token")
+    response: Response,
+    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token"),
+    x_session_token: Optional[str] = Header(None, alias="X-Session-Token")
 ):
-    if not x_payment_token:
-        return create_402_response("sentiment", PRICES["sentiment"])
+    denied = _require_payment("sentiment", response, x_payment_token, x_session_token)
+    if denied:
+        return denied
         
     return {
         "analyst": "NewsReader_Bot",
@@ -61,10 +191,13 @@ async def get_sentiment_analysis(
 
 @router.get("/onchain")
 async def get_onchain_analysis(
-    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token")
+    response: Response,
+    x_payment_token: Optional[str] = Header(None, alias="X-Payment-Token"),
+    x_session_token: Optional[str] = Header(None, alias="X-Session-Token")
 ):
-    if not x_payment_token:
-        return create_402_response("onchain", PRICES["onchain"])
+    denied = _require_payment("onchain", response, x_payment_token, x_session_token)
+    if denied:
+        return denied
         
     return {
         "analyst": "WhaleWatcher_v9",
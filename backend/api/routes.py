@@ -1,12 +1,17 @@
 """
 FastAPI REST API routes
 """
+import asyncio
 from fastapi import APIRouter, HTTPException
 from typing import Optional
+from datetime import datetime
 from pydantic import BaseModel
 
 from agents.debate_engine import debate_engine
 from execution.order_manager import order_manager
+from execution.paper_exchange import paper_exchange
+from data.ai_log_queue import ai_log_queue
+from data.data_models import OrderSide
 from config.settings import settings
 
 
@@ -54,7 +59,8 @@ async def get_demo_status():
     return {
         "demo_mode": order_manager.demo_mode,
         "demo_balance": settings.demo_balance,
-        "current_balance": order_manager.account_balance
+        "current_balance": order_manager.account_balance,
+        "paper_exchange": paper_exchange.get_stats()
     }
 
 
@@ -112,6 +118,48 @@ async def get_candles(symbol: str = "cmt_btcusdt", interval: str = "5m", limit:
         return {"symbol": symbol, "interval": interval, "candles": [], "error": str(e)}
 
 
+@router.get("/candles/history")
+async def get_candle_history(
+    symbol: str = "cmt_btcusdt",
+    interval: str = "5m",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: int = 5000
+):
+    """Get archived candles between start and end (ms timestamps)"""
+    from data.candle_archive import candle_archive
+    
+    records = (await asyncio.to_thread(candle_archive.range, symbol, interval, start, end))[-limit:]
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "candles": [
+            {
+                "time": ts // 1000,
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v
+            }
+            for ts, o, h, l, c, v in records.tolist()
+        ]
+    }
+
+
+@router.post("/candles/backfill")
+async def backfill_candles(symbol: str = "cmt_btcusdt", interval: str = "5m", days: Optional[float] = None):
+    """Download WEEX candle history into the local archive"""
+    from data.candle_archive import candle_archive
+    
+    try:
+        added = await candle_archive.backfill(symbol, interval, days if days is not None else settings.candle_backfill_days)
+        bounds = await asyncio.to_thread(candle_archive.bounds, symbol, interval)
+        return {"status": "success", "added": added, "bounds": bounds}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Trading Session Control
 @router.post("/start")
 async def start_trading(request: StartSessionRequest):
@@ -195,14 +243,15 @@ async def get_positions():
     
     return {
         "positions": [p.dict() for p in positions],
-        "total_exposure_pct": order_manager.get_total_exposure()
+        "total_exposure_pct": order_manager.get_total_exposure(),
+        "risk": order_manager.get_portfolio_risk()
     }
 
 
 @router.post("/positions/{symbol}/close")
-async def close_position(symbol: str, reason: str = "Manual close"):
-    """Close a specific position"""
-    trade = await order_manager.close_position(symbol, reason)
+async def close_position(symbol: str, reason: str = "Manual close", side: Optional[OrderSide] = None):
+    """Close a specific position (pass `side` to pick one leg of a hedged position)"""
+    trade = await order_manager.close_position(symbol, reason, side)
     
     if not trade:
         raise HTTPException(status_code=404, detail=f"No open position for {symbol}")
@@ -214,26 +263,66 @@ async def close_position(symbol: str, reason: str = "Manual close"):
 
 
 @router.get("/trades")
-async def get_trades(limit: int = 50):
-    """Get trade history"""
-    trades = order_manager.get_trade_history(limit)
+async def get_trades(
+    limit: int = 50,
+    symbol: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get trade history, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    """
+    try:
+        trades, next_cursor = await order_manager.query_trades(
+            symbol=symbol,
+            start=start,
+            end=end,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "trades": [t.dict() for t in trades],
-        "total": len(trades)
+        "trades": trades,
+        "total": len(trades),
+        "next_cursor": next_cursor
     }
 
 
+@router.get("/ai-logs/stats")
+async def get_ai_log_stats():
+    """Get compliance AI log upload queue statistics"""
+    return ai_log_queue.get_stats()
+
+
+@router.get("/recorder/stats")
+async def get_recorder_stats():
+    """Get market recorder statistics"""
+    from data.recorder import market_recorder
+    return market_recorder.get_stats()
+
+
 # Agent Stats
 @router.get("/agents/stats")
 async def get_agent_stats():
     """Get agent performance statistics"""
     from agents.risk_manager import risk_manager
+    from tools.analyst_network import analyst_tool
+    from agents.bedrock_pool import bedrock_pool
     
     return {
         "violations": risk_manager.violations,
         "debate_count": debate_engine.get_stats()["total_debates"],
-        "trade_count": debate_engine.trade_count
+        "trade_count": debate_engine.trade_count,
+        "analyst_cache": analyst_tool.get_stats(),
+        "bedrock": bedrock_pool.get_stats(),
+        "memory": {
+            agent.name: agent.memory.get_stats()
+            for agent in (debate_engine.bull, debate_engine.bear, debate_engine.risk)
+        }
     }
 
 
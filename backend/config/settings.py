@@ -16,6 +16,15 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = os.getenv("AWS_SECRET_ACCESS_KEY", "")
     aws_region: str = os.getenv("AWS_REGION", "us-east-1")
     bedrock_model_id: str = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+    bedrock_max_connections: int = int(os.getenv("BEDROCK_MAX_CONNECTIONS", "20"))
+    bedrock_max_attempts: int = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "4"))
+    bedrock_read_timeout_seconds: float = float(os.getenv("BEDROCK_READ_TIMEOUT_SECONDS", "60"))
+    bedrock_prompt_caching: bool = os.getenv("BEDROCK_PROMPT_CACHING", "true").lower() == "true"
+    
+    # Agent conversation memory - token budget for resent history, older turns folded into a summary
+    agent_memory_token_budget: int = int(os.getenv("AGENT_MEMORY_TOKEN_BUDGET", "2000"))
+    agent_memory_max_turns: int = int(os.getenv("AGENT_MEMORY_MAX_TURNS", "5"))
+    agent_memory_summary_tokens: int = int(os.getenv("AGENT_MEMORY_SUMMARY_TOKENS", "300"))
     
     # WEEX API
     weex_api_key: str = os.getenv("WEEX_API_KEY", "")
@@ -37,10 +46,95 @@ class Settings(BaseSettings):
     debate_interval_seconds: int = 15  # Much faster debates = more opportunities
     min_confidence_threshold: float = 0.55  # Lower threshold = many more trades
     
+    # Position marking - dashboard polls within this window reuse the last mark
+    mark_to_market_interval_seconds: float = float(os.getenv("MARK_TO_MARKET_INTERVAL_SECONDS", "2"))
+    
+    # Trade journal (SQLite WAL) - durable trades/positions with snapshot + tail replay
+    journal_enabled: bool = os.getenv("JOURNAL_ENABLED", "true").lower() == "true"
+    journal_path: str = os.getenv("JOURNAL_PATH", "trade_journal.db")
+    journal_snapshot_every: int = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "200"))
+    trade_history_memory_limit: int = 500  # Recent trades kept in memory
+    
+    # Budget ledger (append-only JSONL, rotated to an archive on compaction)
+    budget_ledger_path: str = os.getenv("BUDGET_LEDGER_PATH", "budget_ledger.jsonl")
+    budget_ledger_compact_every: int = int(os.getenv("BUDGET_LEDGER_COMPACT_EVERY", "1000"))
+    
+    # Budget limits over rolling windows (USD, 0 disables a limit)
+    budget_hourly_limit: float = float(os.getenv("BUDGET_HOURLY_LIMIT", "5"))
+    budget_daily_limit: float = float(os.getenv("BUDGET_DAILY_LIMIT", "10"))
+    budget_tool_hourly_limit: float = float(os.getenv("BUDGET_TOOL_HOURLY_LIMIT", "3"))
+    budget_symbol_hourly_limit: float = float(os.getenv("BUDGET_SYMBOL_HOURLY_LIMIT", "4"))
+    
+    # Analyst network result cache (seconds); stale results are served while refreshing
+    analyst_cache_ttl_technical: float = float(os.getenv("ANALYST_CACHE_TTL_TECHNICAL", "60"))
+    analyst_cache_ttl_sentiment: float = float(os.getenv("ANALYST_CACHE_TTL_SENTIMENT", "300"))
+    analyst_cache_ttl_onchain: float = float(os.getenv("ANALYST_CACHE_TTL_ONCHAIN", "600"))
+    analyst_cache_max_stale_seconds: float = float(os.getenv("ANALYST_CACHE_MAX_STALE_SECONDS", "300"))
+    
+    # Analyst network latency - per-analyst deadline, hedged GETs past a latency percentile
+    analyst_deadline_seconds: float = float(os.getenv("ANALYST_DEADLINE_SECONDS", "5"))
+    analyst_hedge_enabled: bool = os.getenv("ANALYST_HEDGE_ENABLED", "true").lower() == "true"
+    analyst_hedge_percentile: float = float(os.getenv("ANALYST_HEDGE_PERCENTILE", "0.9"))
+    
+    # Payment batching - payments within the window settle as one user operation
+    payment_batch_window_ms: float = float(os.getenv("PAYMENT_BATCH_WINDOW_MS", "50"))
+    payment_batch_max_size: int = int(os.getenv("PAYMENT_BATCH_MAX_SIZE", "10"))
+    
+    # Wallet balance cache - background reconcile against the chain
+    wallet_reconcile_seconds: float = float(os.getenv("WALLET_RECONCILE_SECONDS", "30"))
+    
+    # BITE encrypted-intent pool
+    bite_pool_ttl_seconds: float = float(os.getenv("BITE_POOL_TTL_SECONDS", "900"))
+    bite_pool_capacity: int = int(os.getenv("BITE_POOL_CAPACITY", "1000"))
+    bite_bridge_timeout_seconds: float = float(os.getenv("BITE_BRIDGE_TIMEOUT_SECONDS", "15"))
+    bite_breaker_threshold: int = int(os.getenv("BITE_BREAKER_THRESHOLD", "3"))
+    bite_breaker_cooldown_seconds: float = float(os.getenv("BITE_BREAKER_COOLDOWN_SECONDS", "60"))
+    
+    # x402 prepaid payment sessions (deposit once, spend per query)
+    payment_sessions_enabled: bool = os.getenv("PAYMENT_SESSIONS_ENABLED", "true").lower() == "true"
+    payment_session_topup: float = float(os.getenv("PAYMENT_SESSION_TOPUP", "2.0"))
+    
+    # Compliance AI log uploads - spooled to disk, uploaded by a small worker pool
+    ai_log_spool_path: str = os.getenv("AI_LOG_SPOOL_PATH", "ai_log_spool.jsonl")
+    ai_log_workers: int = int(os.getenv("AI_LOG_WORKERS", "2"))
+    ai_log_queue_size: int = int(os.getenv("AI_LOG_QUEUE_SIZE", "100"))
+    
+    # Exit engine - how often to pull fresh ticks for symbols with armed stops
+    exit_engine_poll_seconds: float = float(os.getenv("EXIT_ENGINE_POLL_SECONDS", "1"))
+    
+    # Market data source: auto | weex | weex_ws | public | synthetic | replay
+    # (auto = WEEX REST with credentials, synthetic without)
+    market_data_source: str = os.getenv("MARKET_DATA_SOURCE", "auto")
+    market_replay_path: str = os.getenv("MARKET_REPLAY_PATH", "recordings")
+    market_replay_speed: float = float(os.getenv("MARKET_REPLAY_SPEED", "1.0"))  # 0 = step per request
+    market_replay_loop: bool = os.getenv("MARKET_REPLAY_LOOP", "false").lower() == "true"
+    
+    # Synthetic market (demo mode / offline) - same seed, same price paths
+    synthetic_seed: int = int(os.getenv("SYNTHETIC_SEED", "42"))
+    
+    # Candle archive - memory-mapped local history, backfilled from WEEX
+    candle_archive_enabled: bool = os.getenv("CANDLE_ARCHIVE_ENABLED", "true").lower() == "true"
+    candle_archive_path: str = os.getenv("CANDLE_ARCHIVE_PATH", "candle_archive")
+    candle_backfill_days: float = float(os.getenv("CANDLE_BACKFILL_DAYS", "90"))
+    
+    # Market recorder - tickers, candles and books to compressed columnar files per symbol/day
+    recorder_enabled: bool = os.getenv("RECORDER_ENABLED", "false").lower() == "true"
+    recorder_path: str = os.getenv("RECORDER_PATH", "recordings")
+    recorder_buffer_size: int = int(os.getenv("RECORDER_BUFFER_SIZE", "50000"))
+    recorder_flush_seconds: float = float(os.getenv("RECORDER_FLUSH_SECONDS", "1.0"))
+    
     # Demo Mode (for safe testing without real trades)
     demo_mode: bool = False  # LIVE MODE for competition
     demo_balance: float = 10000.0  # Not used in live mode
     
+    # Paper exchange (demo-mode fills against the local order book)
+    paper_latency_ms: float = float(os.getenv("PAPER_LATENCY_MS", "50"))
+    paper_latency_jitter_ms: float = float(os.getenv("PAPER_LATENCY_JITTER_MS", "20"))
+    paper_slippage_bps: float = float(os.getenv("PAPER_SLIPPAGE_BPS", "2"))
+    paper_taker_fee_bps: float = float(os.getenv("PAPER_TAKER_FEE_BPS", "6"))
+    paper_maker_fee_bps: float = float(os.getenv("PAPER_MAKER_FEE_BPS", "2"))
+    paper_liquidity_fraction: float = float(os.getenv("PAPER_LIQUIDITY_FRACTION", "1.0"))  # Share of each book level we can take
+    
     # Allowed symbols for trading
     allowed_symbols: list = [
         "cmt_btcusdt", "cmt_ethusdt", "cmt_solusdt", "cmt_dogeusdt",
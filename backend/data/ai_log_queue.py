@@ -0,0 +1,276 @@
+"""
+AI Log Queue - Durable background upload of compliance AI logs
+Bounded worker pool with retry/backoff and an on-disk spool that survives restarts
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+from data.ai_log_uploader import ai_log_uploader
+from config.settings import settings
+
+
+class AILogQueue:
+    """
+    Compliance logs are never dropped: every submitted log is appended to a
+    JSONL spool ("add") before it is queued and marked done ("ack") only after
+    WEEX accepts it. On startup the spool is replayed, so logs pending at a
+    crash or shutdown are uploaded on the next run.
+
+    The in-memory queue is bounded; logs that don't fit wait in an overflow
+    list (they are already on disk) and are fed in as workers free up. A small
+    fixed worker pool on its own HTTP client keeps uploads from competing with
+    order traffic. Transport errors retry with capped exponential backoff;
+    logs the exchange rejects outright are moved to a dead-letter file after
+    `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        spool_path: str = settings.ai_log_spool_path,
+        workers: int = settings.ai_log_workers,
+        max_queue: int = settings.ai_log_queue_size,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_attempts: int = 5
+    ):
+        self.spool_path = spool_path
+        self.dead_letter_path = f"{spool_path}.dead"
+        self.workers = workers
+        self.max_queue = max_queue
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._overflow: Deque[str] = deque()
+        self._waiting: Set[str] = set()  # In backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._spool = None
+        self._spool_acks = 0
+
+        self.uploaded = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.last_error: Optional[str] = None
+        self._latencies: Deque[float] = deque(maxlen=200)
+
+    # ==================== Spool ====================
+
+    def _open_spool(self):
+        if self._spool is None:
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+    def _spool_write(self, record: Dict[str, Any]):
+        try:
+            self._open_spool()
+            self._spool.write(json.dumps(record, default=str) + "\n")
+            self._spool.flush()
+        except Exception as e:
+            print(f" AI log spool write failed: {e}")
+
+    def _load_spool(self):
+        """Rebuild pending logs from the spool (adds without a matching ack)"""
+        if not os.path.exists(self.spool_path):
+            return
+
+        with open(self.spool_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash
+                if record.get("op") == "add":
+                    self._pending[record["id"]] = {
+                        "id": record["id"],
+                        "body": record["body"],
+                        "attempts": 0,
+                        "submitted_at": record.get("ts", time.time())
+                    }
+                elif record.get("op") == "ack":
+                    self._pending.pop(record["id"], None)
+
+    def _compact_spool(self):
+        """Rewrite the spool with only the still-pending logs"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending.values():
+                f.write(json.dumps({
+                    "op": "add",
+                    "id": entry["id"],
+                    "ts": entry["submitted_at"],
+                    "body": entry["body"]
+                }, default=str) + "\n")
+        os.replace(tmp_path, self.spool_path)
+        self._spool_acks = 0
+
+    # ==================== Queueing ====================
+
+    def submit(
+        self,
+        stage: str,
+        model: str,
+        input_data: Dict[str, Any],
+        output_data: Dict[str, Any],
+        explanation: str,
+        order_id: Optional[int] = None
+    ) -> str:
+        """
+        Persist an AI log and queue it for upload. Returns the log id.
+        Safe to call before `start()`; the log is uploaded once workers run.
+        """
+        body = ai_log_uploader.build_body(stage, model, input_data, output_data, explanation, order_id)
+        log_id = uuid.uuid4().hex
+        entry = {"id": log_id, "body": body, "attempts": 0, "submitted_at": time.time()}
+
+        self._spool_write({"op": "add", "id": log_id, "ts": entry["submitted_at"], "body": body})
+        self._pending[log_id] = entry
+        self._enqueue(log_id)
+        return log_id
+
+    def _enqueue(self, log_id: str):
+        """Put a log on the worker queue, or park it in overflow when full"""
+        self._waiting.discard(log_id)
+        if log_id not in self._pending:
+            return
+        if self._queue is None or self._queue.full():
+            self._overflow.append(log_id)
+            return
+        self._queue.put_nowait(log_id)
+
+    def _refill(self):
+        """Move overflowed logs into the queue as space frees up"""
+        while self._overflow and self._queue is not None and not self._queue.full():
+            self._enqueue(self._overflow.popleft())
+
+    def _ack(self, log_id: str):
+        self._pending.pop(log_id, None)
+        self._spool_write({"op": "ack", "id": log_id})
+        self._spool_acks += 1
+        if self._spool_acks >= 1000 and self._spool_acks > len(self._pending):
+            try:
+                self._compact_spool()
+            except Exception as e:
+                print(f" AI log spool compaction failed: {e}")
+
+    def _retry_later(self, log_id: str, attempts: int):
+        delay = min(self.base_backoff * (2 ** (attempts - 1)), self.max_backoff)
+        self.retries += 1
+        self._waiting.add(log_id)
+        self._loop.call_later(delay, self._enqueue, log_id)
+
+    def _dead_letter(self, entry: Dict[str, Any], result: Dict[str, Any]):
+        """Keep a rejected log on disk for manual resubmission"""
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**entry, "result": result}, default=str) + "\n")
+        except Exception as e:
+            print(f" AI log dead-letter write failed: {e}")
+            self._retry_later(entry["id"], entry["attempts"])
+            return
+        self.dead_lettered += 1
+        self._ack(entry["id"])
+
+    async def _worker(self):
+        while True:
+            log_id = await self._queue.get()
+            try:
+                entry = self._pending.get(log_id)
+                if entry is None:
+                    continue
+
+                entry["attempts"] += 1
+                start = time.monotonic()
+                result, retryable = await ai_log_uploader.send(entry["body"])
+
+                if result.get("code") == "00000":
+                    self._latencies.append((time.monotonic() - start) * 1000)
+                    self.uploaded += 1
+                    self._ack(log_id)
+                    continue
+
+                self.last_error = str(result.get("msg"))
+                if retryable or entry["attempts"] < self.max_attempts:
+                    self._retry_later(log_id, entry["attempts"])
+                else:
+                    print(f" AI log rejected after {entry['attempts']} attempts: {self.last_error}")
+                    self._dead_letter(entry, result)
+            except Exception as e:
+                self.last_error = str(e)
+                if log_id in self._pending:
+                    self._retry_later(log_id, self._pending[log_id]["attempts"] or 1)
+            finally:
+                self._queue.task_done()
+                self._refill()
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Replay the spool and start upload workers (requires a running loop)"""
+        if self._tasks:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+
+        try:
+            self._load_spool()
+            self._compact_spool()
+        except Exception as e:
+            print(f" AI log spool recovery failed: {e}")
+
+        self._waiting.clear()
+        self._overflow = deque(self._pending)
+        self._refill()
+
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        if self._pending:
+            print(f" AI log queue resumed with {len(self._pending)} pending logs")
+
+    async def stop(self):
+        """Stop workers; pending logs stay in the spool for the next run"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        await ai_log_uploader.close()
+
+    def get_stats(self) -> dict:
+        """Get upload queue statistics"""
+        latencies = sorted(self._latencies)
+        return {
+            "running": bool(self._tasks),
+            "queue_depth": (self._queue.qsize() if self._queue else 0) + len(self._overflow),
+            "pending": len(self._pending),
+            "backing_off": len(self._waiting),
+            "uploaded": self.uploaded,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "avg_latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "p95_latency_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None,
+            "last_error": self.last_error
+        }
+
+
+# Singleton instance
+ai_log_queue = AILogQueue()
@@ -10,7 +10,7 @@ import hashlib
 import base64
 import time
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 import httpx
 from config.settings import settings
@@ -39,6 +39,22 @@ class AILogUploader:
             "Accept": "application/json",
             "Accept-Language": "en-US,en;q=0.9",
         }
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client so uploads reuse one connection"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2)
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     def _generate_signature(
         self,
@@ -70,8 +86,8 @@ class AILogUploader:
             "locale": "en-US"
         }
     
-    async def upload_ai_log(
-        self,
+    @staticmethod
+    def build_body(
         stage: str,
         model: str,
         input_data: Dict[str, Any],
@@ -79,28 +95,12 @@ class AILogUploader:
         explanation: str,
         order_id: Optional[int] = None
     ) -> Dict[str, Any]:
-        """
-        Upload AI log to WEEX for compliance verification.
-        
-        Args:
-            stage: Trading stage (e.g., "Strategy Generation", "Decision Making", 
-                   "Risk Assessment", "Order Execution")
-            model: AI model name/version (e.g., "Claude-3.5-sonnet", "GPT-4-turbo")
-            input_data: The prompt/query given to AI (dict)
-            output_data: The AI's generated output (dict)
-            explanation: Summary of AI reasoning (max 1000 chars)
-            order_id: Optional WEEX order ID
-            
-        Returns:
-            API response dict with code, msg, requestTime, and data fields
-        """
+        """Build the uploadAiLog request body"""
         # Truncate explanation to 1000 chars if needed
         if len(explanation) > 1000:
             explanation = explanation[:997] + "..."
         
-        request_path = "/capi/v2/order/uploadAiLog"
-        
-        body = {
+        return {
             "orderId": order_id,
             "stage": stage,
             "model": model,
@@ -108,35 +108,86 @@ class AILogUploader:
             "output": output_data,
             "explanation": explanation
         }
-        
+    
+    async def send(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        POST a prepared AI log body.
+        Returns (result, retryable) where retryable marks transport errors,
+        rate limiting and server-side failures.
+        """
+        request_path = "/capi/v2/order/uploadAiLog"
         body_str = json.dumps(body)
         headers = {**self._default_headers, **self._get_headers(request_path, body_str)}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}{request_path}",
-                    headers=headers,
-                    content=body_str
-                )
-                
-                result = response.json()
-                
-                if result.get("code") == "00000":
-                    print(f" AI Log uploaded successfully: {result.get('data')}")
-                else:
-                    print(f" AI Log upload warning: {result.get('msg')}")
-                
-                return result
-                
+            response = await self._get_client().post(
+                f"{self.base_url}{request_path}",
+                headers=headers,
+                content=body_str
+            )
         except Exception as e:
-            print(f" Error uploading AI log: {e}")
             return {
                 "code": "ERROR",
                 "msg": str(e),
                 "requestTime": int(time.time() * 1000),
                 "data": None
-            }
+            }, True
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            return {
+                "code": "ERROR",
+                "msg": f"HTTP {response.status_code}",
+                "requestTime": int(time.time() * 1000),
+                "data": None
+            }, True
+        
+        try:
+            return response.json(), False
+        except ValueError:
+            return {
+                "code": "ERROR",
+                "msg": f"Invalid response: {response.text[:200]}",
+                "requestTime": int(time.time() * 1000),
+                "data": None
+            }, True
+    
+    async def upload_ai_log(
+        self,
+        stage: str,
+        model: str,
+        input_data: Dict[str, Any],
+        output_data: Dict[str, Any],
+        explanation: str,
+        order_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Upload AI log to WEEX for compliance verification.
+        For fire-and-forget uploads that must survive failures, use
+        `ai_log_queue.submit` instead.
+        
+        Args:
+            stage: Trading stage (e.g., "Strategy Generation", "Decision Making", 
+                   "Risk Assessment", "Order Execution")
+            model: AI model name/version (e.g., "Claude-3.5-sonnet", "GPT-4-turbo")
+            input_data: The prompt/query given to AI (dict)
+            output_data: The AI's generated output (dict)
+            explanation: Summary of AI reasoning (max 1000 chars)
+            order_id: Optional WEEX order ID
+            
+        Returns:
+            API response dict with code, msg, requestTime, and data fields
+        """
+        body = self.build_body(stage, model, input_data, output_data, explanation, order_id)
+        result, _ = await self.send(body)
+        
+        if result.get("code") == "00000":
+            print(f" AI Log uploaded successfully: {result.get('data')}")
+        elif result.get("code") == "ERROR":
+            print(f" Error uploading AI log: {result.get('msg')}")
+        else:
+            print(f" AI Log upload warning: {result.get('msg')}")
+        
+        return result
     
     async def log_debate_decision(
         self,
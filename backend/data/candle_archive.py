@@ -0,0 +1,241 @@
+"""
+Candle Archive - Local OHLCV history per symbol and interval
+Fixed-width records in memory-mapped files, binary-searched by timestamp
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.data_models import Candle
+from config.settings import settings
+
+
+# One bar = 48 bytes; files are sorted by ts with no duplicates
+RECORD = np.dtype([
+    ("ts", "<i8"),  # Bar open time, ms
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+INTERVAL_MS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+
+
+class CandleArchive:
+    """
+    On-disk candle history, one {symbol}_{interval}.candles file per series.
+
+    Files are read through numpy memmaps (reopened when the file grows), so a
+    range read is two binary searches on the ts column plus a slice; only the
+    pages touched are loaded. New bars are appended in place; the forming bar
+    is overwritten in place; anything older than the tail is merged with a
+    rewrite. `backfill` pages WEEX history backwards, skipping what's already
+    stored.
+
+    Reads and writes are blocking file I/O and share a lock (a rewrite closes
+    the old memmap), so async callers run them with asyncio.to_thread.
+    """
+
+    def __init__(self, directory: str = settings.candle_archive_path, page_size: int = 100):
+        self.directory = directory
+        self.page_size = page_size
+        self._maps: Dict[Tuple[str, str], Tuple[int, np.memmap]] = {}
+        self._lock = threading.Lock()
+        self.bars_written = 0
+        self.bars_backfilled = 0
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.directory, f"{symbol.replace('/', '-')}_{interval}.candles")
+
+    def _view(self, symbol: str, interval: str) -> np.ndarray:
+        """Memmap of a series (empty array if none yet)"""
+        path = self._path(symbol, interval)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < RECORD.itemsize:
+            return np.empty(0, dtype=RECORD)
+
+        cached = self._maps.get((symbol, interval))
+        if cached and cached[0] == size:
+            return cached[1]
+        mm = np.memmap(path, dtype=RECORD, mode="r", shape=(size // RECORD.itemsize,))
+        self._maps[(symbol, interval)] = (size, mm)
+        return mm
+
+    def _release(self, symbol: str, interval: str):
+        """Close a series' memmap before its file is replaced"""
+        cached = self._maps.pop((symbol, interval), None)
+        if cached is not None and getattr(cached[1], "_mmap", None) is not None:
+            cached[1]._mmap.close()
+
+    @staticmethod
+    def to_records(candles: List[Candle]) -> np.ndarray:
+        """Candles -> sorted, de-duplicated records (last one wins per ts)"""
+        records = np.array(
+            [(int(c.timestamp.timestamp() * 1000), c.open, c.high, c.low, c.close, c.volume) for c in candles],
+            dtype=RECORD
+        )
+        # Reverse so np.unique's first occurrence is the latest given
+        records = records[::-1]
+        _, idx = np.unique(records["ts"], return_index=True)
+        return records[idx]
+
+    @staticmethod
+    def to_candles(records: np.ndarray) -> List[Candle]:
+        return [
+            Candle(
+                timestamp=datetime.fromtimestamp(ts / 1000),
+                open=o, high=h, low=l, close=c, volume=v
+            )
+            for ts, o, h, l, c, v in records.tolist()
+        ]
+
+    # ==================== Writes ====================
+
+    def write(self, symbol: str, interval: str, candles: List[Candle]) -> int:
+        """Store bars, returning how many were new"""
+        if not candles:
+            return 0
+        rows = self.to_records(candles)
+        path = self._path(symbol, interval)
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            existing = self._view(symbol, interval)
+            before = len(existing)
+            last = int(existing["ts"][-1]) if before else None
+
+            if last is None or rows["ts"][0] > last:
+                # Pure append
+                with open(path, "ab") as f:
+                    f.write(rows.tobytes())
+                after = before + len(rows)
+            elif rows["ts"][0] == last:
+                # Update the forming bar in place, append the rest
+                with open(path, "r+b") as f:
+                    f.seek((before - 1) * RECORD.itemsize)
+                    f.write(rows.tobytes())
+                after = before + len(rows) - 1
+            else:
+                # Overlaps or precedes stored history - merge and rewrite
+                combined = np.concatenate([rows, np.array(existing)])
+                _, idx = np.unique(combined["ts"], return_index=True)
+                merged = combined[idx]
+                self._release(symbol, interval)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(merged.tobytes())
+                os.replace(tmp_path, path)
+                after = len(merged)
+
+            self.bars_written += after - before
+        return after - before
+
+    # ==================== Reads ====================
+
+    def range(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> np.ndarray:
+        """Bars with start_ms <= ts <= end_ms (copied out of the memmap)"""
+        with self._lock:
+            mm = self._view(symbol, interval)
+            ts = mm["ts"]
+            lo = int(np.searchsorted(ts, start_ms, side="left")) if start_ms is not None else 0
+            hi = int(np.searchsorted(ts, end_ms, side="right")) if end_ms is not None else len(mm)
+            return np.array(mm[lo:hi])
+
+    def latest(self, symbol: str, interval: str, limit: int = 100) -> np.ndarray:
+        with self._lock:
+            mm = self._view(symbol, interval)
+            return np.array(mm[-limit:]) if limit > 0 else np.empty(0, dtype=RECORD)
+
+    def gaps(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """(last ts before, first ts after) for each run of missing bars inside the series"""
+        step = INTERVAL_MS.get(interval)
+        with self._lock:
+            ts = self._view(symbol, interval)["ts"]
+            if not step or len(ts) < 2:
+                return []
+            idx = np.nonzero(np.diff(ts) > step)[0]
+            return [(int(ts[i]), int(ts[i + 1])) for i in idx]
+    
+    def bounds(self, symbol: str, interval: str) -> Optional[Tuple[int, int]]:
+        """(first ts, last ts) in ms, or None if nothing is stored"""
+        with self._lock:
+            mm = self._view(symbol, interval)
+            if not len(mm):
+                return None
+            return int(mm["ts"][0]), int(mm["ts"][-1])
+
+    # ==================== Backfill ====================
+
+    async def _page_back(self, symbol: str, interval: str, end_ms: Optional[int], stop_ms: int) -> int:
+        """Fetch pages backwards from end_ms until stop_ms or history runs out"""
+        from data.weex_client import weex_client
+
+        added = 0
+        while True:
+            page = await weex_client.get_history_klines(symbol, interval, end_time=end_ms, limit=self.page_size)
+            if not page:
+                break
+            added += await asyncio.to_thread(self.write, symbol, interval, page)
+            oldest = int(page[0].timestamp.timestamp() * 1000)
+            if oldest <= stop_ms or (end_ms is not None and oldest >= end_ms):
+                break
+            end_ms = oldest - 1
+        return added
+
+    async def catch_up(self, symbol: str, interval: str, since_ms: int) -> int:
+        """Download everything from since_ms up to now (newest page first)"""
+        added = await self._page_back(symbol, interval, None, since_ms)
+        self.bars_backfilled += added
+        return added
+    
+    async def backfill(self, symbol: str, interval: str = "5m", days: float = settings.candle_backfill_days) -> int:
+        """
+        Make sure the archive covers the last `days` of bars.
+        Only what's missing is downloaded: before the first stored bar, after
+        the last one, and any holes in between (e.g. from an interrupted fill).
+        """
+        start_ms = int((time.time() - days * 86400) * 1000)
+        stored = await asyncio.to_thread(self.bounds, symbol, interval)
+
+        if stored is None:
+            added = await self._page_back(symbol, interval, None, start_ms)
+        else:
+            first, last = stored
+            added = await self._page_back(symbol, interval, None, last)
+            if first > start_ms:
+                added += await self._page_back(symbol, interval, first - 1, start_ms)
+            for before, after in await asyncio.to_thread(self.gaps, symbol, interval):
+                if after > start_ms:
+                    added += await self._page_back(symbol, interval, after - 1, before)
+
+        self.bars_backfilled += added
+        print(f"Candle archive: backfilled {added} {interval} bars for {symbol}")
+        return added
+
+    def get_stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "series": len(self._maps),
+            "bars_written": self.bars_written,
+            "bars_backfilled": self.bars_backfilled,
+        }
+
+
+# Singleton instance
+candle_archive = CandleArchive()
@@ -141,6 +141,7 @@ class TradeDecision(BaseModel):
     stop_loss_pct: float
     take_profit_pct: float
     reasoning: str
+    trailing_stop_pct: Optional[float] = None
 
 
 class Position(BaseModel):
@@ -155,6 +156,7 @@ class Position(BaseModel):
     unrealized_pnl_pct: float
     stop_loss: Optional[float] = None
     take_profit: Optional[float] = None
+    trailing_stop_pct: Optional[float] = None
     opened_at: datetime
 
 
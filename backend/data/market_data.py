@@ -1,118 +1,94 @@
 """
 Market data service for aggregating and caching data
-Includes mock data fallback for demo mode
+Reads from a pluggable MarketDataSource, with mock data fallback for demo mode
 """
 import asyncio
-import random
-from typing import Optional, List, Dict
+import time
+from typing import Optional, List, Dict, Callable, Any, Tuple
 from datetime import datetime, timedelta
-from data.weex_client import weex_client
-from data.data_models import MarketData, Candle, OrderBook, OrderBookLevel, Ticker
+from data.data_models import MarketData, Candle, OrderBook, Ticker
+from data.sources import MarketDataSource, SyntheticSource, create_source
 from config.settings import settings
 
 
 def generate_mock_candles(base_price: float = 98500, count: int = 100) -> List[Candle]:
     """Generate realistic mock candlestick data"""
-    candles = []
-    price = base_price
-    now = datetime.now()
-    
-    for i in range(count, 0, -1):
-        volatility = 0.002
-        change = (random.random() - 0.48) * volatility * price
-        
-        open_p = price
-        close_p = price + change
-        high_p = max(open_p, close_p) + random.random() * 50
-        low_p = min(open_p, close_p) - random.random() * 50
-        volume = random.uniform(100, 500)
-        
-        candles.append(Candle(
-            timestamp=now - timedelta(minutes=i * 5),
-            open=open_p,
-            high=high_p,
-            low=low_p,
-            close=close_p,
-            volume=volume
-        ))
-        
-        price = close_p
-    
-    return candles
+    from data.synthetic import synthetic_market
+    return synthetic_market.candles(base_price, count)
 
 
 def generate_mock_ticker(symbol: str, last_candle: Candle) -> Ticker:
     """Generate mock ticker from candle data"""
-    return Ticker(
-        symbol=symbol,
-        last_price=last_candle.close,
-        bid=last_candle.close - random.uniform(0.5, 2),
-        ask=last_candle.close + random.uniform(0.5, 2),
-        volume_24h=random.uniform(1000000, 5000000),
-        change_24h=random.uniform(-500, 500),
-        change_pct_24h=random.uniform(-2, 2),
-        high_24h=last_candle.close + random.uniform(100, 300),
-        low_24h=last_candle.close - random.uniform(100, 300),
-        timestamp=datetime.now()
-    )
+    from data.synthetic import synthetic_market
+    return synthetic_market.ticker(symbol, last_candle)
 
 
 def generate_mock_orderbook(base_price: float) -> OrderBook:
     """Generate mock order book"""
-    bids = []
-    asks = []
-    
-    for i in range(10):
-        bid_price = base_price - (i + 1) * random.uniform(1, 5)
-        ask_price = base_price + (i + 1) * random.uniform(1, 5)
-        
-        bids.append(OrderBookLevel(
-            price=bid_price,
-            quantity=random.uniform(0.1, 2.0)
-        ))
-        asks.append(OrderBookLevel(
-            price=ask_price,
-            quantity=random.uniform(0.1, 2.0)
-        ))
-    
-    return OrderBook(
-        symbol="cmt_btcusdt",
-        timestamp=datetime.now(),
-        bids=bids,
-        asks=asks
-    )
+    from data.synthetic import synthetic_market
+    return synthetic_market.orderbook(base_price)
 
 
 class MarketDataService:
     """
-    Aggregates market data from WEEX and provides a unified interface
+    Aggregates market data from the configured source and provides a unified interface
     Falls back to mock data for demo mode
     """
     
-    def __init__(self):
+    def __init__(self, source: Optional[MarketDataSource] = None):
+        self.source: MarketDataSource = source or create_source(settings.market_data_source)
+        self._fallback = SyntheticSource()
         self._candle_cache: Dict[str, List[Candle]] = {}
         self._orderbook_cache: Dict[str, OrderBook] = {}
         self._ticker_cache: Dict[str, Ticker] = {}
         self._funding_cache: Dict[str, float] = {}
         self._last_update: Dict[str, datetime] = {}
-        self._cache_ttl = timedelta(seconds=5)
-        # Check if WEEX credentials are properly configured
-        self._use_mock = not settings.weex_api_key or settings.weex_api_key == "your_api_key" or len(settings.weex_api_key) < 10
-        print(f"MarketDataService initialized - Using {'MOCK' if self._use_mock else 'REAL WEEX'} data")
-        if not self._use_mock:
+        self._cache_ttl = timedelta(seconds=self.source.cache_ttl)
+        # Called as callback(kind, symbol, payload) whenever fresh data arrives
+        self._listeners: List[Callable[[str, str, Any], None]] = []
+        self._use_mock = isinstance(self.source, SyntheticSource)
+        # Real feeds keep candles in the local archive and only fetch the bars since the last one
+        self._archive_candles = settings.candle_archive_enabled and self.source.name in ("weex", "weex_ws", "public")
+        # Background archive catch-ups after downtime, one per (symbol, interval)
+        self._catch_ups: Dict[Tuple[str, str], asyncio.Task] = {}
+        print(f"MarketDataService initialized - Using {'MOCK' if self._use_mock else self.source.name.upper()} data")
+        if self.source.name.startswith("weex"):
             print(f"   WEEX API Key: {settings.weex_api_key[:10]}...")
 
     
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached data is still valid"""
+    def _is_cache_valid(self, key: str, max_age: Optional[float] = None) -> bool:
+        """Check if cached data is still valid (optionally against a tighter max age in seconds)"""
         if key not in self._last_update:
             return False
-        return datetime.now() - self._last_update[key] < self._cache_ttl
+        ttl = timedelta(seconds=max_age) if max_age is not None else self._cache_ttl
+        return datetime.now() - self._last_update[key] < ttl
+    
+    def add_listener(self, callback: Callable[[str, str, Any], None]):
+        """
+        Register a callback for market data updates.
+        Called synchronously as callback(kind, symbol, payload) where kind is
+        "ticker", "candles" or "orderbook"; callbacks must be cheap. For
+        "candles" the payload is (interval, candles).
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, str, Any], None]):
+        """Unregister a market data callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, kind: str, symbol: str, payload: Any):
+        """Publish a fresh update to all listeners"""
+        for callback in self._listeners:
+            try:
+                callback(kind, symbol, payload)
+            except Exception as e:
+                print(f"Error in market data listener: {e}")
     
     async def get_market_data(self, symbol: str) -> MarketData:
         """
         Get aggregated market data for a symbol
-        Uses mock data if WEEX credentials aren't configured
+        Uses mock data if the source is synthetic
         """
         if self._use_mock:
             return await self._get_mock_market_data(symbol)
@@ -139,19 +115,14 @@ class MarketDataService:
     
     async def _get_mock_market_data(self, symbol: str) -> MarketData:
         """Generate mock market data for demo purposes"""
-        candles = generate_mock_candles()
-        last_candle = candles[-1] if candles else Candle(
-            timestamp=datetime.now(),
-            open=98500, high=98600, low=98400, close=98550, volume=100
-        )
+        mock = self.source if self._use_mock else self._fallback
+        market_data = mock.snapshot(symbol)
+        
+        self._notify("ticker", symbol, market_data.ticker)
+        self._notify("candles", symbol, ("5m", market_data.candles))
+        self._notify("orderbook", symbol, market_data.orderbook)
         
-        return MarketData(
-            symbol=symbol,
-            ticker=generate_mock_ticker(symbol, last_candle),
-            candles=candles,
-            orderbook=generate_mock_orderbook(last_candle.close),
-            funding_rate=random.uniform(-0.001, 0.001)
-        )
+        return market_data
     
     async def get_ticker(self, symbol: str) -> Ticker:
         """Get ticker with caching"""
@@ -159,11 +130,40 @@ class MarketDataService:
         if self._is_cache_valid(cache_key):
             return self._ticker_cache[symbol]
         
-        ticker = await weex_client.get_ticker(symbol)
+        ticker = await self.source.get_ticker(symbol)
         self._ticker_cache[symbol] = ticker
         self._last_update[cache_key] = datetime.now()
+        self._notify("ticker", symbol, ticker)
         return ticker
     
+    async def get_tickers(
+        self, 
+        symbols: List[str], 
+        max_age: Optional[float] = None
+    ) -> Dict[str, Ticker]:
+        """
+        Get tickers for many symbols, serving fresh ones from the cache
+        and fetching the rest in a single bulk request
+        """
+        tickers: Dict[str, Ticker] = {}
+        missing = []
+        for symbol in symbols:
+            if self._is_cache_valid(f"ticker_{symbol}", max_age):
+                tickers[symbol] = self._ticker_cache[symbol]
+            else:
+                missing.append(symbol)
+        
+        if missing:
+            fetched = await self.source.get_tickers(missing)
+            now = datetime.now()
+            for symbol, ticker in fetched.items():
+                self._ticker_cache[symbol] = ticker
+                self._last_update[f"ticker_{symbol}"] = now
+                tickers[symbol] = ticker
+                self._notify("ticker", symbol, ticker)
+        
+        return tickers
+    
     async def get_candles(
         self, 
         symbol: str, 
@@ -175,20 +175,65 @@ class MarketDataService:
         if self._is_cache_valid(cache_key):
             return self._candle_cache.get(cache_key, [])
         
-        candles = await weex_client.get_klines(symbol, interval, limit)
+        if self._archive_candles:
+            candles = await self._get_archived_candles(symbol, interval, limit)
+        else:
+            candles = await self.source.get_candles(symbol, interval, limit)
         self._candle_cache[cache_key] = candles
         self._last_update[cache_key] = datetime.now()
+        self._notify("candles", symbol, (interval, candles))
         return candles
     
+    async def _get_archived_candles(self, symbol: str, interval: str, limit: int) -> List[Candle]:
+        """Top up the archive with bars since its last one, then serve the tail from it"""
+        from data.candle_archive import candle_archive, INTERVAL_MS  # numpy, loaded on first use
+        
+        # Archive reads and writes are blocking file I/O, so they run off the event loop
+        stored = await asyncio.to_thread(candle_archive.bounds, symbol, interval)
+        step = INTERVAL_MS.get(interval)
+        fetch_limit = limit
+        if stored is not None and step:
+            # Bars since the last stored one, plus that one (it may still have been forming)
+            missing = int((time.time() * 1000 - stored[1]) // step) + 1
+            if missing > limit:
+                # Down for longer than one page: serve the latest page now and page
+                # history back to the stored tail in the background to fill the hole
+                self._start_catch_up(symbol, interval, stored[1])
+            fetch_limit = min(limit, max(missing, 1) + 1)
+        
+        recent = await self.source.get_candles(symbol, interval, fetch_limit)
+        await asyncio.to_thread(candle_archive.write, symbol, interval, recent)
+        records = await asyncio.to_thread(candle_archive.latest, symbol, interval, limit)
+        return candle_archive.to_candles(records)
+    
+    def _start_catch_up(self, symbol: str, interval: str, since_ms: int):
+        """Page archive history since since_ms in a background task (once per series)"""
+        from data.candle_archive import candle_archive
+        
+        key = (symbol, interval)
+        if key in self._catch_ups:
+            return
+        
+        async def run():
+            try:
+                await candle_archive.catch_up(symbol, interval, since_ms)
+            except Exception as e:
+                print(f"Candle archive catch-up failed for {symbol} {interval}: {e}")
+        
+        task = asyncio.get_running_loop().create_task(run())
+        self._catch_ups[key] = task
+        task.add_done_callback(lambda _: self._catch_ups.pop(key, None))
+    
     async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
         """Get orderbook with caching"""
         cache_key = f"orderbook_{symbol}"
         if self._is_cache_valid(cache_key):
             return self._orderbook_cache[symbol]
         
-        orderbook = await weex_client.get_orderbook(symbol, depth)
+        orderbook = await self.source.get_orderbook(symbol, depth)
         self._orderbook_cache[symbol] = orderbook
         self._last_update[cache_key] = datetime.now()
+        self._notify("orderbook", symbol, orderbook)
         return orderbook
     
     async def get_funding_rate(self, symbol: str) -> float:
@@ -197,7 +242,7 @@ class MarketDataService:
         if self._is_cache_valid(cache_key):
             return self._funding_cache.get(symbol, 0)
         
-        funding = await weex_client.get_funding_rate(symbol)
+        funding = await self.source.get_funding_rate(symbol)
         self._funding_cache[symbol] = funding
         self._last_update[cache_key] = datetime.now()
         return funding
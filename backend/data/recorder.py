@@ -0,0 +1,347 @@
+"""
+Market Recorder - Captures tickers, candles and order books as the agents saw them
+Compressed columnar files per symbol per day, written by a background thread
+"""
+import atexit
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+from config.settings import settings
+
+
+# File: MAGIC, u16 symbol length, symbol utf-8, then blocks.
+# Block: BLOCK_MAGIC, u8 kind, 8-byte interval (candles; NUL-padded, empty otherwise),
+# u32 rows, u32 compressed length, zlib(columns).
+MAGIC = b"MDREC1"
+BLOCK_MAGIC = b"MB"
+BLOCK_HEADER = struct.Struct("<2sB8sII")
+SYMBOL_HEADER = struct.Struct("<H")
+FILE_SUFFIX = ".mdrec"
+
+KIND_TICKER = 1
+KIND_CANDLE = 2
+KIND_ORDERBOOK = 3
+KIND_NAMES = {KIND_TICKER: "ticker", KIND_CANDLE: "candle", KIND_ORDERBOOK: "orderbook"}
+
+# Float64 columns per kind, stored one after another
+TICKER_COLUMNS = [
+    "ts", "timestamp", "last_price", "bid", "ask", "volume_24h", "change_24h", "change_pct_24h", "high_24h", "low_24h"
+]
+CANDLE_COLUMNS = ["ts", "timestamp", "open", "high", "low", "close", "volume"]
+# Order books: ts (f64), bid/ask level counts (u16), then flattened bid/ask price and quantity (f64)
+
+
+def _pack_columns(columns: List[array]) -> bytes:
+    return b"".join(col.tobytes() for col in columns)
+
+
+def _unpack_columns(payload: bytes, typecodes: List[str], lengths: List[int]) -> List[array]:
+    columns = []
+    offset = 0
+    for typecode, length in zip(typecodes, lengths):
+        col = array(typecode)
+        size = col.itemsize * length
+        col.frombytes(payload[offset:offset + size])
+        columns.append(col)
+        offset += size
+    return columns
+
+
+def encode_block(kind: int, rows: List[Tuple], interval: str = "") -> bytes:
+    """Encode rows of one kind (and candle interval) as a compressed columnar block"""
+    if kind == KIND_ORDERBOOK:
+        # rows: (ts, [(bid_px, bid_qty), ...], [(ask_px, ask_qty), ...])
+        columns = [
+            array("d", (r[0] for r in rows)),
+            array("H", (len(r[1]) for r in rows)),
+            array("H", (len(r[2]) for r in rows)),
+            array("d", (p for r in rows for p, _ in r[1])),
+            array("d", (q for r in rows for _, q in r[1])),
+            array("d", (p for r in rows for p, _ in r[2])),
+            array("d", (q for r in rows for _, q in r[2])),
+        ]
+    else:
+        width = len(TICKER_COLUMNS) if kind == KIND_TICKER else len(CANDLE_COLUMNS)
+        columns = [array("d", (r[i] for r in rows)) for i in range(width)]
+
+    payload = zlib.compress(_pack_columns(columns), 6)
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, kind, interval.encode(), len(rows), len(payload)) + payload
+
+
+def decode_block(kind: int, n: int, payload: bytes) -> Iterator[Tuple[float, str, Dict[str, Any]]]:
+    """Decode a block back into (ts, kind, data) rows"""
+    raw = zlib.decompress(payload)
+    if kind == KIND_ORDERBOOK:
+        ts, n_bids, n_asks = _unpack_columns(raw, ["d", "H", "H"], [n, n, n])
+        head = (8 + 2 + 2) * n
+        total_bids, total_asks = sum(n_bids), sum(n_asks)
+        bid_px, bid_qty, ask_px, ask_qty = _unpack_columns(
+            raw[head:], ["d", "d", "d", "d"], [total_bids, total_bids, total_asks, total_asks]
+        )
+        b = a = 0
+        for i in range(n):
+            yield ts[i], "orderbook", {
+                "timestamp": datetime.fromtimestamp(ts[i]),
+                "bids": [{"price": bid_px[j], "quantity": bid_qty[j]} for j in range(b, b + n_bids[i])],
+                "asks": [{"price": ask_px[j], "quantity": ask_qty[j]} for j in range(a, a + n_asks[i])],
+            }
+            b += n_bids[i]
+            a += n_asks[i]
+    else:
+        names = TICKER_COLUMNS if kind == KIND_TICKER else CANDLE_COLUMNS
+        columns = _unpack_columns(raw, ["d"] * len(names), [n] * len(names))
+        for i in range(n):
+            row = {name: col[i] for name, col in zip(names[1:], columns[1:])}
+            row["timestamp"] = datetime.fromtimestamp(row["timestamp"])
+            yield columns[0][i], KIND_NAMES[kind], row
+
+
+def _scan(mm) -> Tuple[Optional[str], int, List[Tuple[int, str, int, int, int]]]:
+    """
+    Walk a recording's headers: (symbol, end of the last complete block,
+    [(kind, interval, rows, payload offset, payload length)]). symbol is None
+    if the file header itself is incomplete or not a recording.
+    """
+    if bytes(mm[:len(MAGIC)]) != MAGIC or len(mm) < len(MAGIC) + SYMBOL_HEADER.size:
+        return None, 0, []
+    offset = len(MAGIC)
+    (symbol_len,) = SYMBOL_HEADER.unpack_from(mm, offset)
+    offset += SYMBOL_HEADER.size
+    if offset + symbol_len > len(mm):
+        return None, 0, []
+    symbol = bytes(mm[offset:offset + symbol_len]).decode()
+    offset += symbol_len
+
+    blocks = []
+    while offset + BLOCK_HEADER.size <= len(mm):
+        block_magic, kind, interval, n, length = BLOCK_HEADER.unpack_from(mm, offset)
+        start = offset + BLOCK_HEADER.size
+        if block_magic != BLOCK_MAGIC or start + length > len(mm):
+            break  # Torn write at the tail
+        blocks.append((kind, interval.rstrip(b"\0").decode(), n, start, length))
+        offset = start + length
+    return symbol, offset, blocks
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read a recording file through mmap, yielding replay records
+    ({"ts", "kind", "symbol", "data"}) in time order.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            symbol, _, blocks = _scan(mm)
+            if symbol is None:
+                raise ValueError(f"{path} is not a market recording")
+
+            rows: List[Tuple[float, str, str, Dict[str, Any]]] = []
+            for kind, interval, n, start, length in blocks:
+                rows.extend(
+                    (ts, row_kind, interval, data)
+                    for ts, row_kind, data in decode_block(kind, n, mm[start:start + length])
+                )
+
+    # Blocks are per kind and flush, so merge kinds back into time order
+    rows.sort(key=lambda r: r[0])
+    for ts, kind, interval, data in rows:
+        data["symbol"] = symbol
+        record = {"ts": ts, "kind": kind, "symbol": symbol, "data": data}
+        if interval:
+            record["interval"] = interval
+        yield record
+
+
+class MarketRecorder:
+    """
+    Records MarketDataService updates to disk.
+
+    The listener only appends the raw update to a bounded deque, so the feed
+    never waits on disk; when the buffer is full the oldest updates are dropped
+    and counted. A flush thread drains the buffer every `flush_seconds`,
+    converts updates to columns, and appends one compressed block per
+    (symbol, day, kind, candle interval) to {directory}/{symbol}/{YYYY-MM-DD}.mdrec.
+    Candle lists are de-duplicated per (symbol, interval): only bars at or
+    after the last recorded bar of that series are written.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.recorder_path,
+        buffer_size: int = settings.recorder_buffer_size,
+        flush_seconds: float = settings.recorder_flush_seconds
+    ):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._buffer: Deque[Tuple[float, str, str, Any]] = deque(maxlen=buffer_size)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_candle_ts: Dict[Tuple[str, str], float] = {}
+        self._checked: Set[str] = set()
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Subscribe to market data updates and start the flush thread"""
+        if self.is_running:
+            return
+        from data.market_data import market_data_service
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="market-recorder", daemon=True)
+        self._thread.start()
+        market_data_service.add_listener(self.on_market_update)
+        atexit.register(self.close)
+        print(f"Market recorder writing to {self.directory}")
+
+    def on_market_update(self, kind: str, symbol: str, payload: Any):
+        """MarketDataService listener - O(1), no I/O"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((time.time(), kind, symbol, payload))
+
+    def close(self):
+        """Unsubscribe, flush what's buffered and stop the thread"""
+        if not self.is_running:
+            return
+        from data.market_data import market_data_service
+
+        market_data_service.remove_listener(self.on_market_update)
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self._flush()
+        self._flush()
+
+    # ==================== Writing ====================
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        started = time.monotonic()
+
+        # (symbol, day) -> (kind, interval) -> rows
+        groups: Dict[Tuple[str, str], Dict[Tuple[int, str], List[Tuple]]] = {}
+        while self._buffer:
+            try:
+                ts, kind, symbol, payload = self._buffer.popleft()
+            except IndexError:
+                break
+            try:
+                for day, block_key, row in self._rows(ts, kind, symbol, payload):
+                    groups.setdefault((symbol, day), {}).setdefault(block_key, []).append(row)
+            except Exception as e:
+                print(f"Market recorder skipped a {kind} update for {symbol}: {e}")
+
+        for (symbol, day), kinds in groups.items():
+            try:
+                self._append(symbol, day, kinds)
+            except Exception as e:
+                print(f"Market recorder failed to write {symbol} {day}: {e}")
+
+        self.flushes += 1
+        self.last_flush_ms = (time.monotonic() - started) * 1000
+
+    @staticmethod
+    def _day(ts: float) -> str:
+        return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+    def _rows(self, ts: float, kind: str, symbol: str, payload: Any) -> Iterator[Tuple[str, Tuple[int, str], Tuple]]:
+        day = self._day(ts)
+        if kind == "ticker":
+            self.recorded += 1
+            yield day, (KIND_TICKER, ""), (ts, payload.timestamp.timestamp()) + tuple(
+                float(getattr(payload, name)) for name in TICKER_COLUMNS[2:]
+            )
+        elif kind == "orderbook":
+            self.recorded += 1
+            yield day, (KIND_ORDERBOOK, ""), (
+                ts,
+                [(lvl.price, lvl.quantity) for lvl in payload.bids],
+                [(lvl.price, lvl.quantity) for lvl in payload.asks],
+            )
+        elif kind == "candles":
+            interval, candles = payload
+            series = (symbol, interval)
+            last = self._last_candle_ts.get(series, 0.0)
+            for candle in candles:
+                bar_ts = candle.timestamp.timestamp()
+                if bar_ts < last:
+                    continue
+                last = bar_ts
+                self.recorded += 1
+                yield day, (KIND_CANDLE, interval), (ts, bar_ts, candle.open, candle.high, candle.low, candle.close, candle.volume)
+            self._last_candle_ts[series] = last
+
+    def _path(self, symbol: str, day: str) -> str:
+        return os.path.join(self.directory, symbol.replace("/", "-"), f"{day}{FILE_SUFFIX}")
+
+    def _prepare(self, path: str):
+        """
+        First write to a file this run: cut off a torn tail left by a crash so
+        blocks appended now stay readable
+        """
+        self._checked.add(path)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "r+b") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                symbol, valid_end, _ = _scan(mm)
+                size = len(mm)
+            if symbol is None:
+                valid_end = 0  # Crashed while writing the file header
+            if valid_end < size:
+                print(f"Market recorder: truncating torn tail of {path} ({size - valid_end} bytes)")
+                f.truncate(valid_end)
+
+    def _append(self, symbol: str, day: str, kinds: Dict[Tuple[int, str], List[Tuple]]):
+        path = self._path(symbol, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path not in self._checked:
+            self._prepare(path)
+        data = b"".join(encode_block(kind, rows, interval) for (kind, interval), rows in kinds.items())
+
+        with open(path, "ab") as f:
+            if f.tell() == 0:
+                encoded = symbol.encode()
+                data = MAGIC + SYMBOL_HEADER.pack(len(encoded)) + encoded + data
+            f.write(data)
+        self.bytes_written += len(data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "directory": self.directory,
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "bytes_written": self.bytes_written,
+            "flushes": self.flushes,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+# Singleton instance
+market_recorder = MarketRecorder()
@@ -0,0 +1,678 @@
+"""
+Market data sources behind a common interface
+WEEX REST/WebSocket, public APIs (CoinGecko + Binance), synthetic data and file replay
+"""
+import asyncio
+import glob
+import gzip
+import heapq
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+import httpx
+
+from data.weex_client import weex_client
+from data.data_models import MarketData, Candle, OrderBook, OrderBookLevel, Ticker
+from data.recorder import FILE_SUFFIX, read_records
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@runtime_checkable
+class MarketDataSource(Protocol):
+    """
+    What MarketDataService needs from a feed.
+    `cache_ttl` is how long (seconds) the service may reuse a result; 0 means
+    the source is local or push-based and should be asked every time.
+    """
+    name: str
+    cache_ttl: float
+
+    async def get_ticker(self, symbol: str) -> Ticker: ...
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]: ...
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]: ...
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook: ...
+
+    async def get_funding_rate(self, symbol: str) -> float: ...
+
+
+# ==================== WEEX ====================
+
+class WeexRestSource:
+    """WEEX contract REST API"""
+
+    name = "weex"
+    cache_ttl = 5.0
+
+    async def get_ticker(self, symbol: str) -> Ticker:
+        return await weex_client.get_ticker(symbol)
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]:
+        return await weex_client.get_tickers(symbols)
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]:
+        return await weex_client.get_klines(symbol, interval, limit)
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
+        return await weex_client.get_orderbook(symbol, depth)
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        return await weex_client.get_funding_rate(symbol)
+
+
+class WeexWebSocketSource:
+    """
+    WEEX WebSocket push feed for tickers and order books.
+    Symbols are subscribed on first request; until the first push arrives (or
+    when the feed goes quiet for `stale_after` seconds) requests fall through
+    to REST. Candles and funding always come from REST, cached briefly here
+    since the service doesn't cache push sources.
+    """
+
+    name = "weex_ws"
+    cache_ttl = 0.0
+
+    TICKER_CHANNEL = "ticker.{symbol}"
+    DEPTH_CHANNEL = "depth.{symbol}"
+
+    def __init__(self, rest: Optional[WeexRestSource] = None, stale_after: float = 10.0):
+        self.rest = rest or WeexRestSource()
+        self.stale_after = stale_after
+        self._connected = False
+        self._connect_lock = asyncio.Lock()
+        self._subscribed: set = set()
+        self._tickers: Dict[str, Tuple[float, Ticker]] = {}
+        self._orderbooks: Dict[str, Tuple[float, OrderBook]] = {}
+        self._rest_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+
+    async def _ensure_subscribed(self, symbol: str):
+        if symbol in self._subscribed:
+            return
+        async with self._connect_lock:
+            if symbol in self._subscribed:
+                return
+            try:
+                if not self._connected:
+                    await weex_client.connect_websocket()
+                    self._connected = True
+                await weex_client.subscribe(
+                    self.TICKER_CHANNEL.format(symbol=symbol),
+                    lambda msg: self._on_ticker(symbol, msg)
+                )
+                await weex_client.subscribe(
+                    self.DEPTH_CHANNEL.format(symbol=symbol),
+                    lambda msg: self._on_depth(symbol, msg)
+                )
+                self._subscribed.add(symbol)
+            except Exception as e:
+                logger.warning(f"WEEX WebSocket subscribe failed for {symbol}: {e}. Using REST.")
+
+    @staticmethod
+    def _payload(msg: Dict[str, Any]) -> Any:
+        data = msg.get("data", msg)
+        if isinstance(data, list) and data:
+            data = data[0]
+        return data
+
+    async def _on_ticker(self, symbol: str, msg: Dict[str, Any]):
+        try:
+            self._tickers[symbol] = (time.monotonic(), weex_client._parse_ticker(symbol, self._payload(msg)))
+        except Exception as e:
+            logger.debug(f"Unparseable WEEX ticker push: {e}")
+
+    async def _on_depth(self, symbol: str, msg: Dict[str, Any]):
+        try:
+            data = self._payload(msg)
+            self._orderbooks[symbol] = (time.monotonic(), OrderBook(
+                symbol=symbol,
+                timestamp=datetime.now(),
+                bids=[OrderBookLevel(price=float(b[0]), quantity=float(b[1])) for b in data.get("bids", [])],
+                asks=[OrderBookLevel(price=float(a[0]), quantity=float(a[1])) for a in data.get("asks", [])]
+            ))
+        except Exception as e:
+            logger.debug(f"Unparseable WEEX depth push: {e}")
+
+    def _fresh(self, pushed: Optional[Tuple[float, Any]]) -> Optional[Any]:
+        if pushed and time.monotonic() - pushed[0] < self.stale_after:
+            return pushed[1]
+        return None
+
+    async def _rest_cached(self, kind: str, symbol: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._rest_cache.get((kind, symbol))
+        if cached and time.monotonic() - cached[0] < self.rest.cache_ttl:
+            return cached[1]
+        result = await fetch()
+        self._rest_cache[(kind, symbol)] = (time.monotonic(), result)
+        return result
+
+    async def get_ticker(self, symbol: str) -> Ticker:
+        await self._ensure_subscribed(symbol)
+        ticker = self._fresh(self._tickers.get(symbol))
+        if ticker is None:
+            ticker = await self._rest_cached("ticker", symbol, lambda: self.rest.get_ticker(symbol))
+        return ticker
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]:
+        for symbol in symbols:
+            await self._ensure_subscribed(symbol)
+        tickers = {}
+        for symbol in symbols:
+            ticker = self._fresh(self._tickers.get(symbol))
+            if ticker is not None:
+                tickers[symbol] = ticker
+        missing = [s for s in symbols if s not in tickers]
+        if missing:
+            tickers.update(await self.rest.get_tickers(missing))
+        return tickers
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]:
+        return await self._rest_cached(
+            f"candles_{interval}_{limit}", symbol,
+            lambda: self.rest.get_candles(symbol, interval, limit)
+        )
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
+        await self._ensure_subscribed(symbol)
+        orderbook = self._fresh(self._orderbooks.get(symbol))
+        if orderbook is None:
+            return await self._rest_cached(f"orderbook_{depth}", symbol, lambda: self.rest.get_orderbook(symbol, depth))
+        return OrderBook(
+            symbol=orderbook.symbol,
+            timestamp=orderbook.timestamp,
+            bids=orderbook.bids[:depth],
+            asks=orderbook.asks[:depth]
+        )
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        return await self._rest_cached("funding", symbol, lambda: self.rest.get_funding_rate(symbol))
+
+
+# ==================== Public APIs (CoinGecko + Binance) ====================
+
+# Base asset -> CoinGecko id
+COINGECKO_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "SOL": "solana",
+    "DOGE": "dogecoin",
+    "XRP": "ripple",
+    "ADA": "cardano",
+    "BNB": "binancecoin",
+    "LTC": "litecoin",
+}
+
+
+class PublicApiSource:
+    """
+    Free public APIs, no keys: CoinGecko price and Binance depth, klines and funding.
+    Accepts both "BTC/USDT" and "cmt_btcusdt" style symbols. Each endpoint is
+    cached per symbol with its own TTL and fetched under its own deadline;
+    concurrent requests for the same endpoint share one fetch. A failed or late
+    fetch serves the last cached value, then the defaults.
+    """
+
+    name = "public"
+    cache_ttl = 5.0
+
+    # Per-endpoint freshness and deadline (seconds)
+    SOURCE_TTL = {"price": 10.0, "depth": 2.0, "funding": 60.0, "klines": 30.0}
+    SOURCE_DEADLINE = {"price": 3.0, "depth": 2.0, "funding": 3.0, "klines": 3.0}
+
+    DEPTH_LIMIT = 20
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        # (endpoint, key) -> (fetched_at, result)
+        self._cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _resolve(symbol: str) -> Tuple[str, str]:
+        """Symbol -> (CoinGecko id, Binance symbol); unknown symbols map to BTC"""
+        pair = symbol.upper().replace("CMT_", "").replace("/", "")
+        base = pair[:-4] if pair.endswith("USDT") else pair
+        if base not in COINGECKO_IDS:
+            base = "BTC"
+        return COINGECKO_IDS[base], f"{base}USDT"
+
+    async def _cached_fetch(self, source: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Serve an endpoint from cache while fresh, otherwise fetch it within the
+        endpoint's deadline. Returns None if there's nothing to serve.
+        """
+        cached = self._cache.get((source, key))
+        if cached and time.monotonic() - cached[0] < self.SOURCE_TTL[source]:
+            return cached[1]
+
+        task = self._inflight.get((source, key))
+        if task is None:
+            task = asyncio.create_task(self._fetch(source, key, fetch))
+            self._inflight[(source, key)] = task
+            task.add_done_callback(lambda _: self._inflight.pop((source, key), None))
+        result = await asyncio.shield(task)
+
+        if result is None:
+            return cached[1] if cached else None
+        return result
+
+    async def _fetch(self, source: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await asyncio.wait_for(fetch(), timeout=self.SOURCE_DEADLINE[source])
+        except asyncio.TimeoutError:
+            logger.warning(f"{source} fetch for {key} missed its {self.SOURCE_DEADLINE[source]}s deadline.")
+            return None
+        except Exception as e:
+            logger.warning(f"{source} fetch for {key} failed: {e}.")
+            return None
+
+        if result is not None:
+            self._cache[(source, key)] = (time.monotonic(), result)
+        return result
+
+    async def _fetch_price(self, cg_id: str) -> Optional[Dict[str, Any]]:
+        """Price from CoinGecko"""
+        cg_resp = await self._get_client().get(
+            "https://api.coingecko.com/api/v3/simple/price",
+            params={
+                "ids": cg_id,
+                "vs_currencies": "usd",
+                "include_24hr_change": "true",
+                "include_24hr_vol": "true",
+                "include_high_low_24h": "true",
+            }
+        )
+        if cg_resp.status_code != 200:
+            return None
+        return cg_resp.json().get(cg_id) or None
+
+    async def _fetch_depth(self, binance_sym: str) -> Optional[Dict[str, Any]]:
+        """Order book from Binance"""
+        ob_resp = await self._get_client().get(
+            "https://api.binance.com/api/v3/depth",
+            params={"symbol": binance_sym, "limit": self.DEPTH_LIMIT}
+        )
+        if ob_resp.status_code != 200:
+            return None
+        return ob_resp.json()
+
+    async def _fetch_funding(self, binance_sym: str) -> Optional[float]:
+        """Funding rate from Binance Futures"""
+        fr_resp = await self._get_client().get(
+            "https://fapi.binance.com/fapi/v1/fundingRate",
+            params={"symbol": binance_sym, "limit": 1}
+        )
+        if fr_resp.status_code != 200:
+            return None
+        fr_data = fr_resp.json()
+        if not fr_data:
+            return None
+        return float(fr_data[0].get("fundingRate", 0.0001))
+
+    async def _fetch_klines(self, binance_sym: str, interval: str, limit: int) -> Optional[List[list]]:
+        """Candles from Binance"""
+        kl_resp = await self._get_client().get(
+            "https://api.binance.com/api/v3/klines",
+            params={"symbol": binance_sym, "interval": interval, "limit": limit}
+        )
+        if kl_resp.status_code != 200:
+            return None
+        return kl_resp.json()
+
+    async def _depth(self, binance_sym: str) -> Optional[Dict[str, Any]]:
+        return await self._cached_fetch("depth", binance_sym, lambda: self._fetch_depth(binance_sym))
+
+    async def get_ticker(self, symbol: str) -> Ticker:
+        cg_id, binance_sym = self._resolve(symbol)
+        price, depth = await asyncio.gather(
+            self._cached_fetch("price", cg_id, lambda: self._fetch_price(cg_id)),
+            self._depth(binance_sym)
+        )
+
+        last_price = 65000.0
+        high_24h = 66000.0
+        low_24h = 64000.0
+        volume_24h = 5000.0
+        change_pct_24h = 0.0
+        if price:
+            last_price = price.get("usd", last_price)
+            high_24h = price.get("usd_24h_high", last_price * 1.01)
+            low_24h = price.get("usd_24h_low", last_price * 0.99)
+            volume_24h = price.get("usd_24h_vol", 5000000000) / 1_000_000  # millions
+            change_pct_24h = price.get("usd_24h_change", 0.0)
+            logger.info(f"CoinGecko: {symbol} = ${last_price:,.2f} ({change_pct_24h:+.2f}%)")
+        else:
+            logger.warning("CoinGecko price unavailable. Using defaults.")
+
+        bid = last_price - 10
+        ask = last_price + 10
+        if depth and depth.get("bids") and depth.get("asks"):
+            bid = float(depth["bids"][0][0])
+            ask = float(depth["asks"][0][0])
+
+        return Ticker(
+            symbol=symbol,
+            last_price=last_price,
+            high_24h=high_24h,
+            low_24h=low_24h,
+            volume_24h=volume_24h,
+            change_24h=last_price * (change_pct_24h / 100.0),
+            change_pct_24h=change_pct_24h,
+            bid=bid,
+            ask=ask,
+            timestamp=datetime.now()
+        )
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]:
+        tickers = await asyncio.gather(*(self.get_ticker(s) for s in symbols))
+        return dict(zip(symbols, tickers))
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]:
+        _, binance_sym = self._resolve(symbol)
+        klines = await self._cached_fetch(
+            "klines", f"{binance_sym}_{interval}_{limit}",
+            lambda: self._fetch_klines(binance_sym, interval, limit)
+        )
+        return [
+            Candle(
+                timestamp=datetime.fromtimestamp(int(k[0]) / 1000),
+                open=float(k[1]),
+                high=float(k[2]),
+                low=float(k[3]),
+                close=float(k[4]),
+                volume=float(k[5])
+            )
+            for k in klines or []
+        ]
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
+        _, binance_sym = self._resolve(symbol)
+        book = await self._depth(binance_sym)
+
+        bids_list = [OrderBookLevel(price=64990, quantity=1.0)]
+        asks_list = [OrderBookLevel(price=65010, quantity=1.0)]
+        if book:
+            bids_list = [OrderBookLevel(price=float(b[0]), quantity=float(b[1])) for b in book.get("bids", [])[:depth]] or bids_list
+            asks_list = [OrderBookLevel(price=float(a[0]), quantity=float(a[1])) for a in book.get("asks", [])[:depth]] or asks_list
+            logger.info(f"Binance: Bid=${bids_list[0].price:,.2f} Ask=${asks_list[0].price:,.2f} Depth={len(bids_list)}")
+        else:
+            logger.warning("Binance orderbook unavailable. Using defaults.")
+
+        return OrderBook(
+            symbol=symbol,
+            timestamp=datetime.now(),
+            bids=bids_list,
+            asks=asks_list
+        )
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        _, binance_sym = self._resolve(symbol)
+        funding = await self._cached_fetch("funding", binance_sym, lambda: self._fetch_funding(binance_sym))
+        if funding is None:
+            return 0.0001
+        logger.info(f"Binance Funding: {funding*100:.4f}%")
+        return funding
+
+
+# ==================== Synthetic ====================
+
+class SyntheticSource:
+    """
+    Generated data for demo mode and offline runs.
+    `snapshot` advances the symbol's simulated market and returns a consistent
+    ticker/candles/book set; the single-item getters serve from the symbol's
+    latest snapshot.
+    """
+
+    name = "synthetic"
+    cache_ttl = 0.0
+
+    def __init__(self):
+        self._latest: Dict[str, MarketData] = {}
+
+    def snapshot(self, symbol: str) -> MarketData:
+        from data.synthetic import synthetic_market  # numpy, loaded on first use
+        market_data = synthetic_market.snapshot(symbol)
+        self._latest[symbol] = market_data
+        return market_data
+
+    def _current(self, symbol: str) -> MarketData:
+        return self._latest.get(symbol) or self.snapshot(symbol)
+
+    async def get_ticker(self, symbol: str) -> Ticker:
+        return self._current(symbol).ticker
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]:
+        return {symbol: self._current(symbol).ticker for symbol in symbols}
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]:
+        return self._current(symbol).candles[-limit:]
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
+        orderbook = self._current(symbol).orderbook
+        return OrderBook(
+            symbol=orderbook.symbol,
+            timestamp=orderbook.timestamp,
+            bids=orderbook.bids[:depth],
+            asks=orderbook.asks[:depth]
+        )
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        return self._current(symbol).funding_rate
+
+
+# ==================== File Replay ====================
+
+class ReplaySource:
+    """
+    Replays recorded market data from disk.
+
+    `path` is a file or a directory of *.jsonl / *.jsonl.gz files (read in
+    name order). Each line is {"ts": epoch_seconds, "kind": ..., "symbol": ...,
+    "data": ...} with kind one of "ticker", "candle", "candles", "orderbook"
+    or "funding", and data the matching model as JSON. Candle records may carry
+    an "interval" (default "5m"); each interval is replayed as its own series.
+    Records must be in time order across files. Directories may also hold
+    MarketRecorder output ({symbol}/{day}.mdrec), replayed after any JSONL files.
+
+    A replay clock maps wall time onto recorded time at `speed`x; records up
+    to the replay clock are applied on each request. speed <= 0 steps one
+    recorded timestamp per ticker request (other data reads the current step),
+    as fast as the pipeline asks. With `loop` the recording restarts from the
+    top when it runs out.
+    """
+
+    name = "replay"
+    cache_ttl = 0.0
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False, max_candles: int = 1000):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self._records: Optional[Iterator[Dict[str, Any]]] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._wall_start: Optional[float] = None
+        self._ts_start = 0.0
+        self._ts_offset = 0.0  # Added to recorded ts on each loop so time keeps moving forward
+        self._clock = 0.0
+        self._tickers: Dict[str, Ticker] = {}
+        self._candles: Dict[Tuple[str, str], Deque[Candle]] = {}
+        self._orderbooks: Dict[str, OrderBook] = {}
+        self._funding: Dict[str, float] = {}
+        self._max_candles = max_candles
+        self.records_applied = 0
+        self.exhausted = False
+
+    def _files(self) -> List[str]:
+        if os.path.isdir(self.path):
+            return sorted(
+                glob.glob(os.path.join(self.path, "*.jsonl")) +
+                glob.glob(os.path.join(self.path, "*.jsonl.gz")) +
+                glob.glob(os.path.join(self.path, "**", f"*{FILE_SUFFIX}"), recursive=True)
+            )
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _read(self) -> Iterator[Dict[str, Any]]:
+        recordings: Dict[str, List[str]] = {}
+        for file_path in self._files():
+            if file_path.endswith(FILE_SUFFIX):
+                recordings.setdefault(os.path.basename(file_path), []).append(file_path)
+                continue
+            opener = gzip.open if file_path.endswith(".gz") else open
+            with opener(file_path, "rt") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+
+        # Recorder files are one per symbol per day; merge each day's symbols by time
+        for day in sorted(recordings):
+            yield from heapq.merge(*(read_records(p) for p in recordings[day]), key=lambda r: r["ts"])
+
+    def _next_record(self) -> Optional[Dict[str, Any]]:
+        if self._pending is None:
+            if self._records is None:
+                self._records = self._read()
+            self._pending = next(self._records, None)
+            if self._pending is None and self.loop and self.records_applied:
+                # Rewind, continuing the clock from where the recording ended
+                self._ts_offset = self._clock - self._ts_start
+                self._records = self._read()
+                self._pending = next(self._records, None)
+            if self._pending is not None:
+                self._pending["ts"] = float(self._pending["ts"]) + self._ts_offset
+        return self._pending
+
+    def _apply(self, record: Dict[str, Any]):
+        kind, symbol, data = record["kind"], record["symbol"], record["data"]
+        if kind == "ticker":
+            self._tickers[symbol] = Ticker(**data)
+        elif kind == "candle":
+            candle = Candle(**data)
+            series = (symbol, record.get("interval", "5m"))
+            candles = self._candles.setdefault(series, deque(maxlen=self._max_candles))
+            if candles and candles[-1].timestamp == candle.timestamp:
+                candles[-1] = candle  # Update to the forming bar
+            else:
+                candles.append(candle)
+        elif kind == "candles":
+            self._candles[(symbol, record.get("interval", "5m"))] = deque((Candle(**c) for c in data), maxlen=self._max_candles)
+        elif kind == "orderbook":
+            self._orderbooks[symbol] = OrderBook(**data)
+        elif kind == "funding":
+            self._funding[symbol] = float(data)
+        self.records_applied += 1
+
+    def _advance(self, step: bool = False):
+        """Apply every record up to the replay clock"""
+        if self.speed <= 0 and not step and self.records_applied:
+            return
+        first = self._next_record()
+        self.exhausted = first is None
+        if first is None:
+            return
+
+        if self._wall_start is None:
+            self._wall_start = time.monotonic()
+            self._ts_start = first["ts"]
+
+        if self.speed > 0:
+            target = self._ts_start + (time.monotonic() - self._wall_start) * self.speed
+        else:
+            target = first["ts"]
+
+        while True:
+            record = self._next_record()
+            if record is None:
+                self.exhausted = True
+                break
+            if record["ts"] > target:
+                break
+            self._pending = None
+            self._clock = record["ts"]
+            self._apply(record)
+
+    def _require(self, table: Dict[str, Any], symbol: str, kind: str, step: bool = False) -> Any:
+        self._advance(step)
+        if symbol not in table:
+            raise LookupError(f"No recorded {kind} for {symbol} yet")
+        return table[symbol]
+
+    async def get_ticker(self, symbol: str) -> Ticker:
+        return self._require(self._tickers, symbol, "ticker", step=True)
+
+    async def get_tickers(self, symbols: List[str]) -> Dict[str, Ticker]:
+        self._advance(step=True)
+        return {s: self._tickers[s] for s in symbols if s in self._tickers}
+
+    async def get_candles(self, symbol: str, interval: str = "5m", limit: int = 100) -> List[Candle]:
+        self._advance()
+        candles = self._candles.get((symbol, interval))
+        if candles is None:
+            raise LookupError(f"No recorded {interval} candles for {symbol} yet")
+        return list(candles)[-limit:]
+
+    async def get_orderbook(self, symbol: str, depth: int = 20) -> OrderBook:
+        orderbook = self._require(self._orderbooks, symbol, "orderbook")
+        return OrderBook(
+            symbol=orderbook.symbol,
+            timestamp=orderbook.timestamp,
+            bids=orderbook.bids[:depth],
+            asks=orderbook.asks[:depth]
+        )
+
+    async def get_funding_rate(self, symbol: str) -> float:
+        self._advance()
+        return self._funding.get(symbol, 0.0)
+
+
+def create_source(name: str) -> MarketDataSource:
+    """
+    Build the source named in settings.
+    "auto" is WEEX REST when credentials are configured, synthetic otherwise.
+    """
+    name = name.lower()
+    if name == "auto":
+        key = settings.weex_api_key
+        name = "synthetic" if not key or key == "your_api_key" or len(key) < 10 else "weex"
+
+    if name == "weex":
+        return WeexRestSource()
+    if name == "weex_ws":
+        return WeexWebSocketSource()
+    if name == "public":
+        return public_source
+    if name == "synthetic":
+        return SyntheticSource()
+    if name == "replay":
+        return ReplaySource(
+            settings.market_replay_path,
+            speed=settings.market_replay_speed,
+            loop=settings.market_replay_loop
+        )
+    raise ValueError(f"Unknown market data source: {name}")
+
+
+# Singleton - the public-API source is shared with the ZK trigger route
+public_source = PublicApiSource()
@@ -0,0 +1,272 @@
+"""
+Synthetic Market - Seeded, vectorised price generator for demo mode and load tests
+Geometric Brownian motion with jumps and volatility regimes, evolving per symbol
+"""
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.data_models import MarketData, Candle, OrderBook, OrderBookLevel, Ticker
+from config.settings import settings
+
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# Volatility regimes: (annualised vol, annualised drift, volume multiplier)
+REGIMES = np.array([
+    (0.45, 0.05, 0.8),   # Calm
+    (0.90, 0.00, 1.3),   # Active
+    (1.80, -0.20, 2.5),  # Stress
+])
+REGIME_WEIGHTS = np.array([0.6, 0.3, 0.1])
+REGIME_MEAN_BARS = 240
+
+# Jumps: expected count per year and log-size distribution
+JUMP_INTENSITY = 40.0
+JUMP_MEAN = 0.0
+JUMP_STD = 0.015
+
+BASE_VOLUME = 300.0
+
+# Starting prices for known symbols; anything else starts at 100
+BASE_PRICES = {
+    "cmt_btcusdt": 98500.0,
+    "cmt_ethusdt": 3500.0,
+    "cmt_solusdt": 200.0,
+    "cmt_dogeusdt": 0.35,
+    "cmt_xrpusdt": 2.2,
+    "cmt_adausdt": 0.9,
+    "cmt_bnbusdt": 650.0,
+    "cmt_ltcusdt": 100.0,
+}
+
+
+class _SymbolState:
+    """Rolling bar history for one symbol; the last bar is the one forming"""
+
+    def __init__(self, rng: np.random.Generator, bars: Dict[str, np.ndarray], regime: int, regime_left: int):
+        self.rng = rng
+        self.bars = bars
+        self.regime = regime
+        self.regime_left = regime_left
+        self.updated = time.time()
+
+
+class SyntheticMarket:
+    """
+    Generates bars for many symbols without per-element Python loops.
+
+    Each bar's log return is (mu - sigma^2/2)dt + sigma*sqrt(dt)*Z plus a
+    compound-Poisson jump, with (sigma, mu) set by a regime path whose
+    durations are geometric. Per symbol, the generator keeps a seeded RNG and
+    a rolling history: each snapshot appends the bars that have closed since
+    the last one (in wall time) and moves the forming bar by the elapsed
+    fraction of a bar, so indicators see one continuous series. Order books
+    are built around the current price with spread and depth scaled by the
+    regime's volatility.
+    """
+
+    def __init__(self, seed: int = settings.synthetic_seed, bar_seconds: int = 300, history: int = 1000):
+        self.seed = seed
+        self.bar_seconds = bar_seconds
+        self.history = history
+        self.dt = bar_seconds / SECONDS_PER_YEAR
+        self._rng = np.random.default_rng(seed)
+        self._states: Dict[str, _SymbolState] = {}
+
+    # ==================== Bar Generation ====================
+
+    def _regime_path(
+        self,
+        rng: np.random.Generator,
+        n: int,
+        regime: int,
+        regime_left: int
+    ) -> Tuple[np.ndarray, int, int]:
+        """Regime per bar, continuing the current regime for `regime_left` bars"""
+        regimes = np.empty(n, dtype=np.int64)
+        filled = min(regime_left, n)
+        regimes[:filled] = regime
+        regime_left -= filled
+        # One iteration per regime switch, not per bar
+        while filled < n:
+            regime = int(rng.choice(len(REGIMES), p=REGIME_WEIGHTS))
+            length = int(rng.geometric(1.0 / REGIME_MEAN_BARS))
+            take = min(length, n - filled)
+            regimes[filled:filled + take] = regime
+            filled += take
+            regime_left = length - take
+        return regimes, regime, regime_left
+
+    def generate_bars(
+        self,
+        n: int,
+        start_price: float,
+        rng: Optional[np.random.Generator] = None,
+        regime: int = 0,
+        regime_left: int = 0
+    ) -> Tuple[Dict[str, np.ndarray], int, int]:
+        """
+        Generate n consecutive OHLCV bars starting from start_price.
+        Returns column arrays plus the regime state to continue from.
+        """
+        rng = rng or self._rng
+        regimes, regime, regime_left = self._regime_path(rng, n, regime, regime_left)
+        vol, drift, volume_mult = REGIMES[regimes].T
+        sigma = vol * np.sqrt(self.dt)
+
+        jumps = rng.poisson(JUMP_INTENSITY * self.dt, n) * rng.normal(JUMP_MEAN, JUMP_STD, n)
+        z = rng.standard_normal(n)
+        log_ret = (drift - 0.5 * vol ** 2) * self.dt + sigma * z + jumps
+
+        close = start_price * np.exp(np.cumsum(log_ret))
+        open_ = np.concatenate(([start_price], close[:-1]))
+        wicks = np.abs(rng.standard_normal((2, n))) * sigma * 0.5
+        high = np.maximum(open_, close) * np.exp(wicks[0])
+        low = np.minimum(open_, close) * np.exp(-wicks[1])
+        volume = BASE_VOLUME * volume_mult * rng.lognormal(0.0, 0.3, n) * (1 + 0.5 * np.abs(log_ret) / sigma)
+
+        return {
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "sigma": sigma,
+        }, regime, regime_left
+
+    def _timestamps(self, n: int, last_bar_start: float) -> np.ndarray:
+        return last_bar_start - self.bar_seconds * np.arange(n - 1, -1, -1)
+
+    def _bar_start(self, now: float) -> float:
+        return now - now % self.bar_seconds
+
+    @staticmethod
+    def _to_candles(bars: Dict[str, np.ndarray], start: int = 0) -> List[Candle]:
+        columns = zip(
+            bars["ts"][start:].tolist(), bars["open"][start:].tolist(), bars["high"][start:].tolist(),
+            bars["low"][start:].tolist(), bars["close"][start:].tolist(), bars["volume"][start:].tolist()
+        )
+        return [
+            Candle(timestamp=datetime.fromtimestamp(ts), open=o, high=h, low=l, close=c, volume=v)
+            for ts, o, h, l, c, v in columns
+        ]
+
+    # ==================== Per-Symbol State ====================
+
+    def _state(self, symbol: str) -> _SymbolState:
+        state = self._states.get(symbol)
+        if state is None:
+            rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+            bars, regime, regime_left = self.generate_bars(self.history, BASE_PRICES.get(symbol, 100.0), rng)
+            bars["ts"] = self._timestamps(self.history, self._bar_start(time.time()))
+            state = _SymbolState(rng, bars, regime, regime_left)
+            self._states[symbol] = state
+        return state
+
+    def _advance(self, state: _SymbolState, now: float):
+        """Close bars that have ended since the last update and move the forming one"""
+        bars = state.bars
+        closed = int((self._bar_start(now) - bars["ts"][-1]) // self.bar_seconds)
+
+        if closed > 0:
+            new, state.regime, state.regime_left = self.generate_bars(
+                closed, float(bars["close"][-1]), state.rng, state.regime, state.regime_left
+            )
+            new["ts"] = self._timestamps(closed, self._bar_start(now))
+            for key in bars:
+                bars[key] = np.concatenate((bars[key], new[key]))[-self.history:]
+        else:
+            # Same bar: one step sized to the elapsed fraction of a bar
+            frac = min(max(now - state.updated, 0.0) / self.bar_seconds, 1.0)
+            if frac > 0:
+                sigma = bars["sigma"][-1] * np.sqrt(frac)
+                price = float(bars["close"][-1] * np.exp(sigma * state.rng.standard_normal()))
+                bars["close"][-1] = price
+                bars["high"][-1] = max(bars["high"][-1], price)
+                bars["low"][-1] = min(bars["low"][-1], price)
+                bars["volume"][-1] += BASE_VOLUME * frac * state.rng.lognormal(0.0, 0.3)
+
+        state.updated = now
+
+    # ==================== Order Book / Ticker ====================
+
+    def orderbook(
+        self,
+        mid: float,
+        sigma: float = 0.002,
+        depth: int = 10,
+        symbol: str = "cmt_btcusdt",
+        rng: Optional[np.random.Generator] = None
+    ) -> OrderBook:
+        """Book around mid; spread and level spacing widen with volatility"""
+        rng = rng or self._rng
+        half_spread = mid * max(0.5e-4, sigma * 0.05)
+        offsets = np.cumsum(mid * sigma * 0.1 * (0.5 + rng.random((2, depth))), axis=1)
+        quantities = rng.lognormal(-0.5, 0.5, (2, depth)) * (1 + 0.25 * np.arange(depth))
+        bids = (mid - half_spread - offsets[0]).tolist()
+        asks = (mid + half_spread + offsets[1]).tolist()
+
+        return OrderBook(
+            symbol=symbol,
+            timestamp=datetime.now(),
+            bids=[OrderBookLevel(price=p, quantity=q) for p, q in zip(bids, quantities[0].tolist())],
+            asks=[OrderBookLevel(price=p, quantity=q) for p, q in zip(asks, quantities[1].tolist())]
+        )
+
+    def _ticker(self, symbol: str, bars: Dict[str, np.ndarray], orderbook: OrderBook) -> Ticker:
+        window = max(1, min(len(bars["close"]), 86400 // self.bar_seconds))
+        last = float(bars["close"][-1])
+        open_24h = float(bars["open"][-window])
+        return Ticker(
+            symbol=symbol,
+            last_price=last,
+            bid=orderbook.bids[0].price,
+            ask=orderbook.asks[0].price,
+            volume_24h=float(bars["volume"][-window:].sum()),
+            change_24h=last - open_24h,
+            change_pct_24h=(last / open_24h - 1) * 100,
+            high_24h=float(bars["high"][-window:].max()),
+            low_24h=float(bars["low"][-window:].min()),
+            timestamp=datetime.now()
+        )
+
+    # ==================== Public API ====================
+
+    def snapshot(self, symbol: str, candles: int = 100, depth: int = 10) -> MarketData:
+        """Current market state for a symbol; consecutive calls continue the same path"""
+        state = self._state(symbol)
+        self._advance(state, time.time())
+        bars = state.bars
+
+        sigma = float(bars["sigma"][-1])
+        orderbook = self.orderbook(float(bars["close"][-1]), sigma, depth, symbol, state.rng)
+        # Funding leans with recent momentum
+        recent = bars["close"][-min(len(bars["close"]), 96):]
+        funding = float(np.clip((recent[-1] / recent[0] - 1) * 0.01, -0.001, 0.001))
+
+        return MarketData(
+            symbol=symbol,
+            ticker=self._ticker(symbol, bars, orderbook),
+            candles=self._to_candles(bars, max(0, len(bars["close"]) - candles)),
+            orderbook=orderbook,
+            funding_rate=funding
+        )
+
+    def candles(self, base_price: float, count: int) -> List[Candle]:
+        """A fresh path of `count` bars from base_price, ending at the current bar"""
+        bars, _, _ = self.generate_bars(count, base_price)
+        bars["ts"] = self._timestamps(count, self._bar_start(time.time()))
+        return self._to_candles(bars)
+
+    def ticker(self, symbol: str, last_candle: Candle) -> Ticker:
+        """Ticker consistent with a single candle (no history)"""
+        bars = {key: np.array([getattr(last_candle, key)]) for key in ("open", "high", "low", "close", "volume")}
+        return self._ticker(symbol, bars, self.orderbook(last_candle.close, symbol=symbol, depth=1))
+
+
+# Singleton instance
+synthetic_market = SyntheticMarket()
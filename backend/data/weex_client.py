@@ -8,10 +8,9 @@ import base64
 import time
 import json
 import asyncio
-from typing import Optional, Callable, Dict, List, Any
+from typing import Optional, Callable, Dict, List, Any, Tuple
 from datetime import datetime
 import httpx
-import websockets
 from config.settings import settings
 from data.data_models import (
     Candle, OrderBook, OrderBookLevel, Ticker, OrderSide
@@ -40,6 +39,8 @@ class WEEXClient:
         self.ws_url = "wss://ws-contract.weex.com/ws"
         self._ws_connection = None
         self._ws_callbacks: Dict[str, List[Callable]] = {}
+        # Last known leverage per (symbol, margin mode) so orders can skip set_leverage
+        self._leverage_cache: Dict[Tuple[str, int], int] = {}
         # Headers to bypass Cloudflare protection
         self._default_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -108,8 +109,66 @@ class WEEXClient:
             "locale": "en-US"
         }
     
+    @staticmethod
+    def _is_error_response(status_code: int, data: Any) -> bool:
+        """Check whether a private API response signals a failure"""
+        if status_code != 200:
+            return True
+        if isinstance(data, dict):
+            code = data.get("code")
+            if code is not None and str(code) not in ("0", "00000", "200"):
+                return True
+        return False
+    
+    # ==================== Leverage Cache ====================
+    
+    def invalidate_leverage(self, symbol: Optional[str] = None):
+        """Forget cached leverage for a symbol (or all symbols)"""
+        if symbol is None:
+            self._leverage_cache.clear()
+            return
+        for key in [k for k in self._leverage_cache if k[0] == symbol]:
+            del self._leverage_cache[key]
+    
+    def _cache_leverage_from_positions(self, positions: List[dict]):
+        """Populate the leverage cache from position query results"""
+        for item in positions:
+            if not isinstance(item, dict):
+                continue
+            symbol = item.get("symbol")
+            leverage = item.get("leverage")
+            if not symbol or leverage in (None, ""):
+                continue
+            try:
+                margin_mode = int(item.get("margin_mode", item.get("marginMode", 1)) or 1)
+                self._leverage_cache[(symbol, margin_mode)] = int(float(leverage))
+            except (TypeError, ValueError):
+                continue
+    
+    async def refresh_leverage_cache(self):
+        """Seed the leverage cache from the account's open positions"""
+        try:
+            await self.get_positions()
+        except Exception as e:
+            print(f" Error refreshing leverage cache: {e}")
+    
     # ==================== Public API Methods (No Auth) ====================
     
+    def _parse_ticker(self, symbol: str, data: dict) -> Ticker:
+        """Build a Ticker from a WEEX ticker payload"""
+        return Ticker(
+            symbol=symbol,
+            last_price=float(data.get("last", data.get("lastPr", 0))),
+            bid=float(data.get("best_bid", data.get("bidPr", 0))),
+            ask=float(data.get("best_ask", data.get("askPr", 0))),
+            volume_24h=float(data.get("volume_24h", data.get("baseVolume", 0))),
+            change_24h=0,
+            change_pct_24h=float(data.get("priceChangePercent", data.get("change24h", 0))),
+            high_24h=float(data.get("high_24h", data.get("high24h", 0))),
+            low_24h=float(data.get("low_24h", data.get("low24h", 0))),
+            timestamp=datetime.now()
+        )
+    
     async def get_ticker(self, symbol: str = "cmt_btcusdt") -> Ticker:
         """Get current ticker for a symbol"""
         try:
@@ -131,35 +190,82 @@ class WEEXClient:
                 if isinstance(data, dict) and "data" in data:
                     data = data["data"]
                 
-                return Ticker(
-                    symbol=symbol,
-                    last_price=float(data.get("last", data.get("lastPr", 0))),
-                    bid=float(data.get("best_bid", data.get("bidPr", 0))),
-                    ask=float(data.get("best_ask", data.get("askPr", 0))),
-                    volume_24h=float(data.get("volume_24h", data.get("baseVolume", 0))),
-                    change_24h=0,
-                    change_pct_24h=float(data.get("priceChangePercent", data.get("change24h", 0))),
-                    high_24h=float(data.get("high_24h", data.get("high24h", 0))),
-                    low_24h=float(data.get("low_24h", data.get("low24h", 0))),
-                    timestamp=datetime.now()
-                )
+                return self._parse_ticker(symbol, data)
         except Exception as e:
             print(f" Error fetching ticker: {e}")
             raise
     
+    async def get_tickers(self, symbols: Optional[List[str]] = None) -> Dict[str, Ticker]:
+        """
+        Get tickers for many symbols in a single request.
+        Symbols missing from the bulk response are fetched individually (concurrently).
+        """
+        tickers: Dict[str, Ticker] = {}
+        
+        try:
+            async with httpx.AsyncClient(timeout=10.0, headers=self._default_headers) as client:
+                response = await client.get(f"{self.base_url}/capi/v2/market/tickers")
+                
+                if response.status_code != 200:
+                    raise Exception(f"API error: {response.status_code}")
+                
+                data = response.json()
+                if isinstance(data, dict):
+                    data = data.get("data", [])
+                
+                for item in data or []:
+                    symbol = item.get("symbol")
+                    if symbol and (symbols is None or symbol in symbols):
+                        tickers[symbol] = self._parse_ticker(symbol, item)
+        except Exception as e:
+            print(f" Error fetching bulk tickers: {e}")
+        
+        if symbols:
+            missing = [s for s in symbols if s not in tickers]
+            if missing:
+                results = await asyncio.gather(
+                    *(self.get_ticker(s) for s in missing),
+                    return_exceptions=True
+                )
+                for symbol, result in zip(missing, results):
+                    if isinstance(result, Ticker):
+                        tickers[symbol] = result
+        
+        return tickers
+    
+    # Interval -> WEEX granularity
+    INTERVAL_MAP = {
+        "1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m",
+        "1h": "1H", "4h": "4H", "1d": "1D"
+    }
+    
+    @staticmethod
+    def _parse_candles(candle_list: List[Any]) -> List[Candle]:
+        """Build Candles from WEEX [ts, open, high, low, close, volume, ...] rows"""
+        candles = []
+        for item in candle_list:
+            try:
+                candles.append(Candle(
+                    timestamp=datetime.fromtimestamp(int(item[0]) / 1000),
+                    open=float(item[1]),
+                    high=float(item[2]),
+                    low=float(item[3]),
+                    close=float(item[4]),
+                    volume=float(item[5]) if len(item) > 5 else 0
+                ))
+            except (IndexError, ValueError) as e:
+                print(f"   Error parsing candle: {item} - {e}")
+                continue
+        return candles
+    
     async def get_klines(
         self, 
         symbol: str = "cmt_btcusdt", 
         interval: str = "5m", 
         limit: int = 100
     ) -> List[Candle]:
-        """Get historical candlestick data"""
-        # Map interval to WEEX format
-        interval_map = {
-            "1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m",
-            "1h": "1H", "4h": "4H", "1d": "1D"
-        }
-        weex_interval = interval_map.get(interval, "5m")
+        """Get recent candlestick data"""
+        weex_interval = self.INTERVAL_MAP.get(interval, "5m")
         
         try:
             async with httpx.AsyncClient(timeout=10.0, headers=self._default_headers) as client:
@@ -194,26 +300,42 @@ class WEEXClient:
                 
                 print(f"   Found {len(candle_list)} candles")
                 
-                candles = []
-                for item in candle_list:
-                    try:
-                        candles.append(Candle(
-                            timestamp=datetime.fromtimestamp(int(item[0]) / 1000),
-                            open=float(item[1]),
-                            high=float(item[2]),
-                            low=float(item[3]),
-                            close=float(item[4]),
-                            volume=float(item[5]) if len(item) > 5 else 0
-                        ))
-                    except (IndexError, ValueError) as e:
-                        print(f"   Error parsing candle: {item} - {e}")
-                        continue
-                
-                return candles
+                return self._parse_candles(candle_list)
         except Exception as e:
             print(f" Error fetching klines: {e}")
             raise
     
+    async def get_history_klines(
+        self,
+        symbol: str = "cmt_btcusdt",
+        interval: str = "5m",
+        end_time: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Candle]:
+        """
+        Get one page of historical candles ending at end_time (ms, exclusive of
+        later bars). Page backwards by passing the oldest returned timestamp.
+        """
+        params: Dict[str, Any] = {
+            "symbol": symbol,
+            "granularity": self.INTERVAL_MAP.get(interval, "5m"),
+            "limit": limit
+        }
+        if end_time is not None:
+            params["endTime"] = end_time
+        
+        async with httpx.AsyncClient(timeout=10.0, headers=self._default_headers) as client:
+            response = await client.get(f"{self.base_url}/capi/v2/market/historyCandles", params=params)
+            
+            if response.status_code != 200:
+                raise Exception(f"API error: {response.status_code} {response.text[:200]}")
+            
+            data = response.json()
+            if isinstance(data, dict):
+                data = data.get("data", [])
+            
+            return sorted(self._parse_candles(data or []), key=lambda c: c.timestamp)
+    
     async def get_orderbook(self, symbol: str = "cmt_btcusdt", depth: int = 20) -> OrderBook:
         """Get order book snapshot"""
         async with httpx.AsyncClient() as client:
@@ -292,14 +414,26 @@ class WEEXClient:
         }
         body_str = json.dumps(body)
         headers = self._get_headers("POST", request_path, "", body_str)
+        cache_key = (symbol, margin_mode)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}{request_path}",
-                headers=headers,
-                content=body_str
-            )
-            return response.json()
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{self.base_url}{request_path}",
+                    headers=headers,
+                    content=body_str
+                )
+                result = response.json()
+        except Exception:
+            self._leverage_cache.pop(cache_key, None)
+            raise
+        
+        if self._is_error_response(response.status_code, result):
+            self._leverage_cache.pop(cache_key, None)
+        else:
+            self._leverage_cache[cache_key] = leverage
+        
+        return result
     
     async def place_order(
         self,
@@ -309,7 +443,10 @@ class WEEXClient:
         leverage: int = 1,
         price: Optional[float] = None,
         order_type: str = "limit",  # "limit" or "market"
-        client_oid: Optional[str] = None
+        client_oid: Optional[str] = None,
+        margin_mode: int = 1,  # 1 = cross margin
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None
     ) -> dict:
         """
         Place a new order
@@ -322,6 +459,9 @@ class WEEXClient:
             price: Limit price (required for limit orders)
             order_type: "limit" or "market"
             client_oid: Custom order ID
+            margin_mode: Margin mode used for the leverage setting (1 = cross)
+            stop_loss: Optional preset stop-loss trigger price
+            take_profit: Optional preset take-profit trigger price
         """
         # Validate symbol
         if symbol not in ALLOWED_SYMBOLS:
@@ -330,8 +470,9 @@ class WEEXClient:
         # Enforce leverage limit
         leverage = min(leverage, 20)
         
-        # Set leverage first
-        await self.set_leverage(symbol, leverage)
+        # Set leverage first, unless the exchange already has it
+        if self._leverage_cache.get((symbol, margin_mode)) != leverage:
+            await self.set_leverage(symbol, leverage, margin_mode)
         
         request_path = "/capi/v2/order/placeOrder"
         
@@ -355,16 +496,32 @@ class WEEXClient:
         if price and order_type == "limit":
             body["price"] = str(price)
         
+        # Exchange-side presets; the local ExitEngine enforces these as well
+        if stop_loss:
+            body["presetStopLossPrice"] = str(stop_loss)
+        if take_profit:
+            body["presetTakeProfitPrice"] = str(take_profit)
+        
         body_str = json.dumps(body)
         headers = self._get_headers("POST", request_path, "", body_str)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}{request_path}",
-                headers=headers,
-                content=body_str
-            )
-            return response.json()
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{self.base_url}{request_path}",
+                    headers=headers,
+                    content=body_str
+                )
+                result = response.json()
+        except Exception:
+            # Leverage may have been changed elsewhere; re-sync on the next order
+            self.invalidate_leverage(symbol)
+            raise
+        
+        if self._is_error_response(response.status_code, result):
+            self.invalidate_leverage(symbol)
+        
+        return result
     
     async def cancel_order(self, symbol: str, order_id: str) -> dict:
         """Cancel an existing order"""
@@ -407,7 +564,12 @@ class WEEXClient:
                 headers=headers
             )
             data = response.json()
-            return data.get("list", []) if isinstance(data, dict) else data
+            positions = data.get("list", []) if isinstance(data, dict) else data
+            
+            if not self._is_error_response(response.status_code, data):
+                self._cache_leverage_from_positions(positions or [])
+            
+            return positions
     
     async def get_trade_history(
         self, 
@@ -468,11 +630,13 @@ class WEEXClient:
     
     async def connect_websocket(self):
         """Establish WebSocket connection"""
+        import websockets
         self._ws_connection = await websockets.connect(self.ws_url)
         asyncio.create_task(self._ws_listener())
     
     async def _ws_listener(self):
         """Listen for WebSocket messages"""
+        import websockets
         try:
             async for message in self._ws_connection:
                 data = json.loads(message)
@@ -2,11 +2,18 @@ import logging
 import json
 import hashlib
 import asyncio
+import time
 import httpx
-from typing import Dict, Any
+from collections import OrderedDict, deque
+from typing import Dict, Any, Deque, List, Optional, Tuple
+from execution.bite_pool import IntentPool, CompiledCondition, compile_condition, PARAM_SOURCES
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Executed intents kept for status lookups after they leave the pool
+EXECUTED_HISTORY_SIZE = 500
+
 class BiteManager:
     """
     Integrates with SKALE's BITE v2 (Blockchain Integrated Threshold Encryption)
@@ -17,55 +24,204 @@ class BiteManager:
     RPC: https://base-sepolia-testnet.skalenodes.com/v1/bite-v2-sandbox
     Chain ID: 103698795
     BITE Contract: 0xc4083B1E81ceb461Ccef3FDa8A9F24F0d764B6D8
+    
+    Pending intents live in a bounded IntentPool (TTL + capacity) with their
+    conditions compiled and indexed at insert time. Executed intents leave the
+    pool, are broadcast as `bite_executed`, and stay queryable in a bounded
+    history.
+    
+    Bridge calls share one pooled client and can carry several intents. After
+    `breaker_threshold` consecutive bridge failures a circuit breaker sends
+    intents straight to the mock path for `breaker_cooldown` seconds, then
+    lets a single trial call through.
     """
     
     def __init__(self, bridge_url: str = "http://localhost:3000/api/bite/encrypt"):
-        self.encrypted_pool = {}
+        self.encrypted_pool = IntentPool(
+            ttl_seconds=settings.bite_pool_ttl_seconds,
+            capacity=settings.bite_pool_capacity
+        )
         self.bridge_url = bridge_url
         self.real_sdk_used = False
+        self.executed_count = 0
+        self.bridge_timeout = settings.bite_bridge_timeout_seconds
+        self.breaker_threshold = settings.bite_breaker_threshold
+        self.breaker_cooldown = settings.bite_breaker_cooldown_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._connection_manager = None
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+        self._probing = False  # Half-open: a single trial call is in flight
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._executed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    # ==================== Bridge Transport ====================
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client for the Next.js bridge"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.bridge_timeout, connect=2.0),
+                limits=httpx.Limits(max_connections=5, max_keepalive_connections=2)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def connection_manager(self):
+        """WebSocket connection manager, imported on first use (avoids a circular import)"""
+        if self._connection_manager is None:
+            from api.websocket import connection_manager
+            self._connection_manager = connection_manager
+        return self._connection_manager
+
+    @property
+    def breaker_open(self) -> bool:
+        return time.monotonic() < self._breaker_open_until
+
+    @property
+    def breaker_half_open(self) -> bool:
+        """Cooldown over but not yet closed by a successful trial call"""
+        return self._breaker_open_until > 0 and not self.breaker_open
+
+    def _record(self, outcome: str, started: float):
+        samples = self._latencies.setdefault(outcome, deque(maxlen=100))
+        samples.append((time.monotonic() - started) * 1000)
+
+    def _bridge_failed(self, started: float, outcome: str):
+        self._record(outcome, started)
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.breaker_threshold:
+            self._breaker_open_until = time.monotonic() + self.breaker_cooldown
+            logger.warning(
+                f"BITE: Bridge failed {self._consecutive_failures}x. "
+                f"Circuit open for {self.breaker_cooldown:.0f}s, using mock."
+            )
+
+    async def _call_bridge(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """POST to the bridge. Returns the JSON body, or None to fall back to mock."""
+        started = time.monotonic()
+        if self.breaker_open or (self.breaker_half_open and self._probing):
+            self._record("breaker_open", started)
+            return None
+        
+        # Half-open: this call is the single trial; everyone else stays on mock until it returns
+        self._probing = self.breaker_half_open
+        try:
+            try:
+                response = await self._get_client().post(self.bridge_url, json=payload)
+            except httpx.TimeoutException:
+                logger.error("BITE: SDK bridge timed out. Using mock.")
+                self._bridge_failed(started, "timeout")
+                return None
+            except Exception as e:
+                logger.error(f"BITE: SDK bridge failed ({e}). Using mock.")
+                self._bridge_failed(started, "error")
+                return None
+            
+            if response.status_code != 200:
+                logger.warning(f"BITE: SDK bridge returned {response.status_code}. Using mock.")
+                self._bridge_failed(started, "bridge_error")
+                return None
+            
+            try:
+                body = response.json()
+            except ValueError as e:
+                logger.warning(f"BITE: SDK bridge returned invalid JSON ({e}). Using mock.")
+                self._bridge_failed(started, "bridge_error")
+                return None
+        finally:
+            self._probing = False
+        
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+        self._record("success", started)
+        return body
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get BITE bridge and pool statistics"""
+        latency = {}
+        for outcome, samples in self._latencies.items():
+            ordered = sorted(samples)
+            latency[outcome] = {
+                "count": len(ordered),
+                "avg_ms": sum(ordered) / len(ordered),
+                "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+            }
+        return {
+            "pool": self.encrypted_pool.get_stats(),
+            "executed": self.executed_count,
+            "recent_executed": list(self._executed.values())[-10:],
+            "real_sdk_used": self.real_sdk_used,
+            "breaker_open": self.breaker_open,
+            "breaker_half_open": self.breaker_half_open,
+            "consecutive_failures": self._consecutive_failures,
+            "latency": latency
+        }
 
     async def encrypt_intent(self, intent: Dict[str, Any], condition: str) -> Dict[str, str]:
         """
         Encrypts a trade intent using the REAL SKALE BITE v2 SDK via the Next.js bridge.
         """
+        compiled = compile_condition(condition)  # Fail fast on malformed conditions
+        bite_receipt = await self._call_bridge({"intent": intent, "condition": condition})
+        return self._seal(intent, condition, compiled, bite_receipt)
+
+    async def encrypt_intents(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, str]]:
+        """
+        Encrypt several (intent, condition) pairs with a single bridge call.
+        Intents the bridge couldn't encrypt fall back to mock individually.
+        """
+        compiled = [compile_condition(condition) for _, condition in items]
+        response = await self._call_bridge({
+            "intents": [{"intent": intent, "condition": condition} for intent, condition in items]
+        })
+        
+        results = (response or {}).get("results") or []
+        sealed = []
+        for i, (intent, condition) in enumerate(items):
+            receipt = results[i] if i < len(results) else None
+            if receipt and receipt.get("status") == "error":
+                logger.warning(f"BITE: Bridge could not encrypt intent {i}: {receipt.get('message')}. Using mock.")
+                receipt = None
+            sealed.append(self._seal(intent, condition, compiled[i], receipt))
+        return sealed
+
+    def _seal(
+        self,
+        intent: Dict[str, Any],
+        condition: str,
+        compiled: CompiledCondition,
+        bite_receipt: Optional[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Store an encrypted intent in the pool and broadcast it"""
         tx_id = f"bite_{hashlib.md5(json.dumps(intent).encode()).hexdigest()[:8]}"
-        bite_receipt = None
         encrypted_blob = f"mock_bite_{tx_id}"
+        real_sdk = bite_receipt is not None
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.bridge_url,
-                    json={
-                        "intent": intent,
-                        "condition": condition
-                    },
-                    timeout=15.0
-                )
-                
-                if response.status_code == 200:
-                    bite_receipt = response.json()
-                    encrypted_blob = bite_receipt.get("encryptedMessage", encrypted_blob)
-                    self.real_sdk_used = True
-                    logger.info(f"BITE: Real SDK encryption on BITE V2 Sandbox 2 successful!")
-                    logger.info(f"BITE: Chain ID: {bite_receipt.get('chainId')}")
-                    logger.info(f"BITE: Encrypted length: {bite_receipt.get('encryptedMessageLength')}")
-                    if bite_receipt.get("committee"):
-                        logger.info(f"BITE: Epoch: {bite_receipt['committee'].get('epochId')}")
-                else:
-                    logger.warning(f"BITE: SDK bridge returned {response.status_code}. Using mock.")
-        except Exception as e:
-            logger.error(f"BITE: SDK bridge failed ({e}). Using mock.")
+        if real_sdk:
+            encrypted_blob = bite_receipt.get("encryptedMessage", encrypted_blob)
+            self.real_sdk_used = True
+            logger.info(f"BITE: Real SDK encryption on BITE V2 Sandbox 2 successful!")
+            logger.info(f"BITE: Chain ID: {bite_receipt.get('chainId')}")
+            logger.info(f"BITE: Encrypted length: {bite_receipt.get('encryptedMessageLength')}")
+            if bite_receipt.get("committee"):
+                logger.info(f"BITE: Epoch: {bite_receipt['committee'].get('epochId')}")
 
         # Store in mempool
-        self.encrypted_pool[tx_id] = {
-            "blob": encrypted_blob,
-            "real_intent": intent, 
-            "condition": condition,
-            "status": "ENCRYPTED",
-            "real_sdk": self.real_sdk_used,
-            "bite_receipt": bite_receipt
-        }
+        self.encrypted_pool.add(
+            tx_id,
+            intent,
+            compiled,
+            blob=encrypted_blob,
+            status="ENCRYPTED",
+            real_sdk=real_sdk,
+            bite_receipt=bite_receipt
+        )
         
         logger.info(f"BITE: Intent {tx_id} encrypted. Condition: {condition}")
         
@@ -74,9 +230,9 @@ class BiteManager:
             "bite_tx_id": tx_id,
             "encrypted_blob": encrypted_blob[:120] + "..." if len(encrypted_blob) > 120 else encrypted_blob,
             "condition": condition,
-            "sdk": "@skalenetwork/bite" if self.real_sdk_used else "mock",
-            "chain": "BITE V2 Sandbox 2" if self.real_sdk_used else "Mock",
-            "chainId": 103698795 if self.real_sdk_used else 0,
+            "sdk": "@skalenetwork/bite" if real_sdk else "mock",
+            "chain": "BITE V2 Sandbox 2" if real_sdk else "Mock",
+            "chainId": 103698795 if real_sdk else 0,
         }
         
         if bite_receipt and bite_receipt.get("committee"):
@@ -84,8 +240,7 @@ class BiteManager:
             broadcast_data["encryptedLength"] = bite_receipt.get("encryptedMessageLength", 0)
         
         # Broadcast BITE Event
-        from api.websocket import connection_manager
-        asyncio.create_task(connection_manager.broadcast_status({
+        asyncio.create_task(self.connection_manager.broadcast_status({
             "type": "bite_encrypted",
             "data": broadcast_data
         }))
@@ -96,42 +251,78 @@ class BiteManager:
             "condition": condition
         }
 
+    def _execute(self, tx_id: str, current_val: float) -> Dict[str, Any]:
+        condition = self.encrypted_pool.get(tx_id)["compiled"]
+        intent = self.encrypted_pool.take_intent(tx_id)
+        self.executed_count += 1
+        logger.info(f"BITE: Condition Met ({current_val} {condition.op} {condition.threshold}). Decrypting {tx_id}...")
+        
+        # Keep a status record once the intent has left the pool
+        self._executed[tx_id] = {
+            "bite_tx_id": tx_id,
+            "status": "DECRYPTED_AND_EXECUTED",
+            "decrypted_intent": intent,
+            "condition": str(condition),
+            "trigger_value": current_val,
+            "executed_at": time.time()
+        }
+        while len(self._executed) > EXECUTED_HISTORY_SIZE:
+            self._executed.popitem(last=False)
+        
+        # Broadcast BITE Event
+        try:
+            asyncio.get_running_loop().create_task(self.connection_manager.broadcast_status({
+                "type": "bite_executed",
+                "data": self._executed[tx_id]
+            }))
+        except RuntimeError:
+            pass  # No event loop (e.g. verification scripts) - the history record is enough
+        
+        return {
+            "bite_tx_id": tx_id,
+            "status": "EXECUTED",
+            "decrypted_intent": intent
+        }
+
     def try_decrypt_and_execute(self, bite_tx_id: str, current_market_data: Any) -> Dict[str, Any]:
         """
         Checks conditions and triggers decryption.
         In production, SKALE consensus handles this automatically via onDecrypt().
         """
+        self.encrypted_pool.expire()
         tx = self.encrypted_pool.get(bite_tx_id)
         if not tx:
+            if bite_tx_id in self._executed:
+                return dict(self._executed[bite_tx_id])
             return {"error": "Tx not found"}
             
-        condition = tx["condition"]
+        condition = tx["compiled"]
         try:
-            param, operator, value = condition.split(" ")
-            value = float(value)
+            current_val = float(current_market_data.get(PARAM_SOURCES.get(condition.param, ""), 0.0))
             
-            current_val = 0.0
-            if param == "CONFIDENCE":
-                current_val = current_market_data.get("consensus_score", 0.0)
-            
-            met = False
-            if operator == ">":
-                met = current_val > value
-                
-            if met:
-                tx["status"] = "DECRYPTED_AND_EXECUTED"
-                logger.info(f"BITE: Condition Met ({current_val} {operator} {value}). Decrypting...")
-                return {
-                    "status": "EXECUTED",
-                    "decrypted_intent": tx["real_intent"]
-                }
+            if condition.evaluate(current_val):
+                return self._execute(bite_tx_id, current_val)
             else:
-                logger.info(f"BITE: Condition NOT Met ({current_val} {operator} {value}). Keeping encrypted.")
+                logger.info(f"BITE: Condition NOT Met ({current_val} {condition.op} {condition.threshold}). Keeping encrypted.")
                 return {"status": "PENDING_CONDITION"}
                 
         except Exception as e:
             logger.error(f"BITE Execution Error: {e}")
             return {"error": str(e)}
 
+    def evaluate_pending(self, current_market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Execute every pending intent whose condition the new market data satisfies.
+        Uses the threshold index, so only satisfiable intents are touched.
+        """
+        executed = []
+        for param, source in PARAM_SOURCES.items():
+            if source not in current_market_data:
+                continue
+            current_val = float(current_market_data[source])
+            for tx_id in self.encrypted_pool.matching(param, current_val):
+                executed.append(self._execute(tx_id, current_val))
+        return executed
+
 # Singleton
 bite_manager = BiteManager()
@@ -0,0 +1,175 @@
+"""
+BITE Intent Pool - Bounded, indexed pool of encrypted trade intents
+Conditions are compiled once on insert and indexed by parameter and threshold
+"""
+import bisect
+import operator
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# Condition parameter -> key in the market data passed to evaluation
+PARAM_SOURCES = {
+    "CONFIDENCE": "consensus_score",
+}
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    """A parsed "PARAM OP THRESHOLD" condition"""
+    param: str
+    op: str
+    threshold: float
+
+    def evaluate(self, value: float) -> bool:
+        return OPERATORS[self.op](value, self.threshold)
+
+    def __str__(self) -> str:
+        return f"{self.param} {self.op} {self.threshold:g}"
+
+
+def compile_condition(condition: str) -> CompiledCondition:
+    """Parse a condition like "CONFIDENCE > 0.8". Raises ValueError if malformed."""
+    parts = condition.split()
+    if len(parts) != 3:
+        raise ValueError(f"Condition must be 'PARAM OP VALUE', got {condition!r}")
+    param, op, value = parts
+    if op not in OPERATORS:
+        raise ValueError(f"Unsupported operator {op!r} in {condition!r}")
+    return CompiledCondition(param.upper(), op, float(value))
+
+
+class IntentPool:
+    """
+    Pending encrypted intents with TTL expiry and a capacity limit.
+
+    Public entries (blob, condition, status, receipts) are kept apart from the
+    plaintext intents, which are only handed out on execution. Each
+    (param, op) pair has a threshold-sorted ladder, so evaluating a new value
+    bisects straight to the intents it satisfies instead of scanning the pool.
+    Entries are stored in insertion order; with a single TTL the oldest entry
+    is always the next to expire or be evicted.
+    """
+
+    def __init__(self, ttl_seconds: float, capacity: int):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._intents: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        self.expired_count = 0
+        self.evicted_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, tx_id: str) -> bool:
+        return tx_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def get(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(tx_id)
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return list(self._entries.items())
+
+    # ==================== Insert / Remove ====================
+
+    def add(self, tx_id: str, intent: Dict[str, Any], condition: CompiledCondition, **entry: Any):
+        """Insert an intent, expiring stale entries and evicting the oldest when full"""
+        self.expire()
+        if tx_id in self._entries:
+            self.remove(tx_id)
+        while len(self._entries) >= self.capacity:
+            oldest = next(iter(self._entries))
+            self.remove(oldest)
+            self.evicted_count += 1
+
+        self._entries[tx_id] = {
+            **entry,
+            "condition": str(condition),
+            "compiled": condition,
+            "status": entry.get("status", "ENCRYPTED"),
+            "created_at": time.time(),
+        }
+        self._intents[tx_id] = intent
+        bisect.insort(self._index.setdefault((condition.param, condition.op), []), (condition.threshold, tx_id))
+
+    def remove(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        """Drop an entry (and its plaintext) from the pool and index"""
+        entry = self._entries.pop(tx_id, None)
+        self._intents.pop(tx_id, None)
+        if entry is None:
+            return None
+
+        condition: CompiledCondition = entry["compiled"]
+        ladder = self._index.get((condition.param, condition.op), [])
+        key = (condition.threshold, tx_id)
+        idx = bisect.bisect_left(ladder, key)
+        if idx < len(ladder) and ladder[idx] == key:
+            del ladder[idx]
+        return entry
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove entries older than the TTL. Returns how many were dropped."""
+        cutoff = (time.time() if now is None else now) - self.ttl_seconds
+        dropped = 0
+        while self._entries:
+            tx_id, entry = next(iter(self._entries.items()))
+            if entry["created_at"] > cutoff:
+                break
+            self.remove(tx_id)
+            dropped += 1
+        self.expired_count += dropped
+        return dropped
+
+    def take_intent(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an entry and return its plaintext intent (on execution)"""
+        intent = self._intents.get(tx_id)
+        self.remove(tx_id)
+        return intent
+
+    # ==================== Matching ====================
+
+    def matching(self, param: str, value: float) -> List[str]:
+        """Ids of pending intents on `param` whose condition `value` satisfies"""
+        self.expire()
+        matched: List[str] = []
+        for op in OPERATORS:
+            ladder = self._index.get((param, op))
+            if not ladder:
+                continue
+            if op == ">":
+                # threshold < value
+                hits = ladder[:bisect.bisect_left(ladder, (value, ""))]
+            elif op == ">=":
+                # threshold <= value
+                hits = ladder[:bisect.bisect_right(ladder, (value, "\uffff"))]
+            elif op == "<":
+                # threshold > value
+                hits = ladder[bisect.bisect_right(ladder, (value, "\uffff")):]
+            else:
+                # threshold >= value
+                hits = ladder[bisect.bisect_left(ladder, (value, "")):]
+            matched.extend(tx_id for _, tx_id in hits)
+        return matched
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl_seconds,
+            "expired": self.expired_count,
+            "evicted": self.evicted_count,
+        }
@@ -1,54 +1,428 @@
+import atexit
 import json
 import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 from decimal import Decimal
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Rolling windows enforced by the budget engine (seconds)
+WINDOWS = {"hour": 3600, "day": 86400}
+BUCKETS_PER_WINDOW = 60
+
+
+class RollingWindow:
+    """
+    Sliding-window spend counter.
+    Spend is summed into fixed-width time buckets; buckets that slide out of
+    the window are dropped from the front, so adding and reading the current
+    total are amortized O(1) however many purchases fall in the window.
+    """
+
+    def __init__(self, seconds: int, buckets: int = BUCKETS_PER_WINDOW):
+        self.seconds = seconds
+        self.bucket_seconds = seconds / buckets
+        self._buckets: Deque[Tuple[int, Decimal]] = deque()
+        self._total = Decimal("0")
+
+    def _expire(self, now: float):
+        oldest = int((now - self.seconds) // self.bucket_seconds)
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._total -= self._buckets.popleft()[1]
+
+    def add(self, amount: Decimal, at: Optional[float] = None):
+        at = time.time() if at is None else at
+        idx = int(at // self.bucket_seconds)
+        if self._buckets and self._buckets[-1][0] >= idx:
+            # Same bucket (or a late, out-of-order entry): fold into the newest one
+            last_idx, last_amount = self._buckets[-1]
+            self._buckets[-1] = (last_idx, last_amount + amount)
+        else:
+            self._buckets.append((idx, amount))
+        self._total += amount
+
+    def total(self, now: Optional[float] = None) -> Decimal:
+        self._expire(time.time() if now is None else now)
+        if not self._buckets:
+            self._total = Decimal("0")
+        return self._total
+
+    def to_list(self) -> List[List]:
+        """Live buckets as [[index, amount], ...] for snapshots"""
+        self._expire(time.time())
+        return [[idx, str(amount)] for idx, amount in self._buckets]
+
+    def load(self, buckets: List[List]):
+        self._buckets = deque((int(idx), Decimal(amount)) for idx, amount in buckets)
+        self._total = sum((amount for _, amount in self._buckets), Decimal("0"))
+        self._expire(time.time())
+
+
 class BudgetManager:
     """
     Tracks the 'Rational Trading Desk' economy.
     Records spending on tools/data and correlates it with trading outcomes.
+
+    Expenses go to an append-only JSONL ledger written by a background thread,
+    so recording a purchase never touches disk on the event loop. Totals,
+    per-tool and daily rollups are kept as running counters; every
+    `compact_every` expenses the ledger is rotated to an archive file and
+    restarted from a snapshot line, keeping startup replay short.
+
+    Authorization checks hourly/daily rolling windows for total, per-tool and
+    per-symbol spend. Concurrent purchases reserve their amount up front, and
+    outstanding reservations count against every limit until they are
+    committed or released.
     """
-    
-    def __init__(self, log_file: str = "budget_log.json"):
-        self.log_file = log_file
+
+    def __init__(
+        self,
+        log_file: str = "budget_log.json",
+        ledger_file: str = settings.budget_ledger_path,
+        compact_every: int = settings.budget_ledger_compact_every,
+        recent_limit: int = 100,
+        reservation_ttl: float = 120.0
+    ):
+        self.log_file = log_file  # Legacy full-rewrite log, migrated on first load
+        self.ledger_file = ledger_file
+        self.compact_every = compact_every
+        self.recent_limit = recent_limit
+
         self.total_spend = Decimal("0.00")
-        self.purchases = []
+        self.purchase_count = 0
+        self.purchases: List[Dict] = []  # Most recent purchases only; full history is in the ledger
+        self.spend_by_tool: Dict[str, Decimal] = {}
+        self.daily: Dict[str, Dict] = {}  # "YYYY-MM-DD" -> {"spend", "count"}
+        self._since_compaction = 0
+
+        # Rolling-window accounting: (scope, key) -> {window_name: RollingWindow}
+        self._windows: Dict[Tuple[str, str], Dict[str, RollingWindow]] = {}
+        self.limits: Dict[Tuple[str, str], float] = {
+            ("total", "hour"): settings.budget_hourly_limit,
+            ("total", "day"): settings.budget_daily_limit,
+            ("tool", "hour"): settings.budget_tool_hourly_limit,
+            ("symbol", "hour"): settings.budget_symbol_hourly_limit,
+        }
+        self.reservation_ttl = reservation_ttl
+        self.reservations: Dict[str, Dict] = {}
+
+        self._queue: "queue.Queue" = queue.Queue()
         self._load_log()
-        
+        self._thread = threading.Thread(target=self._writer, name="budget-ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ==================== Loading ====================
+
     def _load_log(self):
+        if os.path.exists(self.ledger_file):
+            self._load_ledger()
+        else:
+            self._migrate_legacy_log()
+
+    def _load_ledger(self):
+        with open(self.ledger_file, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash
+                if record.get("type") == "snapshot":
+                    self._restore_snapshot(record)
+                elif record.get("type") == "expense":
+                    self._apply(record["expense"])
+                    self._since_compaction += 1
+
+    def _migrate_legacy_log(self):
+        """Import the old budget_log.json into a fresh ledger"""
         try:
             with open(self.log_file, "r") as f:
                 data = json.load(f)
-                self.total_spend = Decimal(str(data.get("total_spend", "0.00")))
-                self.purchases = data.get("purchases", [])
-        except FileNotFoundError:
-            self.total_spend = Decimal("0.00")
-            self.purchases = []
-            
-    def _save_log(self):
-        data = {
+        except (FileNotFoundError, ValueError):
+            return
+
+        for expense in data.get("purchases", []):
+            self._apply(expense)
+
+        # Legacy total may include spend that predates per-purchase logging
+        self.total_spend = Decimal(str(data.get("total_spend", self.total_spend)))
+
+        with open(self.ledger_file, "w") as f:
+            f.write(json.dumps(self._snapshot()) + "\n")
+        logger.info(f"Migrated {self.purchase_count} purchases from {self.log_file} to {self.ledger_file}")
+
+    # ==================== Rollups ====================
+
+    def _apply(self, expense: Dict):
+        """Fold one expense into the running totals"""
+        amount = Decimal(str(expense["amount"]))
+        day = str(expense.get("timestamp", ""))[:10]
+        tool = expense.get("tool", "unknown")
+
+        self.total_spend += amount
+        self.purchase_count += 1
+        self.spend_by_tool[tool] = self.spend_by_tool.get(tool, Decimal("0")) + amount
+
+        rollup = self.daily.setdefault(day, {"spend": Decimal("0"), "count": 0})
+        rollup["spend"] += amount
+        rollup["count"] += 1
+
+        self._add_to_windows(expense)
+
+        self.purchases.append(expense)
+        if len(self.purchases) > self.recent_limit * 2:
+            del self.purchases[:-self.recent_limit]
+
+    def _snapshot(self) -> Dict:
+        return {
+            "type": "snapshot",
+            "timestamp": datetime.now().isoformat(),
             "total_spend": str(self.total_spend),
-            "purchases": self.purchases
+            "purchase_count": self.purchase_count,
+            "spend_by_tool": {k: str(v) for k, v in self.spend_by_tool.items()},
+            "daily": {
+                day: {"spend": str(r["spend"]), "count": r["count"]}
+                for day, r in self.daily.items()
+            },
+            "recent_purchases": self.purchases[-self.recent_limit:],
+            # Window buckets, so limits survive restarts however many purchases they hold
+            "windows": {
+                f"{kind}:{name}": {window: rolling.to_list() for window, rolling in windows.items()}
+                for (kind, name), windows in self._windows.items()
+            }
+        }
+
+    def _restore_snapshot(self, snap: Dict):
+        self.total_spend = Decimal(snap["total_spend"])
+        self.purchase_count = snap["purchase_count"]
+        self.spend_by_tool = {k: Decimal(v) for k, v in snap.get("spend_by_tool", {}).items()}
+        self.daily = {
+            day: {"spend": Decimal(r["spend"]), "count": r["count"]}
+            for day, r in snap.get("daily", {}).items()
         }
-        with open(self.log_file, "w") as f:
-            json.dump(data, f, indent=2)
+        self.purchases = list(snap.get("recent_purchases", []))
+        self._since_compaction = 0
+
+        self._windows = {}
+        if "windows" not in snap:
+            # Older snapshots: best effort from the recent purchases
+            for expense in self.purchases:
+                self._add_to_windows(expense)
+            return
+        for key, saved in snap["windows"].items():
+            kind, _, name = key.partition(":")
+            windows = {window: RollingWindow(seconds) for window, seconds in WINDOWS.items()}
+            for window, buckets in saved.items():
+                if window in windows:
+                    windows[window].load(buckets)
+            self._windows[(kind, name)] = windows
+
+    # ==================== Rolling Windows ====================
+
+    @staticmethod
+    def _scopes(tool_name: str, symbol: Optional[str]) -> List[Tuple[str, str]]:
+        scopes = [("total", "*"), ("tool", tool_name)]
+        if symbol:
+            scopes.append(("symbol", symbol))
+        return scopes
+
+    def _add_to_windows(self, expense: Dict):
+        try:
+            at = datetime.fromisoformat(expense["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            at = time.time()
+        if time.time() - at > max(WINDOWS.values()):
+            return
+
+        amount = Decimal(str(expense["amount"]))
+        for scope in self._scopes(expense.get("tool", "unknown"), expense.get("symbol")):
+            windows = self._windows.get(scope)
+            if windows is None:
+                windows = {name: RollingWindow(seconds) for name, seconds in WINDOWS.items()}
+                self._windows[scope] = windows
+            for window in windows.values():
+                window.add(amount, at)
+
+    def _window_spend(self, scope: Tuple[str, str], window: str) -> Decimal:
+        windows = self._windows.get(scope)
+        return windows[window].total() if windows else Decimal("0")
+
+    def _reserved(self, scope: Tuple[str, str]) -> Decimal:
+        self._expire_reservations()
+        return sum(
+            (r["amount"] for r in self.reservations.values() if scope in r["scopes"]),
+            Decimal("0")
+        )
+
+    def _expire_reservations(self):
+        now = time.monotonic()
+        for reservation_id in [
+            rid for rid, r in self.reservations.items() if now - r["created_at"] > self.reservation_ttl
+        ]:
+            logger.warning(f"Budget reservation {reservation_id} expired without commit")
+            del self.reservations[reservation_id]
+
+    def _check_limits(self, amount: Decimal, tool_name: str, symbol: Optional[str]) -> Optional[str]:
+        """Return the first limit the amount would breach, or None"""
+        for scope in self._scopes(tool_name, symbol):
+            reserved = self._reserved(scope)
+            for window in WINDOWS:
+                limit = self.limits.get((scope[0], window))
+                if not limit:
+                    continue
+                spent = self._window_spend(scope, window)
+                if spent + reserved + amount > Decimal(str(limit)):
+                    return (
+                        f"{scope[0]} {scope[1]} {window} limit ${limit:.2f} "
+                        f"(spent ${float(spent):.2f}, reserved ${float(reserved):.2f})"
+                    )
+        return None
+
+    # ==================== Ledger Writer ====================
+
+    def _writer(self):
+        """Writer thread: append ledger lines and rotate on compaction"""
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            barriers = []
+            lines: List[str] = []
+            try:
+                for item in batch:
+                    if item is None:
+                        stop = True
+                        continue
+                    op, payload = item
+                    if op == "line":
+                        lines.append(payload)
+                    elif op == "compact":
+                        self._append_lines(lines)
+                        lines = []
+                        self._rotate(payload)
+                    elif op == "barrier":
+                        barriers.append(payload)
+                self._append_lines(lines)
+            except Exception as e:
+                logger.error(f"Budget ledger write failed ({len(batch)} items): {e}")
+
+            for done in barriers:
+                done.set()
+
+    def _append_lines(self, lines: List[str]):
+        if lines:
+            with open(self.ledger_file, "a") as f:
+                f.write("\n".join(lines) + "\n")
 
-    def authorize_expense(self, amount: float, tool_name: str, justification: str) -> bool:
+    def _rotate(self, snapshot_line: str):
+        """Archive the current ledger and start a new one from a snapshot"""
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        base, ext = os.path.splitext(self.ledger_file)
+        if os.path.exists(self.ledger_file):
+            os.replace(self.ledger_file, f"{base}.{stamp}{ext}")
+        with open(self.ledger_file, "w") as f:
+            f.write(snapshot_line + "\n")
+
+    def flush(self, timeout: float = 5.0):
+        """Block until all recorded expenses are on disk"""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(("barrier", done))
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Flush and stop the ledger writer"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ==================== Public API ====================
+
+    def authorize_expense(
+        self,
+        amount: float,
+        tool_name: str,
+        justification: str,
+        symbol: Optional[str] = None
+    ) -> bool:
         """
         Risk Manager calls this to check if expense is allowed.
-        Simple logic: Allow if < $10 total daily spend.
+        Checks rolling hourly/daily limits, including in-flight reservations.
+        Does not hold funds; use `reserve` for purchases that run concurrently.
         """
-        # Hard cap for demo
-        if self.total_spend > Decimal("10.00"):
-            logger.warning(f"Budget exceeded! Request for {amount} rejected.")
+        breach = self._check_limits(Decimal(str(amount)), tool_name, symbol)
+        if breach:
+            logger.warning(f"Budget exceeded! Request for {amount} ({tool_name}) rejected: {breach}")
             return False
-            
+
         return True
 
-    def record_expense(self, amount: float, tool_name: str, tx_hash: str, justification: str):
+    def reserve(
+        self,
+        amount: float,
+        tool_name: str,
+        justification: str,
+        symbol: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Authorize and hold funds for an in-flight purchase.
+        Returns a reservation id, or None if the purchase would breach a limit.
+        """
+        if not self.authorize_expense(amount, tool_name, justification, symbol):
+            return None
+
+        reservation_id = uuid.uuid4().hex[:12]
+        self.reservations[reservation_id] = {
+            "amount": Decimal(str(amount)),
+            "tool": tool_name,
+            "symbol": symbol,
+            "justification": justification,
+            "scopes": self._scopes(tool_name, symbol),
+            "created_at": time.monotonic()
+        }
+        return reservation_id
+
+    def commit(self, reservation_id: str, tx_hash: str, amount: Optional[float] = None):
+        """Record the payment for a reservation and release its hold"""
+        reservation = self.reservations.pop(reservation_id, None)
+        if reservation is None:
+            logger.warning(f"Committing unknown or expired budget reservation {reservation_id}")
+            return
+        self.record_expense(
+            float(reservation["amount"]) if amount is None else amount,
+            reservation["tool"],
+            tx_hash,
+            reservation["justification"],
+            symbol=reservation["symbol"]
+        )
+
+    def release(self, reservation_id: str):
+        """Drop a reservation whose purchase did not go through"""
+        self.reservations.pop(reservation_id, None)
+
+    def record_expense(
+        self,
+        amount: float,
+        tool_name: str,
+        tx_hash: str,
+        justification: str,
+        symbol: Optional[str] = None
+    ):
         """Log a completed payment"""
         expense = {
             "timestamp": datetime.now().isoformat(),
@@ -57,15 +431,33 @@ class BudgetManager:
             "tx_hash": tx_hash,
             "justification": justification
         }
-        self.purchases.append(expense)
-        self.total_spend += Decimal(str(amount))
-        self._save_log()
+        if symbol:
+            expense["symbol"] = symbol
+        self._apply(expense)
+        self._queue.put(("line", json.dumps({"type": "expense", "expense": expense})))
+
+        self._since_compaction += 1
+        if self._since_compaction >= self.compact_every:
+            self._since_compaction = 0
+            self._queue.put(("compact", json.dumps(self._snapshot())))
+
         logger.info(f"Expense recorded: ${amount} for {tool_name}")
 
+    def get_daily_spend(self, day: Optional[str] = None) -> float:
+        """Spend for a day ("YYYY-MM-DD"), today by default"""
+        rollup = self.daily.get(day or datetime.now().date().isoformat())
+        return float(rollup["spend"]) if rollup else 0.0
+
     def get_summary(self) -> Dict:
         return {
             "total_spend": float(self.total_spend),
-            "purchase_count": len(self.purchases),
+            "purchase_count": self.purchase_count,
+            "today_spend": self.get_daily_spend(),
+            "spend_by_tool": {k: float(v) for k, v in self.spend_by_tool.items()},
+            "hourly_spend": float(self._window_spend(("total", "*"), "hour")),
+            "daily_window_spend": float(self._window_spend(("total", "*"), "day")),
+            "reserved": float(sum((r["amount"] for r in self.reservations.values()), Decimal("0"))),
+            "limits": {f"{scope}_{window}": limit for (scope, window), limit in self.limits.items()},
             "recent_purchases": self.purchases[-5:]
         }
 
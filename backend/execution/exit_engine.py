@@ -0,0 +1,223 @@
+"""
+Exit Engine - Server-side stop-loss / take-profit enforcement
+Watches ticks from the market data feed and closes positions on trigger breaches
+"""
+import asyncio
+import bisect
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from data.data_models import OrderSide
+
+
+STOP_LOSS = "stop_loss"
+TAKE_PROFIT = "take_profit"
+TRAILING_STOP = "trailing_stop"
+
+
+@dataclass
+class ExitTrigger:
+    """A single exit level attached to an open position"""
+    id: int
+    symbol: str
+    side: OrderSide  # Side of the position being protected
+    kind: str
+    level: float
+    fires_below: bool  # True: fires when price <= level, False: when price >= level
+    trail_pct: Optional[float] = None
+    extreme: Optional[float] = None  # Best price seen, for trailing stops
+    armed_at: float = 0.0
+
+
+class ExitEngine:
+    """
+    Keeps per-symbol trigger levels in two sorted ladders:
+    - `below`: fires when price falls to the level (long stops, short take-profits)
+    - `above`: fires when price rises to the level (long take-profits, short stops)
+
+    Each tick only compares against the nearest level of each ladder, so
+    cost per tick is O(1) plus O(log n) per fired or trailed trigger.
+    """
+
+    def __init__(self, on_trigger: Callable[[ExitTrigger, float], Awaitable]):
+        self._on_trigger = on_trigger
+        self._ids = itertools.count(1)
+        self._triggers: Dict[int, ExitTrigger] = {}
+        self._below: Dict[str, List[Tuple[float, int]]] = {}
+        self._above: Dict[str, List[Tuple[float, int]]] = {}
+        self._by_position: Dict[Tuple[str, OrderSide], List[int]] = {}
+        self._trailing: Dict[str, Set[int]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.fired_count = 0
+        self.last_fire_latency_ms: Optional[float] = None
+
+    # ==================== Ladder Maintenance ====================
+
+    def _ladder(self, trigger: ExitTrigger) -> List[Tuple[float, int]]:
+        book = self._below if trigger.fires_below else self._above
+        return book.setdefault(trigger.symbol, [])
+
+    def _insert(self, trigger: ExitTrigger):
+        bisect.insort(self._ladder(trigger), (trigger.level, trigger.id))
+
+    def _remove(self, trigger: ExitTrigger):
+        ladder = self._ladder(trigger)
+        entry = (trigger.level, trigger.id)
+        idx = bisect.bisect_left(ladder, entry)
+        if idx < len(ladder) and ladder[idx] == entry:
+            del ladder[idx]
+
+    def _add(
+        self,
+        symbol: str,
+        side: OrderSide,
+        kind: str,
+        level: float,
+        fires_below: bool,
+        trail_pct: Optional[float] = None,
+        extreme: Optional[float] = None
+    ):
+        trigger = ExitTrigger(
+            id=next(self._ids),
+            symbol=symbol,
+            side=side,
+            kind=kind,
+            level=level,
+            fires_below=fires_below,
+            trail_pct=trail_pct,
+            extreme=extreme,
+            armed_at=time.monotonic()
+        )
+        self._triggers[trigger.id] = trigger
+        self._by_position.setdefault((symbol, side), []).append(trigger.id)
+        if trail_pct:
+            self._trailing.setdefault(symbol, set()).add(trigger.id)
+        self._insert(trigger)
+
+    # ==================== Public API ====================
+
+    def arm(
+        self,
+        symbol: str,
+        side: OrderSide,
+        price: float,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        trail_pct: Optional[float] = None
+    ):
+        """
+        Register exit levels for a position, replacing any existing ones.
+        With `trail_pct`, the stop follows the best price seen by that percentage
+        (never loosening past `stop_loss`).
+        """
+        self.disarm(symbol, side)
+        is_long = side == OrderSide.BUY
+
+        if trail_pct:
+            trail_level = price * (1 - trail_pct / 100) if is_long else price * (1 + trail_pct / 100)
+            if stop_loss:
+                trail_level = max(trail_level, stop_loss) if is_long else min(trail_level, stop_loss)
+            self._add(symbol, side, TRAILING_STOP, trail_level, is_long, trail_pct, price)
+        elif stop_loss:
+            self._add(symbol, side, STOP_LOSS, stop_loss, is_long)
+
+        if take_profit:
+            self._add(symbol, side, TAKE_PROFIT, take_profit, not is_long)
+
+    def disarm(self, symbol: str, side: OrderSide):
+        """Remove all exit levels for a position"""
+        for trigger_id in self._by_position.pop((symbol, side), []):
+            trigger = self._triggers.pop(trigger_id, None)
+            if trigger is None:
+                continue
+            self._remove(trigger)
+            if trigger.trail_pct:
+                self._trailing.get(symbol, set()).discard(trigger_id)
+
+    def triggers_for(self, symbol: str, side: OrderSide) -> List[ExitTrigger]:
+        """Get the armed triggers for a position"""
+        return [
+            self._triggers[i] for i in self._by_position.get((symbol, side), [])
+            if i in self._triggers
+        ]
+
+    def symbols(self) -> List[str]:
+        """Get symbols that currently have armed triggers"""
+        return list(dict.fromkeys(symbol for symbol, _ in self._by_position))
+
+    def _trail(self, symbol: str, price: float):
+        """Ratchet trailing stops toward the price"""
+        for trigger_id in list(self._trailing.get(symbol, ())):
+            trigger = self._triggers[trigger_id]
+            is_long = trigger.side == OrderSide.BUY
+
+            if is_long and price > trigger.extreme:
+                new_level = price * (1 - trigger.trail_pct / 100)
+            elif not is_long and price < trigger.extreme:
+                new_level = price * (1 + trigger.trail_pct / 100)
+            else:
+                continue
+
+            trigger.extreme = price
+            if (is_long and new_level > trigger.level) or (not is_long and new_level < trigger.level):
+                self._remove(trigger)
+                trigger.level = new_level
+                self._insert(trigger)
+
+    def on_tick(self, symbol: str, price: float) -> List[ExitTrigger]:
+        """
+        Process a price tick. Breached triggers are disarmed (together with
+        the other levels of the same position) and handed to the close callback.
+        """
+        if price <= 0:
+            return []
+
+        tick_at = time.monotonic()
+        self._trail(symbol, price)
+
+        fired: List[ExitTrigger] = []
+        below = self._below.get(symbol)
+        while below and price <= below[-1][0]:
+            fired.append(self._triggers[below[-1][1]])
+            self.disarm(symbol, fired[-1].side)
+
+        above = self._above.get(symbol)
+        while above and price >= above[0][0]:
+            fired.append(self._triggers[above[0][1]])
+            self.disarm(symbol, fired[-1].side)
+
+        for trigger in fired:
+            self._dispatch(trigger, price, tick_at)
+
+        return fired
+
+    def _dispatch(self, trigger: ExitTrigger, price: float, tick_at: float):
+        """Hand a fired trigger to the close callback without blocking the feed"""
+        self.fired_count += 1
+
+        async def run():
+            try:
+                await self._on_trigger(trigger, price)
+            except Exception as e:
+                print(f"Exit engine: close for {trigger.symbol} failed: {e}")
+            finally:
+                self.last_fire_latency_ms = (time.monotonic() - tick_at) * 1000
+
+        try:
+            task = asyncio.get_running_loop().create_task(run())
+        except RuntimeError:
+            print(f"Exit engine: no running loop to close {trigger.symbol}")
+            return
+
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get_stats(self) -> dict:
+        """Get exit engine statistics"""
+        return {
+            "armed_triggers": len(self._triggers),
+            "symbols": len(self.symbols()),
+            "fired": self.fired_count,
+            "last_fire_latency_ms": self.last_fire_latency_ms
+        }
@@ -3,6 +3,7 @@ Order Manager - Handles trade execution via WEEX API
 With integrated AI log upload for hackathon compliance
 """
 import uuid
+import time
 import asyncio
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -10,7 +11,13 @@ from data.data_models import (
     TradeDecision, Trade, Position, OrderSide, TradeAction
 )
 from data.weex_client import weex_client
-from data.ai_log_uploader import ai_log_uploader
+from data.market_data import market_data_service
+from data.ai_log_queue import ai_log_queue
+from execution.position_book import PositionBook
+from execution.exit_engine import ExitEngine, ExitTrigger
+from execution.paper_exchange import paper_exchange
+from execution.trade_journal import trade_journal
+from signals.risk_metrics import risk_metrics
 from config.settings import settings
 
 
@@ -20,19 +27,47 @@ class OrderManager:
     """
     
     def __init__(self):
-        self.positions: List[Position] = []
-        self.trade_history: List[Trade] = []
+        self.book = PositionBook()
+        self.trade_history: List[Trade] = []  # Recent trades; full history lives in the journal
+        self._stats = {"total_trades": 0, "winning_trades": 0, "total_pnl": 0.0}
         self.account_balance = settings.demo_balance  # Use configured balance
         self.demo_mode = settings.demo_mode  # Track demo mode state
+        self._last_mark_at = 0.0
+        self._mark_lock = asyncio.Lock()
+        self.exit_engine = ExitEngine(self._on_exit_trigger)
+        self._exit_poll_task: Optional[asyncio.Task] = None
+    
+    @property
+    def positions(self) -> List[Position]:
+        """Open positions as a list (read-only view of the position book)"""
+        return self.book.positions()
     
     def set_demo_mode(self, enabled: bool):
         """Toggle demo mode"""
         self.demo_mode = enabled
         if enabled:
             # Reset to demo balance when entering demo mode
-            self.account_balance = settings.demo_balance
+            self._set_balance(settings.demo_balance)
         print(f"Demo mode {'enabled' if enabled else 'disabled'}")
     
+    async def _get_price(self, symbol: str) -> float:
+        """Current price from WEEX, or from the paper exchange's book in demo mode"""
+        if self.demo_mode:
+            return await paper_exchange.get_mark_price(symbol)
+        ticker = await weex_client.get_ticker(symbol)
+        return ticker.last_price
+    
+    @staticmethod
+    def _exit_prices(decision: TradeDecision, price: float) -> tuple:
+        """Stop-loss and take-profit prices for a decision entered at `price`"""
+        if decision.action == TradeAction.LONG:
+            stop_loss_price = price * (1 - decision.stop_loss_pct / 100)
+            take_profit_price = price * (1 + decision.take_profit_pct / 100)
+        else:
+            stop_loss_price = price * (1 + decision.stop_loss_pct / 100)
+            take_profit_price = price * (1 - decision.take_profit_pct / 100)
+        return stop_loss_price, take_profit_price
+    
     async def execute_trade(
         self, 
         decision: TradeDecision,
@@ -50,14 +85,14 @@ class OrderManager:
             return None
         
         order_id = None
+        fee = 0.0
         
         try:
             # Calculate position size
             size_usd = self.account_balance * (decision.size_pct / 100)
             
             # Get current price
-            ticker = await weex_client.get_ticker(decision.symbol)
-            current_price = ticker.last_price
+            current_price = await self._get_price(decision.symbol)
             
             # Calculate quantity
             quantity = size_usd / current_price
@@ -66,12 +101,7 @@ class OrderManager:
             side = OrderSide.BUY if decision.action == TradeAction.LONG else OrderSide.SELL
             
             # Calculate stop-loss and take-profit prices
-            if decision.action == TradeAction.LONG:
-                stop_loss_price = current_price * (1 - decision.stop_loss_pct / 100)
-                take_profit_price = current_price * (1 + decision.take_profit_pct / 100)
-            else:
-                stop_loss_price = current_price * (1 + decision.stop_loss_pct / 100)
-                take_profit_price = current_price * (1 - decision.take_profit_pct / 100)
+            stop_loss_price, take_profit_price = self._exit_prices(decision, current_price)
             
             # Place order via WEEX API (only in live mode)
             if not self.demo_mode:
@@ -86,7 +116,27 @@ class OrderManager:
                 # Extract order ID for AI log
                 order_id = order_result.get("order_id") or order_result.get("orderId")
             else:
-                print(f" [DEMO] Simulated order: {side.value} {quantity:.6f} {decision.symbol} @ ${current_price:.2f}")
+                fill = await paper_exchange.place_order(
+                    symbol=decision.symbol,
+                    side=side,
+                    size=quantity,
+                    leverage=decision.leverage,
+                    order_type="market"
+                )
+                if fill["filled_size"] <= 0:
+                    print(f" [DEMO] Order rejected: no liquidity for {decision.symbol}")
+                    return None
+                
+                order_id = fill["order_id"]
+                quantity = fill["filled_size"]
+                current_price = fill["avg_price"]
+                fee = fill["fee"]
+                self._set_balance(self.account_balance - fee)
+                stop_loss_price, take_profit_price = self._exit_prices(decision, current_price)
+                print(
+                    f" [DEMO] Paper fill ({fill['status']}): {side.value} {quantity:.6f} {decision.symbol} "
+                    f"@ ${current_price:.2f} (fee ${fee:.4f})"
+                )
             
             # Create trade record
             trade = Trade(
@@ -97,6 +147,7 @@ class OrderManager:
                 size=quantity,
                 price=current_price,
                 leverage=decision.leverage,
+                fee=fee,
                 reasoning=decision.reasoning,
                 executed_at=datetime.now()
             )
@@ -113,19 +164,24 @@ class OrderManager:
                 unrealized_pnl_pct=0,
                 stop_loss=stop_loss_price,
                 take_profit=take_profit_price,
+                trailing_stop_pct=decision.trailing_stop_pct,
                 opened_at=datetime.now()
             )
             
-            self.positions.append(position)
-            self.trade_history.append(trade)
+            # Mutate first, then journal: a snapshot taken by _journal must include this change
+            payload = position.dict()
+            position = self.book.open(position)
+            self._journal("open", payload, decision.symbol)
+            self._arm_exits(position)
+            self._commit_trade(trade)
             
-            # Upload AI log for hackathon compliance (non-blocking)
-            asyncio.create_task(self._upload_trade_ai_log(
+            # Queue AI log for hackathon compliance (spooled, uploaded in background)
+            self._queue_trade_ai_log(
                 decision=decision,
                 current_price=current_price,
                 order_id=order_id,
                 debate_context=debate_context
-            ))
+            )
             
             return trade
             
@@ -133,7 +189,7 @@ class OrderManager:
             print(f"Error executing trade: {e}")
             return None
     
-    async def _upload_trade_ai_log(
+    def _queue_trade_ai_log(
         self,
         decision: TradeDecision,
         current_price: float,
@@ -141,8 +197,8 @@ class OrderManager:
         debate_context: Optional[Dict[str, Any]] = None
     ):
         """
-        Upload AI log to WEEX for hackathon compliance.
-        This runs in the background to not block trade execution.
+        Queue AI log upload to WEEX for hackathon compliance.
+        The log is spooled to disk and uploaded by the AI log queue workers.
         """
         try:
             input_data = {
@@ -185,7 +241,7 @@ class OrderManager:
                 f"{decision.reasoning[:500] if decision.reasoning else ''}"
             )
             
-            await ai_log_uploader.upload_ai_log(
+            ai_log_queue.submit(
                 stage="Order Execution",
                 model="Claude-3.5-sonnet (AWS Bedrock)",
                 input_data=input_data,
@@ -195,73 +251,99 @@ class OrderManager:
             )
             
         except Exception as e:
-            print(f" Failed to upload AI log (non-critical): {e}")
+            print(f" Failed to queue AI log (non-critical): {e}")
     
     async def close_position(
         self, 
         symbol: str, 
-        reason: str = "Manual close"
+        reason: str = "Manual close",
+        side: Optional[OrderSide] = None,
+        price: Optional[float] = None
     ) -> Optional[Trade]:
         """
-        Close an open position
+        Close an open position.
+        With hedged positions, `side` selects which one (long is closed by default).
+        A known `price` (e.g. the tick that fired a stop) skips the ticker fetch.
         """
-        position = next(
-            (p for p in self.positions if p.symbol == symbol), 
-            None
-        )
+        position = self.book.get(symbol, side)
         
         if not position:
             return None
         
         try:
-            # Get current price
-            ticker = await weex_client.get_ticker(symbol)
-            current_price = ticker.last_price
+            # Close order side is opposite
+            close_side = OrderSide.SELL if position.side == OrderSide.BUY else OrderSide.BUY
+            close_size = position.size
+            fee = 0.0
+            
+            if self.demo_mode:
+                # Fill against the paper exchange; the fill price is the exit price
+                fill = await paper_exchange.place_order(
+                    symbol=symbol,
+                    side=close_side,
+                    size=position.size,
+                    leverage=position.leverage,
+                    order_type="market"
+                )
+                if fill["filled_size"] <= 0:
+                    print(f" [DEMO] Close rejected: no liquidity for {symbol}")
+                    return None
+                close_size = fill["filled_size"]
+                current_price = fill["avg_price"]
+                fee = fill["fee"]
+            else:
+                # Get current price
+                if price:
+                    current_price = price
+                else:
+                    ticker = await weex_client.get_ticker(symbol)
+                    current_price = ticker.last_price
+                
+                # Place close order
+                await weex_client.place_order(
+                    symbol=symbol,
+                    side=close_side,
+                    size=position.size,
+                    leverage=position.leverage
+                )
             
             # Calculate P&L
             if position.side == OrderSide.BUY:
-                pnl = (current_price - position.entry_price) * position.size
+                pnl = (current_price - position.entry_price) * close_size
                 pnl_pct = ((current_price - position.entry_price) / position.entry_price) * 100
             else:
-                pnl = (position.entry_price - current_price) * position.size
+                pnl = (position.entry_price - current_price) * close_size
                 pnl_pct = ((position.entry_price - current_price) / position.entry_price) * 100
             
             # Account for leverage
             pnl_pct *= position.leverage
             
-            # Close order side is opposite
-            close_side = OrderSide.SELL if position.side == OrderSide.BUY else OrderSide.BUY
-            
-            # Place close order
-            await weex_client.place_order(
-                symbol=symbol,
-                side=close_side,
-                size=position.size,
-                leverage=position.leverage
-            )
-            
             # Create close trade record
             trade = Trade(
                 id=str(uuid.uuid4()),
                 symbol=symbol,
                 side=close_side,
                 action=TradeAction.CLOSE,
-                size=position.size,
+                size=close_size,
                 price=current_price,
                 leverage=position.leverage,
                 pnl=pnl,
                 pnl_pct=pnl_pct,
+                fee=fee,
                 reasoning=reason,
                 executed_at=datetime.now()
             )
             
             # Update account balance
-            self.account_balance += pnl
+            self._set_balance(self.account_balance + pnl - fee)
             
-            # Remove position
-            self.positions = [p for p in self.positions if p.symbol != symbol]
+            # Remove position (or the part that was filled)
+            self.book.reduce(symbol, position.side, close_size)
+            self._journal("reduce", {"symbol": symbol, "side": position.side.value, "size": close_size}, symbol)
+            if (symbol, position.side) not in self.book:
+                self.exit_engine.disarm(symbol, position.side)
             
-            self.trade_history.append(trade)
+            self._commit_trade(trade)
             
             return trade
             
@@ -269,51 +351,245 @@ class OrderManager:
             print(f"Error closing position: {e}")
             return None
     
-    async def update_positions(self):
+    # ==================== Journal ====================
+    
+    def _journal(self, kind: str, payload: Dict[str, Any], symbol: Optional[str] = None):
+        """Append a state change to the trade journal, snapshotting when due"""
+        if trade_journal.append(kind, payload, symbol):
+            trade_journal.snapshot(self._journal_state())
+    
+    def _journal_state(self) -> Dict[str, Any]:
+        """Full in-memory state for a journal snapshot"""
+        return {
+            "balance": self.account_balance,
+            "positions": [p.dict() for p in self.book],
+            "stats": dict(self._stats),
+            "recent_trades": [t.dict() for t in self.trade_history]
+        }
+    
+    def _set_balance(self, balance: float):
+        """Update the account balance and journal it"""
+        self.account_balance = balance
+        self._journal("balance", {"balance": balance})
+    
+    def _record_trade(self, trade: Trade):
+        """Add a trade to the in-memory history and running stats"""
+        self.trade_history.append(trade)
+        if len(self.trade_history) > settings.trade_history_memory_limit:
+            del self.trade_history[:-settings.trade_history_memory_limit]
+        
+        self._stats["total_trades"] += 1
+        if trade.pnl and trade.pnl > 0:
+            self._stats["winning_trades"] += 1
+        self._stats["total_pnl"] += trade.pnl or 0
+    
+    def _commit_trade(self, trade: Trade):
+        """Record and journal an executed trade"""
+        self._record_trade(trade)
+        self._journal("trade", trade.dict(), trade.symbol)
+    
+    def _apply_journal_event(self, kind: str, payload: Dict[str, Any]):
+        """Replay one journal event onto the in-memory state"""
+        if kind == "open":
+            self.book.open(Position(**payload))
+        elif kind == "reduce":
+            self.book.reduce(payload["symbol"], OrderSide(payload["side"]), payload["size"])
+        elif kind == "trade":
+            self._record_trade(Trade(**payload))
+        elif kind == "balance":
+            self.account_balance = payload["balance"]
+    
+    def restore_from_journal(self):
         """
-        Update all position prices and P&L
+        Rebuild positions, balance and stats from the latest journal snapshot
+        plus the events after it, then start journaling new changes.
         """
-        for position in self.positions:
+        if not settings.journal_enabled:
+            return
+        
+        try:
+            state, events = trade_journal.load()
+        except Exception as e:
+            print(f"Error loading trade journal, starting empty: {e}")
+            state, events = None, []
+        
+        if state:
+            self.account_balance = state["balance"]
+            self.book.clear()
+            for data in state["positions"]:
+                self.book.open(Position(**data))
+            self._stats = dict(state["stats"])
+            self.trade_history = [Trade(**t) for t in state["recent_trades"]]
+        
+        for kind, payload in events:
             try:
-                ticker = await weex_client.get_ticker(position.symbol)
-                position.current_price = ticker.last_price
-                
-                if position.side == OrderSide.BUY:
-                    pnl = (position.current_price - position.entry_price) * position.size
-                    pnl_pct = ((position.current_price - position.entry_price) / position.entry_price) * 100
-                else:
-                    pnl = (position.entry_price - position.current_price) * position.size
-                    pnl_pct = ((position.entry_price - position.current_price) / position.entry_price) * 100
+                self._apply_journal_event(kind, payload)
+            except Exception as e:
+                print(f"Error replaying journal event {kind}: {e}")
+        
+        for position in self.book:
+            self._arm_exits(position)
+        
+        trade_journal.open()
+        if events:
+            # Fold the replayed tail into a fresh snapshot for the next restart
+            trade_journal.snapshot(self._journal_state())
+        print(
+            f"Trade journal restored: {len(self.book)} positions, "
+            f"{self._stats['total_trades']} trades, replayed {len(events)} events"
+        )
+    
+    # ==================== Exit Engine ====================
+    
+    def _arm_exits(self, position: Position):
+        """Register a position's stop-loss / take-profit with the exit engine"""
+        self.exit_engine.arm(
+            symbol=position.symbol,
+            side=position.side,
+            price=position.current_price,
+            stop_loss=position.stop_loss,
+            take_profit=position.take_profit,
+            trail_pct=position.trailing_stop_pct
+        )
+    
+    async def _on_exit_trigger(self, trigger: ExitTrigger, price: float):
+        """Close the position whose exit level was breached"""
+        print(f" Exit trigger: {trigger.kind} on {trigger.symbol} ({trigger.side.value}) at ${price:.2f}")
+        await self.close_position(
+            trigger.symbol,
+            reason=f"{trigger.kind.replace('_', ' ').title()} hit at ${price:.2f}",
+            side=trigger.side,
+            price=price
+        )
+        
+        # Close failed or only partially filled - re-arm so the next tick retries
+        position = self.book.get(trigger.symbol, trigger.side)
+        if position:
+            self._arm_exits(position)
+    
+    def _on_market_update(self, kind: str, symbol: str, payload: Any):
+        """Market data listener feeding ticks into the exit engine"""
+        if kind == "ticker":
+            self.exit_engine.on_tick(symbol, payload.last_price)
+    
+    async def _exit_poll_loop(self):
+        """Keep ticks flowing for symbols with armed exits between debate cycles"""
+        while True:
+            try:
+                symbols = self.exit_engine.symbols()
+                if symbols:
+                    # Fetched tickers reach the engine through the market data listener
+                    await market_data_service.get_tickers(
+                        symbols, 
+                        max_age=settings.exit_engine_poll_seconds
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling exit engine ticks: {e}")
+            
+            await asyncio.sleep(settings.exit_engine_poll_seconds)
+    
+    def start_exit_engine(self):
+        """Subscribe the exit engine to the market data feed and start polling"""
+        market_data_service.add_listener(self._on_market_update)
+        if self._exit_poll_task is None or self._exit_poll_task.done():
+            self._exit_poll_task = asyncio.create_task(self._exit_poll_loop())
+    
+    def stop_exit_engine(self):
+        """Stop the exit engine poll loop and unsubscribe from the feed"""
+        market_data_service.remove_listener(self._on_market_update)
+        if self._exit_poll_task:
+            self._exit_poll_task.cancel()
+            self._exit_poll_task = None
+    
+    async def update_positions(self, force: bool = False):
+        """
+        Mark all positions to market in one pass.
+        Tickers come from the market data cache or a single bulk request, and
+        calls within `mark_to_market_interval_seconds` of the last mark reuse it.
+        """
+        async with self._mark_lock:
+            # Concurrent callers queue on the lock and then see the fresh mark
+            age = time.monotonic() - self._last_mark_at
+            if not force and age < settings.mark_to_market_interval_seconds:
+                return
+            
+            symbols = self.book.symbols()
+            if not symbols:
+                self._last_mark_at = time.monotonic()
+                return
+            
+            try:
+                tickers = await market_data_service.get_tickers(symbols)
+                self.book.mark_many({
+                    symbol: ticker.last_price
+                    for symbol, ticker in tickers.items()
+                    if ticker.last_price > 0
+                })
+                self._last_mark_at = time.monotonic()
                 
-                position.unrealized_pnl = pnl
-                position.unrealized_pnl_pct = pnl_pct * position.leverage
+                missing = [s for s in symbols if s not in tickers]
+                if missing:
+                    print(f"Error updating positions, no price for: {', '.join(missing)}")
                 
             except Exception as e:
-                print(f"Error updating position {position.symbol}: {e}")
+                print(f"Error updating positions: {e}")
     
     def get_total_exposure(self) -> float:
         """
-        Calculate total portfolio exposure
+        Calculate total portfolio exposure (O(1) from the position book's running totals)
         """
-        total = sum(
-            p.size * p.current_price * p.leverage 
-            for p in self.positions
-        )
-        return (total / self.account_balance) * 100 if self.account_balance > 0 else 0
+        return self.book.exposure_pct(self.account_balance)
+    
+    def get_portfolio_risk(self) -> dict:
+        """Get portfolio risk metrics for the open positions"""
+        return risk_metrics.calculate_book_risk(self.book, self.account_balance)
     
     def get_positions(self) -> List[Position]:
         """Get all open positions"""
-        return self.positions
+        return self.book.positions()
     
     def get_trade_history(self, limit: int = 50) -> List[Trade]:
         """Get recent trade history"""
         return self.trade_history[-limit:]
     
+    async def query_trades(
+        self,
+        symbol: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> tuple:
+        """
+        Query trade history newest-first from the journal with keyset pagination.
+        Returns (trades, next_cursor). Falls back to in-memory history when
+        the journal isn't open.
+        """
+        if not trade_journal.is_open:
+            trades = [
+                t.dict() for t in reversed(self.trade_history)
+                if (not symbol or t.symbol == symbol)
+                and (start is None or t.executed_at >= start)
+                and (end is None or t.executed_at < end)
+            ]
+            return trades[:limit], None
+        
+        return await asyncio.to_thread(
+            trade_journal.query_trades,
+            symbol,
+            start.timestamp() if start else None,
+            end.timestamp() if end else None,
+            cursor,
+            limit
+        )
+    
     def get_stats(self) -> dict:
         """Get trading statistics"""
-        total_trades = len(self.trade_history)
-        winning_trades = len([t for t in self.trade_history if t.pnl and t.pnl > 0])
-        total_pnl = sum(t.pnl or 0 for t in self.trade_history)
+        total_trades = self._stats["total_trades"]
+        winning_trades = self._stats["winning_trades"]
+        total_pnl = self._stats["total_pnl"]
         
         return {
             "account_balance": self.account_balance,
@@ -321,8 +597,9 @@ class OrderManager:
             "winning_trades": winning_trades,
             "win_rate": (winning_trades / total_trades * 100) if total_trades > 0 else 0,
             "total_pnl": total_pnl,
-            "open_positions": len(self.positions),
-            "total_exposure_pct": self.get_total_exposure()
+            "open_positions": len(self.book),
+            "total_exposure_pct": self.get_total_exposure(),
+            "exit_engine": self.exit_engine.get_stats()
         }
 
 
@@ -0,0 +1,265 @@
+"""
+Paper Exchange - In-process simulated exchange for demo mode and load tests
+Fills market and limit orders against the locally held order book
+"""
+import asyncio
+import random
+import uuid
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from data.data_models import OrderBook, OrderSide
+from data.market_data import market_data_service
+from config.settings import settings
+
+
+@dataclass
+class PaperOrder:
+    """A simulated order and its fill state"""
+    id: str
+    symbol: str
+    side: OrderSide
+    size: float
+    order_type: str  # "market" or "limit"
+    price: Optional[float] = None
+    leverage: int = 1
+    client_oid: Optional[str] = None
+    filled_size: float = 0.0
+    notional: float = 0.0
+    fee: float = 0.0
+    status: str = "new"
+    fills: List[Dict[str, float]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def remaining(self) -> float:
+        return max(self.size - self.filled_size, 0.0)
+
+    @property
+    def avg_price(self) -> float:
+        return self.notional / self.filled_size if self.filled_size > 0 else 0.0
+
+
+class PaperExchange:
+    """
+    Simulated matching engine.
+
+    Market orders sweep the opposite side of the latest order book snapshot
+    (taker fee + slippage); any size the book can't absorb is cancelled,
+    giving realistic partial fills. Limit orders take whatever crosses and
+    rest the remainder, which is matched against later book snapshots at
+    the maker fee. Liquidity consumed from a snapshot stays consumed until
+    the next snapshot arrives, so bursts of orders walk the book. Taker
+    orders refresh a book older than the source's cache TTL first, so fills
+    between debate cycles (e.g. exit-triggered closes) see current depth.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = settings.paper_latency_ms,
+        latency_jitter_ms: float = settings.paper_latency_jitter_ms,
+        slippage_bps: float = settings.paper_slippage_bps,
+        taker_fee_bps: float = settings.paper_taker_fee_bps,
+        maker_fee_bps: float = settings.paper_maker_fee_bps,
+        liquidity_fraction: float = settings.paper_liquidity_fraction
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.slippage_bps = slippage_bps
+        self.taker_fee_bps = taker_fee_bps
+        self.maker_fee_bps = maker_fee_bps
+        self.liquidity_fraction = liquidity_fraction
+        self._books: Dict[str, OrderBook] = {}
+        self._book_times: Dict[str, float] = {}
+        self._consumed: Dict[str, Dict[Tuple[str, float], float]] = {}
+        self._open_orders: Dict[str, PaperOrder] = {}
+        self.orders_placed = 0
+        self.orders_filled = 0
+
+    # ==================== Book Handling ====================
+
+    def on_market_update(self, kind: str, symbol: str, payload: Any):
+        """Market data listener: track the latest book and match resting orders"""
+        if kind != "orderbook":
+            return
+        self._book_times[symbol] = time.monotonic()
+        held = self._books.get(symbol)
+        if held is not None and held.timestamp == payload.timestamp:
+            return  # Same snapshot re-served: consumed liquidity stays consumed
+        self._books[symbol] = payload
+        self._consumed[symbol] = {}
+        self._match_resting(symbol)
+
+    async def _get_book(self, symbol: str, refresh: bool = False) -> Optional[OrderBook]:
+        """
+        Latest local book for a symbol, pulling a snapshot if none is held
+        (or, with refresh, if the held one is older than the source's cache TTL)
+        """
+        age = time.monotonic() - self._book_times.get(symbol, 0.0)
+        if symbol not in self._books or (refresh and age >= market_data_service.source.cache_ttl):
+            try:
+                orderbook = await market_data_service.get_orderbook(symbol)
+            except Exception as e:
+                if symbol in self._books:
+                    print(f"Paper exchange book refresh failed for {symbol}, using held book: {e}")
+                    return self._books[symbol]
+                orderbook = (await market_data_service.get_market_data(symbol)).orderbook
+            # Listener may not be registered (e.g. standalone use)
+            self.on_market_update("orderbook", symbol, orderbook)
+        return self._books.get(symbol)
+
+    async def get_mark_price(self, symbol: str) -> float:
+        """Mid price of the local book"""
+        book = await self._get_book(symbol)
+        if book is None or not book.bids or not book.asks:
+            raise Exception(f"No paper order book for {symbol}")
+        return (book.bids[0].price + book.asks[0].price) / 2
+
+    # ==================== Matching ====================
+
+    def _fill(self, order: PaperOrder, taker: bool) -> bool:
+        """Match an order against its symbol's book. Returns True if anything filled."""
+        book = self._books.get(order.symbol)
+        if book is None or order.remaining <= 0:
+            return False
+
+        is_buy = order.side == OrderSide.BUY
+        levels = book.asks if is_buy else book.bids
+        book_side = "ask" if is_buy else "bid"
+        consumed = self._consumed.setdefault(order.symbol, {})
+        fee_bps = self.taker_fee_bps if taker else self.maker_fee_bps
+        slip = self.slippage_bps / 10_000 if taker else 0.0
+        filled_any = False
+
+        for level in levels:
+            if order.remaining <= 0:
+                break
+            if order.order_type == "limit" and order.price is not None:
+                crosses = level.price <= order.price if is_buy else level.price >= order.price
+                if not crosses:
+                    break
+
+            key = (book_side, level.price)
+            available = level.quantity * self.liquidity_fraction - consumed.get(key, 0.0)
+            if available <= 0:
+                continue
+
+            qty = min(order.remaining, available)
+            price = level.price * (1 + slip) if is_buy else level.price * (1 - slip)
+            notional = qty * price
+            fee = notional * fee_bps / 10_000
+
+            consumed[key] = consumed.get(key, 0.0) + qty
+            order.filled_size += qty
+            order.notional += notional
+            order.fee += fee
+            order.fills.append({"price": price, "size": qty, "fee": fee})
+            filled_any = True
+
+        return filled_any
+
+    def _finalize(self, order: PaperOrder):
+        """Set order status after a matching pass"""
+        if order.remaining <= 1e-12:
+            order.status = "filled"
+            self._open_orders.pop(order.id, None)
+            self.orders_filled += 1
+        elif order.order_type == "market":
+            # Unfilled market remainder is cancelled (IOC semantics)
+            order.status = "partially_filled" if order.filled_size > 0 else "rejected"
+        else:
+            order.status = "partially_filled" if order.filled_size > 0 else "open"
+            self._open_orders[order.id] = order
+
+    def _match_resting(self, symbol: str):
+        """Match resting limit orders against a new book snapshot"""
+        for order in [o for o in self._open_orders.values() if o.symbol == symbol]:
+            if self._fill(order, taker=False):
+                self._finalize(order)
+
+    # ==================== Order API ====================
+
+    async def place_order(
+        self,
+        symbol: str,
+        side: OrderSide,
+        size: float,
+        leverage: int = 1,
+        price: Optional[float] = None,
+        order_type: str = "market",
+        client_oid: Optional[str] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Place a simulated order. Mirrors WEEXClient.place_order's signature;
+        exchange-only kwargs (stop_loss, take_profit, margin_mode) are ignored.
+        """
+        if self.latency_ms > 0:
+            jitter = random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+            await asyncio.sleep(max(self.latency_ms + jitter, 0) / 1000)
+
+        order = PaperOrder(
+            id=f"paper_{uuid.uuid4().hex[:16]}",
+            symbol=symbol,
+            side=side,
+            size=size,
+            order_type="limit" if order_type == "limit" and price else "market",
+            price=price,
+            leverage=leverage,
+            client_oid=client_oid
+        )
+        self.orders_placed += 1
+
+        await self._get_book(symbol, refresh=True)
+        self._fill(order, taker=True)
+        self._finalize(order)
+
+        return self._to_result(order)
+
+    def cancel_order(self, order_id: str) -> dict:
+        """Cancel a resting simulated order"""
+        order = self._open_orders.pop(order_id, None)
+        if order is None:
+            return {"order_id": order_id, "status": "not_found", "simulated": True}
+        order.status = "cancelled"
+        return self._to_result(order)
+
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[dict]:
+        """Get resting simulated orders"""
+        return [
+            self._to_result(o) for o in self._open_orders.values()
+            if symbol is None or o.symbol == symbol
+        ]
+
+    def _to_result(self, order: PaperOrder) -> dict:
+        return {
+            "order_id": order.id,
+            "client_oid": order.client_oid,
+            "symbol": order.symbol,
+            "side": order.side.value,
+            "order_type": order.order_type,
+            "status": order.status,
+            "size": order.size,
+            "filled_size": order.filled_size,
+            "avg_price": order.avg_price,
+            "fee": order.fee,
+            "fills": list(order.fills),
+            "simulated": True
+        }
+
+    def get_stats(self) -> dict:
+        """Get paper exchange statistics"""
+        return {
+            "orders_placed": self.orders_placed,
+            "orders_filled": self.orders_filled,
+            "open_orders": len(self._open_orders),
+            "latency_ms": self.latency_ms,
+            "slippage_bps": self.slippage_bps,
+            "taker_fee_bps": self.taker_fee_bps,
+            "maker_fee_bps": self.maker_fee_bps
+        }
+
+
+# Singleton instance
+paper_exchange = PaperExchange()
+market_data_service.add_listener(paper_exchange.on_market_update)
@@ -5,15 +5,46 @@ import asyncio
 import time
 import traceback
 from decimal import Decimal
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Set, Tuple
 from dotenv import load_dotenv
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# ERC-20 contracts used for batched transfers: (network, asset) -> (address, decimals)
+TOKEN_CONTRACTS = {
+    ("base-sepolia", "usdc"): ("0x036CbD53842c5426634e7929541eC2318f3dCF7e", 6),
+    ("base", "usdc"): ("0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913", 6),
+}
+ERC20_TRANSFER_SELECTOR = "a9059cbb"
+
+# Starting balance in mock mode
+MOCK_BALANCE = Decimal("100.00")
+
+# Final user operation states that mean the calls went through
+USER_OP_SUCCESS = {"complete", "completed", "success"}
+
+def encode_erc20_transfer(recipient: str, amount_units: int) -> str:
+    """ABI-encode transfer(address,uint256) calldata"""
+    return (
+        "0x" + ERC20_TRANSFER_SELECTOR
+        + recipient.lower().replace("0x", "").rjust(64, "0")
+        + format(amount_units, "x").rjust(64, "0")
+    )
+
 class PaymentManager:
     """
     Manages crypto payments using Coinbase Developer Platform (CDP) Wallets (SDK v1.x).
     Handles x402 payment flows and persistent wallet management using a local EOA owner.
+
+    Payments requested within `batch_window_ms` of each other are settled
+    together as one smart-account user operation (one confirmation wait and
+    one balance refresh), falling back to sequential transfers if the batch
+    can't be built or sent.
+
+    Balances are cached: receipts deduct from the cache immediately, a
+    background loop reconciles it against the chain, and routes/WebSocket
+    updates read the cache without a network call.
     """
     
     def __init__(self):
@@ -25,6 +56,17 @@ class PaymentManager:
         self.network = "base-sepolia"
         self.wallet_file = "wallet_seed.json"
         self.audit_log = []
+        self.batch_window_ms = settings.payment_batch_window_ms
+        self.batch_max_size = settings.payment_batch_max_size
+        self._batch: List[Tuple[str, float, str, str, asyncio.Future]] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._settle_tasks: Set[asyncio.Task] = set()
+        self.batches_settled = 0
+        self.batched_payments = 0
+        self._balances: Dict[str, Decimal] = {}
+        self.balance_synced_at: Optional[float] = None
+        self.reconcile_interval = settings.wallet_reconcile_seconds
+        self._reconcile_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """Schedule initialization in background so server can start immediately."""
@@ -41,7 +83,7 @@ class PaymentManager:
 
             if not api_key_name or not api_key_secret:
                 logger.warning("CDP credentials not found. Initializing in MOCK mode.")
-                self.mode = "mock"
+                self._init_mock()
                 return
 
             # Deferred imports to avoid circular issues or missing dependencies in mock
@@ -86,56 +128,227 @@ class PaymentManager:
             logger.info(f"Payment Manager Mode: REAL (CDP)")
             logger.info(f"Smart Wallet Address: {self.address}")
 
-            # Initial balance check and broadcast
+            # Initial balance sync and broadcast, then keep the cache reconciled
+            await self.reconcile_balance()
             await self.broadcast_balance()
+            if self._reconcile_task is None:
+                self._reconcile_task = asyncio.create_task(self._reconcile_loop())
 
         except Exception as e:
             logger.error(f"CDP WALLET INITIALIZATION FAILED: {str(e)}")
             logger.error(traceback.format_exc())
             logger.warning("Falling back to MOCK mode.")
-            self.mode = "mock"
-            self.address = "0xMockAddress123456789"
+            self._init_mock()
+
+    def _init_mock(self):
+        """Mock mode with a seeded balance, so payments deduct from the first one"""
+        self.mode = "mock"
+        self.address = "0xMockAddress123456789"
+        self._balances.setdefault("eth", MOCK_BALANCE)
+        self._balances.setdefault("usdc", MOCK_BALANCE)
+        self.balance_synced_at = time.time()
+
+    async def close(self):
+        """Stop the reconcile loop and let in-flight batch settlements finish"""
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+        if self._batch:
+            self._flush_batch()
+        if self._settle_tasks:
+            await asyncio.gather(*self._settle_tasks, return_exceptions=True)
 
-    async def get_balance(self, asset_id: str = "eth") -> Decimal:
-        """Get the current wallet balance."""
+    async def get_balance(self, asset_id: str = "eth", refresh: bool = False) -> Decimal:
+        """Get the wallet balance from cache (synced from the network on first use or when refresh=True)."""
+        if refresh or self.balance_synced_at is None:
+            await self.reconcile_balance()
+        
         if self.mode == "mock":
-            return Decimal("100.00")
+            return self._balances.setdefault(asset_id.lower(), MOCK_BALANCE)
+        return self._balances.get(asset_id.lower(), Decimal("0.00"))
+
+    async def reconcile_balance(self) -> bool:
+        """Replace cached balances with on-chain values. Returns True if anything changed."""
+        if self.mode == "mock":
+            self.balance_synced_at = time.time()
+            return False
         
         try:
-            logger.info(f"DEBUG: get_balance calling list_token_balances for {self.wallet.address} on {self.network}...")
             # Use EvmClient to get balance for the smart account
             balances = await self.client.evm.list_token_balances(
                 address=self.wallet.address,
                 network=self.network
             )
-            logger.info(f"DEBUG: list_token_balances returned {len(balances.balances)} entries.")
-            
-            # Look for the specified asset (defaulting to ETH)
-            for b in balances.balances:
-                if b.asset_id.lower() == asset_id.lower():
-                    return Decimal(str(b.amount))
-            
-            return Decimal("0.00")
+            fresh = {b.asset_id.lower(): Decimal(str(b.amount)) for b in balances.balances}
         except Exception as e:
             logger.error(f"Error getting balance: {e}")
-            return Decimal("0.00")
+            return False
+        
+        changed = fresh != self._balances
+        self._balances = fresh
+        self.balance_synced_at = time.time()
+        return changed
+
+    async def _reconcile_loop(self):
+        """Periodically reconcile the cached balance, broadcasting when it drifts"""
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                if await self.reconcile_balance():
+                    await self.broadcast_balance()
+            except Exception as e:
+                logger.warning(f"Balance reconcile failed: {e}")
+
+    def _apply_receipt(self, receipt: Dict):
+        """Optimistically deduct a successful payment from the cached balance"""
+        asset = str(receipt.get("asset", "")).lower()
+        if asset in self._balances:
+            self._balances[asset] -= Decimal(str(receipt["amount"]))
 
     async def pay(self, address: str, amount: float, asset_id: str = "eth", reason: str = "") -> Dict:
-        """Process a real or mock payment."""
+        """Process a real or mock payment, batched with concurrent payments."""
         logger.info(f"PAY REQUEST: Paying {amount} {asset_id} to {address} ({reason})")
         
+        if self.batch_window_ms <= 0:
+            receipt = await self._pay_single(address, amount, asset_id, reason)
+            if self.mode == "real" and receipt["status"] == "success":
+                await self.broadcast_balance()
+            return receipt
+        
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((address, amount, asset_id, reason, future))
+        
+        if len(self._batch) >= self.batch_max_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().call_later(
+                self.batch_window_ms / 1000, self._flush_batch
+            )
+        
+        return await future
+
+    def _flush_batch(self):
+        """Hand the collected payments to a settlement task"""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            # Hold a reference so the settlement task isn't garbage-collected mid-flight
+            task = asyncio.create_task(self._settle_batch(batch))
+            self._settle_tasks.add(task)
+            task.add_done_callback(self._settle_tasks.discard)
+
+    async def _settle_batch(self, batch: List[Tuple[str, float, str, str, asyncio.Future]]):
+        """Settle a batch and resolve each caller's future with its own receipt"""
+        payments = [(address, amount, asset_id, reason) for address, amount, asset_id, reason, _ in batch]
+        try:
+            if len(payments) == 1:
+                receipts = [await self._pay_single(*payments[0])]
+            else:
+                receipts = await self._pay_batch(payments)
+        except Exception as e:
+            logger.error(f"BATCH SETTLEMENT FAILED: {e}")
+            receipts = [{"status": "failed", "error": str(e), "timestamp": time.time()} for _ in payments]
+        
+        for (*_, future), receipt in zip(batch, receipts):
+            if not future.done():
+                future.set_result(receipt)
+        
+        # One balance refresh for the whole batch
+        if self.mode == "real" and any(r["status"] == "success" for r in receipts):
+            await self.broadcast_balance()
+
+    def _receipt(self, tx_hash: str, address: str, amount: float, asset_id: str, reason: str, **extra) -> Dict:
+        receipt = {
+            "status": "success",
+            "transaction_hash": tx_hash,
+            "amount": amount,
+            "asset": asset_id,
+            "recipient": address,
+            "reason": reason,
+            "timestamp": time.time(),
+            **extra
+        }
+        self.audit_log.append(receipt)
+        self._apply_receipt(receipt)
+        return receipt
+
+    def _failed(self, error: str, **extra) -> Dict:
+        receipt = {"status": "failed", "error": error, "timestamp": time.time(), **extra}
+        self.audit_log.append(receipt)
+        return receipt
+
+    async def _pay_batch(self, payments: List[Tuple[str, float, str, str]]) -> List[Dict]:
+        """Settle several payments as one user operation"""
+        if self.mode == "mock":
+            await asyncio.sleep(1) # simulate one network confirmation for the batch
+            tx_hash = f"0xMockTx{os.urandom(16).hex()}"
+            logger.info(f"MOCK BATCH PAYMENT SUCCESS: {len(payments)} payments in {tx_hash}")
+            self.batches_settled += 1
+            self.batched_payments += len(payments)
+            return [
+                self._receipt(tx_hash, address, amount, asset_id, reason, batch_size=len(payments), batch_index=i)
+                for i, (address, amount, asset_id, reason) in enumerate(payments)
+            ]
+        
+        try:
+            from cdp.evm_call_types import EncodedCall
+            
+            calls = []
+            for address, amount, asset_id, _ in payments:
+                if asset_id.lower() == "eth":
+                    calls.append(EncodedCall(to=address, value=int(Decimal(str(amount)) * 10**18), data="0x"))
+                    continue
+                contract = TOKEN_CONTRACTS.get((self.network, asset_id.lower()))
+                if contract is None:
+                    raise ValueError(f"No token contract for {asset_id} on {self.network}")
+                token_address, decimals = contract
+                units = int(Decimal(str(amount)) * 10**decimals)
+                calls.append(EncodedCall(to=token_address, data=encode_erc20_transfer(address, units)))
+            
+            user_op = await self.wallet.send_user_operation(calls=calls, network=self.network)
+        except Exception as e:
+            # Nothing was submitted, so paying one by one can't double-pay
+            logger.warning(f"Batched user operation failed ({e}). Falling back to sequential transfers.")
+            return [await self._pay_single(*payment) for payment in payments]
+        
+        # The operation is submitted from here on: report its outcome, never re-pay
+        user_op_hash = user_op.user_op_hash
+        try:
+            logger.info(f"Waiting for batched user operation: {user_op_hash} ({len(calls)} calls)...")
+            result = await self.wallet.wait_for_user_operation(user_op_hash=user_op_hash)
+        except Exception as e:
+            logger.error(f"BATCH PAYMENT UNCONFIRMED: {user_op_hash} ({e})")
+            return [self._failed(f"User operation not confirmed: {e}", user_op_hash=user_op_hash) for _ in payments]
+        
+        status = getattr(result, "status", None)
+        status = str(getattr(status, "value", status) or "unknown").lower()
+        if status not in USER_OP_SUCCESS:
+            logger.error(f"BATCH PAYMENT FAILED: {user_op_hash} ended with status {status}")
+            return [self._failed(f"User operation {status}", user_op_hash=user_op_hash) for _ in payments]
+        
+        tx_hash = getattr(result, "transaction_hash", None) or user_op_hash
+        logger.info(f"REAL BATCH PAYMENT SUCCESS: {len(payments)} payments in {tx_hash}")
+        self.batches_settled += 1
+        self.batched_payments += len(payments)
+        return [
+            self._receipt(
+                tx_hash, address, amount, asset_id, reason,
+                user_op_hash=user_op_hash, batch_size=len(payments), batch_index=i
+            )
+            for i, (address, amount, asset_id, reason) in enumerate(payments)
+        ]
+
+    async def _pay_single(self, address: str, amount: float, asset_id: str = "eth", reason: str = "") -> Dict:
+        """Single transfer, waiting for confirmation."""
         if self.mode == "mock":
             await asyncio.sleep(1) # simulate network latency
-            receipt = {
-                "status": "success",
-                "transaction_hash": f"0xMockTx{os.urandom(16).hex()}",
-                "amount": amount,
-                "asset": asset_id,
-                "recipient": address,
-                "reason": reason,
-                "timestamp": time.time()
-            }
-            self.audit_log.append(receipt)
+            receipt = self._receipt(f"0xMockTx{os.urandom(16).hex()}", address, amount, asset_id, reason)
             logger.info(f"MOCK PAYMENT SUCCESS: {receipt['transaction_hash']}")
             return receipt
 
@@ -151,21 +364,8 @@ class PaymentManager:
             logger.info(f"Waiting for transaction: {invocation.transaction_hash}...")
             await invocation.wait()
             
-            receipt = {
-                "status": "success",
-                "transaction_hash": invocation.transaction_hash,
-                "amount": amount,
-                "asset": asset_id,
-                "recipient": address,
-                "reason": reason,
-                "timestamp": time.time()
-            }
-            self.audit_log.append(receipt)
+            receipt = self._receipt(invocation.transaction_hash, address, amount, asset_id, reason)
             logger.info(f"REAL PAYMENT SUCCESS: {invocation.transaction_hash}")
-            
-            # Broadcast updated balance
-            await self.broadcast_balance()
-            
             return receipt
 
         except Exception as e:
@@ -190,6 +390,8 @@ class PaymentManager:
                 "data": {
                     "address": self.address,
                     "balance": float(balance),
+                    "balances": {asset: float(amount) for asset, amount in self._balances.items()},
+                    "synced_at": self.balance_synced_at,
                     "mode": self.mode
                 }
             })
@@ -0,0 +1,222 @@
+"""
+Position Book - Open positions indexed by symbol and side
+Maintains running portfolio totals so exposure checks never re-scan positions
+"""
+from typing import Dict, List, Optional, Tuple, Iterator
+from data.data_models import Position, OrderSide
+
+
+PositionKey = Tuple[str, OrderSide]
+
+
+def apply_mark(position: Position, price: float):
+    """Update a position's current price and unrealized P&L in place"""
+    position.current_price = price
+
+    if position.side == OrderSide.BUY:
+        pnl = (price - position.entry_price) * position.size
+        pnl_pct = ((price - position.entry_price) / position.entry_price) * 100
+    else:
+        pnl = (position.entry_price - price) * position.size
+        pnl_pct = ((position.entry_price - price) / position.entry_price) * 100
+
+    position.unrealized_pnl = pnl
+    position.unrealized_pnl_pct = pnl_pct * position.leverage
+
+
+class PositionBook:
+    """
+    Open positions keyed by (symbol, side) so hedged long/short positions
+    on the same symbol can coexist.
+
+    Notional, leveraged exposure and unrealized P&L are kept as running
+    totals that are adjusted on open/close/mark, making portfolio-level
+    queries O(1) regardless of how many positions are held.
+    """
+
+    def __init__(self):
+        self._positions: Dict[PositionKey, Position] = {}
+        # Per-position contributions currently included in the totals
+        self._contrib: Dict[PositionKey, Tuple[float, float, float]] = {}
+        self.total_notional = 0.0
+        self.total_exposure = 0.0  # Sum of notional * leverage
+        self.total_unrealized_pnl = 0.0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[Position]:
+        return iter(list(self._positions.values()))
+
+    def __contains__(self, key: PositionKey) -> bool:
+        return key in self._positions
+
+    def _track(self, key: PositionKey, position: Position):
+        """Add a position's contribution to the running totals"""
+        notional = position.size * position.current_price
+        contrib = (notional, notional * position.leverage, position.unrealized_pnl)
+        self._contrib[key] = contrib
+        self.total_notional += contrib[0]
+        self.total_exposure += contrib[1]
+        self.total_unrealized_pnl += contrib[2]
+
+    def _untrack(self, key: PositionKey):
+        """Remove a position's contribution from the running totals"""
+        contrib = self._contrib.pop(key, None)
+        if contrib is None:
+            return
+
+        if not self._contrib:
+            # Reset on empty book so float drift can't accumulate
+            self.total_notional = 0.0
+            self.total_exposure = 0.0
+            self.total_unrealized_pnl = 0.0
+            return
+
+        self.total_notional -= contrib[0]
+        self.total_exposure -= contrib[1]
+        self.total_unrealized_pnl -= contrib[2]
+
+    def open(self, position: Position) -> Position:
+        """
+        Add a position to the book.
+        An existing position on the same symbol and side is increased,
+        with the entry price averaged by size.
+        """
+        key = (position.symbol, position.side)
+        existing = self._positions.get(key)
+
+        if existing is None:
+            self._positions[key] = position
+            self._track(key, position)
+            return position
+
+        self._untrack(key)
+
+        total_size = existing.size + position.size
+        if total_size > 0:
+            existing.entry_price = (
+                existing.entry_price * existing.size + position.entry_price * position.size
+            ) / total_size
+        existing.size = total_size
+        existing.leverage = position.leverage
+        existing.stop_loss = position.stop_loss
+        existing.take_profit = position.take_profit
+        apply_mark(existing, position.current_price)
+
+        self._track(key, existing)
+        return existing
+
+    def get(self, symbol: str, side: Optional[OrderSide] = None) -> Optional[Position]:
+        """
+        Get the position for a symbol.
+        Without a side, the long position is preferred over the short one.
+        """
+        if side is not None:
+            return self._positions.get((symbol, side))
+
+        return (
+            self._positions.get((symbol, OrderSide.BUY))
+            or self._positions.get((symbol, OrderSide.SELL))
+        )
+
+    def close(self, symbol: str, side: Optional[OrderSide] = None) -> Optional[Position]:
+        """Remove and return a position"""
+        position = self.get(symbol, side)
+        if position is None:
+            return None
+
+        key = (symbol, position.side)
+        self._untrack(key)
+        del self._positions[key]
+        return position
+
+    def reduce(self, symbol: str, side: OrderSide, size: float) -> Optional[Position]:
+        """
+        Reduce a position by `size` (partial close).
+        The position is removed if nothing remains.
+        """
+        key = (symbol, side)
+        position = self._positions.get(key)
+        if position is None:
+            return None
+
+        if size >= position.size:
+            return self.close(symbol, side)
+
+        self._untrack(key)
+        position.size -= size
+        apply_mark(position, position.current_price)
+        self._track(key, position)
+        return position
+
+    def mark(self, symbol: str, price: float):
+        """Mark every position on a symbol to a new price"""
+        for side in (OrderSide.BUY, OrderSide.SELL):
+            key = (symbol, side)
+            position = self._positions.get(key)
+            if position is None:
+                continue
+
+            self._untrack(key)
+            apply_mark(position, price)
+            self._track(key, position)
+
+    def mark_many(self, prices: Dict[str, float]):
+        """
+        Mark all positions whose symbol has a price in `prices`.
+        P&L for every position is computed in one vectorized pass.
+        """
+        keys = [key for key in self._positions if key[0] in prices]
+        if not keys:
+            return
+
+        import numpy as np  # Deferred: keeps numpy off the startup path
+        positions = [self._positions[key] for key in keys]
+        price = np.array([prices[key[0]] for key in keys], dtype=float)
+        entry = np.array([p.entry_price for p in positions], dtype=float)
+        size = np.array([p.size for p in positions], dtype=float)
+        leverage = np.array([p.leverage for p in positions], dtype=float)
+        direction = np.array(
+            [1.0 if p.side == OrderSide.BUY else -1.0 for p in positions]
+        )
+
+        move = (price - entry) * direction
+        pnl = move * size
+        pnl_pct = np.divide(move, entry, out=np.zeros_like(move), where=entry != 0) * 100 * leverage
+
+        for i, (key, position) in enumerate(zip(keys, positions)):
+            self._untrack(key)
+            position.current_price = float(price[i])
+            position.unrealized_pnl = float(pnl[i])
+            position.unrealized_pnl_pct = float(pnl_pct[i])
+            self._track(key, position)
+
+    def symbols(self) -> List[str]:
+        """Get the distinct symbols with open positions"""
+        return list(dict.fromkeys(symbol for symbol, _ in self._positions))
+
+    def positions(self) -> List[Position]:
+        """Get all open positions"""
+        return list(self._positions.values())
+
+    @property
+    def weighted_leverage(self) -> float:
+        """Notional-weighted average leverage"""
+        if self.total_notional <= 0:
+            return 0.0
+        return self.total_exposure / self.total_notional
+
+    def exposure_pct(self, account_balance: float) -> float:
+        """Leveraged exposure as a percentage of account balance"""
+        if account_balance <= 0:
+            return 0
+        return (self.total_exposure / account_balance) * 100
+
+    def clear(self):
+        """Remove all positions"""
+        self._positions.clear()
+        self._contrib.clear()
+        self.total_notional = 0.0
+        self.total_exposure = 0.0
+        self.total_unrealized_pnl = 0.0
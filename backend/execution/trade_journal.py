@@ -0,0 +1,265 @@
+"""
+Trade Journal - Durable append-only log of trades and position changes
+SQLite in WAL mode, written by a background thread off the event loop
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    symbol TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    executed_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_by_time ON trades (executed_at, id);
+CREATE INDEX IF NOT EXISTS trades_by_symbol_time ON trades (symbol, executed_at, id);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class TradeJournal:
+    """
+    Append-only journal of order manager state changes.
+
+    Callers enqueue events and return immediately; a writer thread drains
+    the queue in batched transactions. Periodic snapshots of the full state
+    let startup load the latest snapshot and replay only the events after it.
+    Trades are also written to an indexed table for symbol / time-range
+    queries with keyset pagination.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.journal_path,
+        snapshot_every: int = settings.journal_snapshot_every
+    ):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def is_open(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def open(self):
+        """Create the schema and start the writer thread"""
+        if self.is_open:
+            return
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        row = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()
+        self._seq = row[0]
+        snap = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM snapshots").fetchone()
+        self._since_snapshot = self._seq - snap[0]
+        conn.close()
+
+        self._thread = threading.Thread(target=self._writer, name="trade-journal", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending writes and stop the writer thread"""
+        if not self.is_open:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything enqueued so far has been written"""
+        if not self.is_open:
+            return
+        done = threading.Event()
+        self._queue.put(("barrier", (done,)))
+        done.wait(timeout)
+
+    # ==================== Writing ====================
+
+    def append(self, kind: str, payload: Dict[str, Any], symbol: Optional[str] = None) -> bool:
+        """
+        Enqueue an event. Returns True when a snapshot is due.
+        Events are dropped silently if the journal was never opened.
+        """
+        if not self.is_open:
+            return False
+
+        with self._lock:
+            self._seq += 1
+            self._since_snapshot += 1
+            seq = self._seq
+
+        row = (seq, time.time(), kind, symbol, json.dumps(payload, default=str))
+        self._queue.put(("event", row))
+
+        if kind == "trade":
+            executed_at = payload.get("executed_at")
+            ts = executed_at.timestamp() if hasattr(executed_at, "timestamp") else time.time()
+            self._queue.put(("trade", (payload["id"], seq, symbol, ts, row[4])))
+
+        return self._since_snapshot >= self.snapshot_every
+
+    def snapshot(self, state: Dict[str, Any]):
+        """Enqueue a full-state snapshot covering every event appended so far"""
+        if not self.is_open:
+            return
+        with self._lock:
+            seq = self._seq
+            self._since_snapshot = 0
+        self._queue.put(("snapshot", (seq, time.time(), json.dumps(state, default=str))))
+
+    def _writer(self):
+        """Writer thread: drain the queue in batched transactions"""
+        conn = self._connect()
+        stop = False
+
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            barriers = []
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            stop = True
+                            continue
+                        op, args = item
+                        if op == "event":
+                            conn.execute(
+                                "INSERT INTO events (seq, ts, kind, symbol, payload) VALUES (?, ?, ?, ?, ?)",
+                                args
+                            )
+                        elif op == "trade":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO trades (id, seq, symbol, executed_at, payload) "
+                                "VALUES (?, ?, ?, ?, ?)",
+                                args
+                            )
+                        elif op == "snapshot":
+                            conn.execute(
+                                "INSERT OR REPLACE INTO snapshots (seq, ts, payload) VALUES (?, ?, ?)",
+                                args
+                            )
+                        elif op == "barrier":
+                            barriers.append(args[0])
+            except Exception as e:
+                print(f"Trade journal write failed ({len(batch)} items): {e}")
+
+            for done in barriers:
+                done.set()
+
+        conn.close()
+
+    # ==================== Reading ====================
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Load the latest snapshot and the events recorded after it.
+        Returns (snapshot_state or None, [(kind, payload), ...]).
+        """
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        try:
+            row = conn.execute(
+                "SELECT seq, payload FROM snapshots ORDER BY seq DESC LIMIT 1"
+            ).fetchone()
+            state = json.loads(row[1]) if row else None
+            after = row[0] if row else 0
+
+            events = [
+                (kind, json.loads(payload))
+                for kind, payload in conn.execute(
+                    "SELECT kind, payload FROM events WHERE seq > ? ORDER BY seq", (after,)
+                )
+            ]
+            return state, events
+        finally:
+            conn.close()
+
+    def query_trades(
+        self,
+        symbol: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Query trades newest-first with keyset pagination.
+        `cursor` is the opaque `next_cursor` from the previous page.
+        Returns (trades, next_cursor).
+        """
+        clauses, params = [], []
+        if symbol:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if start is not None:
+            clauses.append("executed_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("executed_at < ?")
+            params.append(end)
+        if cursor:
+            ts_str, _, trade_id = cursor.partition(":")
+            try:
+                ts = float(ts_str)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+            if not trade_id:
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+            clauses.append("(executed_at < ? OR (executed_at = ? AND id < ?))")
+            params.extend([ts, ts, trade_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT id, executed_at, payload FROM trades {where} "
+            f"ORDER BY executed_at DESC, id DESC LIMIT ?"
+        )
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        trades = [json.loads(payload) for _, _, payload in rows]
+        next_cursor = f"{rows[-1][1]!r}:{rows[-1][0]}" if len(rows) == limit else None
+        return trades, next_cursor
+
+
+# Singleton instance
+trade_journal = TradeJournal()
@@ -12,6 +12,7 @@ if sys.stdout and hasattr(sys.stdout, 'encoding') and sys.stdout.encoding and sy
 if sys.stderr and hasattr(sys.stderr, 'encoding') and sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+import asyncio
 import traceback
 import logging
 from typing import Dict
@@ -31,7 +32,12 @@ from api.zk_routes import router as zk_router
 from execution.payment_manager import payment_manager
 from execution.budget_manager import budget_manager
 from execution.bite_manager import bite_manager
-from agents.virtuals_agent import virtuals_agent
+from data.weex_client import weex_client
+from execution.order_manager import order_manager
+from execution.trade_journal import trade_journal
+from data.ai_log_queue import ai_log_queue
+from data.recorder import market_recorder
+from agents.virtuals_agent import get_virtuals_agent
 
 # Configure logging
 logging.basicConfig(
@@ -82,7 +88,7 @@ async def root():
 async def trigger_virtuals_analysis(request: Dict[str, str]):
     """Triggers an analysis via the Virtuals G.A.M.E. wrapper."""
     symbol = request.get("symbol", settings.default_symbol)
-    result = await virtuals_agent.run_analysis(symbol)
+    result = await get_virtuals_agent().run_analysis(symbol)
     return {"status": "success", "result": result}
 
 
@@ -100,6 +106,24 @@ async def startup_event():
         logger.info("Payment Manager initialized.")
         logger.info(f"Budget Manager Loaded. Total Spend: ${budget_manager.total_spend}")
         logger.info(f"BITE Manager Initialized. Pending Txs: {len(bite_manager.encrypted_pool)}")
+        
+        # Restore positions and trade history before anything can trade
+        order_manager.restore_from_journal()
+        
+        # Enforce stop-loss / take-profit levels server-side
+        order_manager.start_exit_engine()
+        logger.info("Exit engine started.")
+        
+        # Upload compliance AI logs in the background, resuming any spooled ones
+        ai_log_queue.start()
+        
+        # Record what the agents see, for replay and benchmarks
+        if settings.recorder_enabled:
+            market_recorder.start()
+        
+        # Seed leverage cache from live positions so first orders can skip set_leverage
+        if settings.weex_api_key:
+            asyncio.create_task(weex_client.refresh_leverage_cache())
     except Exception as e:
         logger.error(f"FATAL STARTUP ERROR: {e}")
         logger.error(traceback.format_exc())
@@ -108,6 +132,13 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
+    order_manager.stop_exit_engine()
+    trade_journal.close()
+    await ai_log_queue.stop()
+    budget_manager.close()
+    market_recorder.close()
+    await bite_manager.close()
+    await payment_manager.close()
     try:
         from agents.debate_engine import debate_engine
         await debate_engine.stop()
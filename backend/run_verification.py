@@ -32,7 +32,7 @@ bull_agent._call_llm = mock_call_llm
 
 # Fix: Mock Analyst Tool to avoid needing running server for this script
 # (We want to verify logic, not network stack here)
-async def mock_gather_consensus(justification):
+async def mock_gather_consensus(justification, symbol=None):
     print(f"\n[Mock Network] Gathering consensus for: {justification}")
     print("[Mock Network] Paying 3 Analysts (Total: $0.80)...")
     budget_manager.record_expense(0.80, "Analyst Swarm", "0xMockTxBatch", justification)
@@ -1,11 +1,13 @@
 """
 Risk metrics for portfolio and position management
 """
-import numpy as np
-from typing import List, Optional
+from typing import List, Optional, TYPE_CHECKING
 from data.data_models import Candle, Position
 from config.settings import settings
 
+if TYPE_CHECKING:
+    from execution.position_book import PositionBook
+
 
 class RiskMetrics:
     """Calculates risk metrics for the Risk Manager agent"""
@@ -70,6 +72,7 @@ class RiskMetrics:
         if len(returns) < 10:
             return 0.0
         
+        import numpy as np
         returns_array = np.array(returns)
         var_percentile = (1 - confidence) * 100
         var = np.percentile(returns_array, var_percentile)
@@ -110,6 +113,7 @@ class RiskMetrics:
         if len(returns) < 10:
             return 0.0
         
+        import numpy as np
         returns_array = np.array(returns)
         excess_returns = returns_array - risk_free_rate
         
@@ -131,7 +135,30 @@ class RiskMetrics:
         """
         Calculate overall portfolio risk metrics
         """
-        if not positions:
+        total_exposure = sum(
+            p.size * p.current_price * p.leverage 
+            for p in positions
+        )
+        total_notional = sum(p.size * p.current_price for p in positions)
+        
+        return self.assess_exposure(total_exposure, total_notional, account_balance)
+    
+    def calculate_book_risk(self, book: "PositionBook", account_balance: float) -> dict:
+        """
+        Calculate portfolio risk metrics from a PositionBook's running totals (O(1))
+        """
+        return self.assess_exposure(book.total_exposure, book.total_notional, account_balance)
+    
+    def assess_exposure(
+        self,
+        total_exposure: float,
+        total_notional: float,
+        account_balance: float
+    ) -> dict:
+        """
+        Classify portfolio risk from aggregate exposure and notional
+        """
+        if total_notional <= 0:
             return {
                 "total_exposure": 0,
                 "exposure_pct": 0,
@@ -139,18 +166,10 @@ class RiskMetrics:
                 "risk_level": "low"
             }
         
-        total_exposure = sum(
-            p.size * p.current_price * p.leverage 
-            for p in positions
-        )
         exposure_pct = (total_exposure / account_balance) * 100 if account_balance > 0 else 0
         
         # Weighted average leverage
-        total_notional = sum(p.size * p.current_price for p in positions)
-        weighted_leverage = sum(
-            (p.size * p.current_price / total_notional) * p.leverage 
-            for p in positions
-        ) if total_notional > 0 else 0
+        weighted_leverage = total_exposure / total_notional
         
         # Determine risk level
         if exposure_pct > 80 or weighted_leverage > 15:
@@ -1,17 +1,42 @@
 import httpx
 import logging
 import asyncio
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 from execution.payment_manager import payment_manager
 from execution.budget_manager import budget_manager
+from tools.payment_session import payment_session
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Consensus blend: Technical (30%), Sentiment (20%), On-Chain (50%)
+CONSENSUS_WEIGHTS = {
+    "technical": 0.3,
+    "sentiment": 0.2,
+    "onchain": 0.5
+}
+
+def weighted_consensus(insights: Dict[str, Dict], weights: Dict[str, float] = CONSENSUS_WEIGHTS) -> Optional[float]:
+    """
+    Blend analyst scores, renormalizing the weights over the analysts that
+    actually answered. Returns None if none did.
+    """
+    answered = {
+        name: result["score"] for name, result in insights.items()
+        if name in weights and isinstance(result, dict) and "error" not in result and "score" in result
+    }
+    total_weight = sum(weights[name] for name in answered)
+    if total_weight <= 0:
+        return None
+    return sum(score * weights[name] for name, score in answered.items()) / total_weight
+
 class AnalystNetworkTool:
     """
     Interface to the "Analyst Network".
     Manages querying multiple specialized AI agents (endpoints) and handling their payment requirements.
+    Paid results are cached per (analyst, symbol) so the debate loop doesn't re-buy identical data.
     """
     
     def __init__(self, base_url: str = f"http://localhost:8000"):
@@ -22,96 +47,297 @@ class AnalystNetworkTool:
             "onchain": "/analysts/onchain"
         }
         
-    async def query_analyst(self, analyst_type: str, justification: str) -> Dict:
+        # Result cache: how long each analyst's insight stays fresh (seconds)
+        self.cache_ttl = {
+            "technical": settings.analyst_cache_ttl_technical,
+            "sentiment": settings.analyst_cache_ttl_sentiment,
+            "onchain": settings.analyst_cache_ttl_onchain
+        }
+        self.max_stale_seconds = settings.analyst_cache_max_stale_seconds
+        self._cache: Dict[Tuple[str, str], Dict] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.cache_hits = 0
+        self.stale_hits = 0
+        self.cache_misses = 0
+        self.refreshes = 0
+        self.cost_saved = 0.0
+        
+        # Latency policy: per-analyst deadline, optional hedged duplicate GETs
+        self.deadlines = {name: settings.analyst_deadline_seconds for name in self.endpoints}
+        self.hedge_enabled = settings.analyst_hedge_enabled
+        self.hedge_percentile = settings.analyst_hedge_percentile
+        self._latencies: Dict[str, Deque[float]] = {name: deque(maxlen=50) for name in self.endpoints}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.timeouts = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        
+    async def query_analyst(self, analyst_type: str, justification: str, symbol: Optional[str] = None) -> Dict:
+        """
+        Query a specific analyst, serving from cache when possible.
+        - Fresh (age < TTL): cached result, no payment.
+        - Stale (age < TTL + max stale): cached result now, refreshed in the background.
+        - Expired / missing: bought synchronously; concurrent callers share one purchase.
+        """
+        key = (analyst_type, symbol or "*")
+        entry = self._cache.get(key)
+        ttl = self.cache_ttl.get(analyst_type, 0)
+
+        if entry is not None:
+            age = time.monotonic() - entry["fetched_at"]
+            if age < ttl:
+                self.cache_hits += 1
+                self.cost_saved += entry["cost"]
+                return entry["data"]
+            if age < ttl + self.max_stale_seconds:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._inflight[key] = asyncio.create_task(
+                        self._refresh(key, analyst_type, justification, symbol)
+                    )
+                return entry["data"]
+
+        self.cache_misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key, analyst_type, justification, symbol))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _refresh(
+        self,
+        key: Tuple[str, str],
+        analyst_type: str,
+        justification: str,
+        symbol: Optional[str]
+    ) -> Dict:
+        """Buy a fresh result and cache it if successful"""
+        try:
+            data, cost = await self._fetch_analyst(analyst_type, justification, symbol)
+            if "error" not in data:
+                self._cache[key] = {"data": data, "cost": cost, "fetched_at": time.monotonic()}
+                self.refreshes += 1
+            return data
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate_cache(self, analyst_type: Optional[str] = None, symbol: Optional[str] = None):
+        """Drop cached results, optionally only for one analyst and/or symbol"""
+        for key in list(self._cache):
+            if (analyst_type is None or key[0] == analyst_type) and (symbol is None or key[1] == symbol):
+                del self._cache[key]
+
+    def get_stats(self) -> Dict:
+        """Get analyst cache and latency statistics"""
+        return {
+            "cached_results": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "stale_hits": self.stale_hits,
+            "cache_misses": self.cache_misses,
+            "refreshes": self.refreshes,
+            "cost_saved": round(self.cost_saved, 4),
+            "timeouts": self.timeouts,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "latency_ms": {
+                name: self._percentile(name, 0.5) * 1000 if self._latencies[name] else None
+                for name in self._latencies
+            }
+        }
+
+    # ==================== Transport ====================
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled client for all analyst requests"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.analyst_deadline_seconds, connect=2.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _percentile(self, analyst_type: str, q: float) -> float:
+        samples = sorted(self._latencies[analyst_type])
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+    async def _hedged_get(
+        self,
+        client: httpx.AsyncClient,
+        analyst_type: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        GET with an optional hedge: if the first attempt hasn't answered by the
+        analyst's observed latency percentile, send a duplicate and take
+        whichever finishes first. Only used for requests that can't double-charge.
+        """
+        async def timed_get():
+            start = time.monotonic()
+            resp = await client.get(url, headers=headers)
+            self._latencies[analyst_type].append(time.monotonic() - start)
+            return resp
+
+        samples = self._latencies.get(analyst_type)
+        if not self.hedge_enabled or samples is None or len(samples) < 10:
+            return await timed_get()
+
+        primary = asyncio.create_task(timed_get())
+        done, _ = await asyncio.wait({primary}, timeout=self._percentile(analyst_type, self.hedge_percentile))
+        if done:
+            return primary.result()
+
+        self.hedges_sent += 1
+        hedge = asyncio.create_task(timed_get())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch_analyst(
+        self,
+        analyst_type: str,
+        justification: str,
+        symbol: Optional[str] = None
+    ) -> Tuple[Dict, float]:
         """
         Query a specific analyst. Handles 402 loop.
+        Funds are reserved before paying so parallel queries can't overshoot the budget.
+        Returns (result, amount paid).
         """
         endpoint = self.endpoints.get(analyst_type)
         if not endpoint:
-            return {"error": f"Unknown analyst type: {analyst_type}"}
+            return {"error": f"Unknown analyst type: {analyst_type}"}, 0.0
             
         url = f"{self.base_url}{endpoint}"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                # 1. Try Request
-                resp = await client.get(url)
+        client = self._get_client()
+        try:
+            # 0. Prepaid session: one round-trip, no on-chain wait
+            if settings.payment_sessions_enabled:
+                try:
+                    session_resp = await payment_session.get(client, url, justification, symbol)
+                    if session_resp is not None and session_resp.status_code == 200:
+                        charged = float(session_resp.headers.get("X-Session-Charged", 0.0))
+                        return session_resp.json(), charged
+                except Exception as e:
+                    logger.warning(f"Payment session unavailable: {e}")
+            
+            # 1. Try Request (unpaid probe; safe to hedge)
+            resp = await self._hedged_get(client, analyst_type, url)
+            
+            if resp.status_code == 200:
+                return resp.json(), 0.0
+            
+            if resp.status_code == 402:
+                logger.info(f"Analyst {analyst_type} requires payment. Negotiating...")
                 
-                if resp.status_code == 200:
-                    return resp.json()
+                # Parse Payment Request
+                address = resp.headers.get("X-Payment-Address")
+                amount = float(resp.headers.get("X-Payment-Amount", 0.0))
+                asset = resp.headers.get("X-Payment-Asset", "usdc")
                 
-                if resp.status_code == 402:
-                    logger.info(f"Analyst {analyst_type} requires payment. Negotiating...")
-                    
-                    # Parse Payment Request
-                    address = resp.headers.get("X-Payment-Address")
-                    amount = float(resp.headers.get("X-Payment-Amount", 0.0))
-                    asset = resp.headers.get("X-Payment-Asset", "usdc")
+                if not address or amount == 0:
+                    return {"error": "Invalid 402 response"}, 0.0
                     
-                    if not address or amount == 0:
-                        return {"error": "Invalid 402 response"}
-                        
-                    if not budget_manager.authorize_expense(amount, f"Analyst: {analyst_type}", justification):
-                         return {"error": "Budget exceeded"}
-                         
-                    # Broadcast Payment Intent
+                reservation_id = budget_manager.reserve(
+                    amount, f"Analyst: {analyst_type}", justification, symbol=symbol
+                )
+                if not reservation_id:
+                     return {"error": "Budget exceeded"}, 0.0
+                     
+                # Broadcast Payment Intent
+                from api.websocket import connection_manager
+                asyncio.create_task(connection_manager.broadcast_status({
+                    "type": "payment_update",
+                    "data": {
+                        "analyst": analyst_type,
+                        "amount": amount,
+                        "tx_hash": "pending..."
+                    }
+                }))
+
+                # Pay
+                try:
+                    receipt = await payment_manager.pay(address, amount, asset)
+                except Exception:
+                    budget_manager.release(reservation_id)
+                    raise
+                
+                if receipt.get("status") != "success":
+                    budget_manager.release(reservation_id)
+                    return {"error": f"Payment failed: {receipt.get('error', 'unknown')}"}, 0.0
+                
+                # Log Expense
+                budget_manager.commit(reservation_id, receipt["transaction_hash"])
+                
+                # Retry with Token (Mock Proof)
+                # Already paid, so a hedged duplicate costs nothing extra
+                retry_resp = await self._hedged_get(
+                    client,
+                    analyst_type,
+                    url,
+                    headers={"X-Payment-Token": "valid_token_123"}
+                )
+                
+                if retry_resp.status_code == 200:
+                    data = retry_resp.json()
+                    # Broadcast Result
                     from api.websocket import connection_manager
                     asyncio.create_task(connection_manager.broadcast_status({
-                        "type": "payment_update",
+                        "type": "analyst_result",
                         "data": {
-                            "analyst": analyst_type,
-                            "amount": amount,
-                            "tx_hash": "pending..."
+                            "type": analyst_type,
+                            "data": data
                         }
                     }))
-
-                    # Pay
-                    # Pay
-                    receipt = await payment_manager.pay(address, amount, asset)
+                    return data, amount
+                else:
+                    return {"error": f"Failed after payment: {retry_resp.status_code}"}, 0.0
                     
-                    # Log Expense
-                    budget_manager.record_expense(
-                        amount, 
-                        f"Analyst: {analyst_type}", 
-                        receipt["transaction_hash"],
-                        justification
-                    )
-                    
-                    # Retry with Token (Mock Proof)
-                    retry_resp = await client.get(
-                        url,
-                        headers={"X-Payment-Token": "valid_token_123"} 
-                    )
-                    
-                    if retry_resp.status_code == 200:
-                        data = retry_resp.json()
-                        # Broadcast Result
-                        from api.websocket import connection_manager
-                        asyncio.create_task(connection_manager.broadcast_status({
-                            "type": "analyst_result",
-                            "data": {
-                                "type": analyst_type,
-                                "data": data
-                            }
-                        }))
-                        return data
-                    else:
-                        return {"error": f"Failed after payment: {retry_resp.status_code}"}
-                        
-            except Exception as e:
-                logger.error(f"Error querying {analyst_type}: {e}")
-                return {"error": str(e)}
-
-    async def gather_consensus(self, justification: str) -> Dict[str, Dict]:
+        except Exception as e:
+            logger.error(f"Error querying {analyst_type}: {e}")
+            return {"error": str(e)}, 0.0
+
+    async def _query_with_deadline(self, analyst_type: str, justification: str, symbol: Optional[str]) -> Dict:
+        """Query an analyst, giving up after its deadline (a purchase in flight still lands in the cache)"""
+        try:
+            return await asyncio.wait_for(
+                self.query_analyst(analyst_type, justification, symbol),
+                timeout=self.deadlines.get(analyst_type, settings.analyst_deadline_seconds)
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Analyst {analyst_type} missed its deadline")
+            return {"error": "timeout"}
+
+    async def gather_consensus(self, justification: str, symbol: Optional[str] = None) -> Dict[str, Dict]:
         """
         Query ALL analysts in parallel and return results.
+        Analysts that miss their deadline come back as {"error": "timeout"};
+        use `weighted_consensus` to blend whichever ones answered.
         """
         logger.info("Gathering consensus from Analyst Network...")
         
         tasks = [
-            self.query_analyst("technical", justification),
-            self.query_analyst("sentiment", justification),
-            self.query_analyst("onchain", justification)
+            self._query_with_deadline("technical", justification, symbol),
+            self._query_with_deadline("sentiment", justification, symbol),
+            self._query_with_deadline("onchain", justification, symbol)
         ]
         
         results = await asyncio.gather(*tasks)
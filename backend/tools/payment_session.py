@@ -0,0 +1,134 @@
+import httpx
+import logging
+import asyncio
+from typing import Dict, Optional
+from execution.payment_manager import payment_manager
+from execution.budget_manager import budget_manager
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class PaymentSession:
+    """
+    Client side of the x402 prepaid session flow.
+    Pays a deposit once (402 -> pay -> proof), keeps the returned session token
+    and attaches it to later requests, so steady-state paid queries are a single
+    round-trip with no on-chain wait. The deposit is what goes through the
+    budget; per-query charges are drawn from the prepaid balance.
+    """
+
+    def __init__(self, session_url: str, topup_amount: float = settings.payment_session_topup):
+        self.session_url = session_url
+        self.topup_amount = topup_amount
+        self.token: Optional[str] = None
+        self.balance = 0.0
+        self._lock = asyncio.Lock()
+        self.sessions_opened = 0
+        self.requests_served = 0
+
+    async def _open(self, client: httpx.AsyncClient, justification: str, symbol: Optional[str]) -> bool:
+        """Pay the deposit and obtain a session token"""
+        resp = await client.post(self.session_url, json={"amount": self.topup_amount})
+        if resp.status_code != 402:
+            logger.warning(f"Session endpoint answered {resp.status_code}, expected 402")
+            return False
+
+        address = resp.headers.get("X-Payment-Address")
+        amount = float(resp.headers.get("X-Payment-Amount", 0.0))
+        asset = resp.headers.get("X-Payment-Asset", "usdc")
+        quote_id = resp.headers.get("X-Payment-Quote")
+        if not address or amount == 0 or not quote_id:
+            return False
+
+        reservation_id = budget_manager.reserve(amount, "Payment Session", justification, symbol=symbol)
+        if not reservation_id:
+            logger.warning("Budget exceeded. Cannot open payment session.")
+            return False
+
+        try:
+            receipt = await payment_manager.pay(address, amount, asset)
+        except Exception:
+            budget_manager.release(reservation_id)
+            raise
+        if receipt.get("status") != "success":
+            budget_manager.release(reservation_id)
+            logger.warning(f"Session deposit payment failed: {receipt.get('error', 'unknown')}")
+            return False
+        budget_manager.commit(reservation_id, receipt["transaction_hash"])
+
+        resp = await client.post(
+            self.session_url,
+            json={"amount": amount},
+            headers={"X-Payment-Token": receipt["transaction_hash"], "X-Payment-Quote": quote_id}
+        )
+        if resp.status_code != 200:
+            logger.error(f"Paid session deposit but session was not opened: {resp.status_code}")
+            return False
+
+        data = resp.json()
+        self.token = data["session_token"]
+        self.balance = float(data.get("balance", amount))
+        self.sessions_opened += 1
+        logger.info(f"Payment session opened with {self.balance} {asset}")
+        return True
+
+    async def _ensure(
+        self,
+        client: httpx.AsyncClient,
+        justification: str,
+        symbol: Optional[str],
+        stale: Optional[str] = None
+    ) -> Optional[str]:
+        async with self._lock:
+            # Another caller may have topped up while we waited
+            if self.token and self.token != stale and self.balance > 0:
+                return self.token
+            self.token = None
+            if await self._open(client, justification, symbol):
+                return self.token
+            return None
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        justification: str,
+        symbol: Optional[str] = None
+    ) -> Optional[httpx.Response]:
+        """
+        GET a paid resource using the session, topping up once if the balance runs out.
+        Returns None when no session could be used (caller should fall back to per-request payment).
+        """
+        token = self.token if self.token and self.balance > 0 else None
+        if token is None:
+            token = await self._ensure(client, justification, symbol)
+
+        for attempt in range(2):
+            if token is None:
+                return None
+
+            resp = await client.get(url, headers={"X-Session-Token": token})
+            if "X-Session-Balance" in resp.headers:
+                self.balance = float(resp.headers["X-Session-Balance"])
+
+            if resp.status_code == 200:
+                self.requests_served += 1
+                return resp
+            if resp.status_code != 402 or "X-Session-Balance" not in resp.headers:
+                # Endpoint doesn't support sessions
+                return None if resp.status_code == 402 else resp
+            if attempt == 0:
+                token = await self._ensure(client, justification, symbol, stale=token)
+
+        return None
+
+    def get_stats(self) -> Dict:
+        return {
+            "active": self.token is not None,
+            "balance": self.balance,
+            "sessions_opened": self.sessions_opened,
+            "requests_served": self.requests_served
+        }
+
+# Singleton - shared by the analyst network and premium data tools
+payment_session = PaymentSession("http://localhost:8000/analysts/session")
@@ -4,6 +4,7 @@ import asyncio
 from typing import Dict, Optional
 from execution.payment_manager import payment_manager
 from execution.budget_manager import budget_manager
+from tools.payment_session import payment_session
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -16,9 +17,9 @@ class PremiumMarketInsightTool:
     
     def __init__(self, base_url: str = f"http://localhost:8000"):
         self.base_url = base_url
-        self.endpoint = "/premium/sentiment"
+        self.endpoint = "/analysts/sentiment"  # Served by api/paid_service.py
         
-    async def get_sentiment(self, justification: str = "Market analysis required") -> Dict:
+    async def get_sentiment(self, justification: str = "Market analysis required", symbol: Optional[str] = None) -> Dict:
         """
         Fetch premium sentiment. detailed flow:
         1. Try to fetch (expecting 402).
@@ -28,6 +29,17 @@ class PremiumMarketInsightTool:
         5. Retry with proof.
         """
         async with httpx.AsyncClient() as client:
+            # Prepaid session first; falls back to the per-request 402 flow
+            if settings.payment_sessions_enabled:
+                try:
+                    session_resp = await payment_session.get(
+                        client, f"{self.base_url}{self.endpoint}", justification, symbol
+                    )
+                    if session_resp is not None and session_resp.status_code == 200:
+                        return session_resp.json()
+                except Exception as e:
+                    logger.warning(f"Payment session unavailable: {e}")
+                    
             resp = await client.get(f"{self.base_url}{self.endpoint}")
             
             if resp.status_code == 200:
@@ -45,20 +57,19 @@ class PremiumMarketInsightTool:
                     return {"error": "Invalid 402 response: Missing address"}
                     
                 # Budget Check
-                if not budget_manager.authorize_expense(amount, "Premium Sentiment", justification):
+                reservation_id = budget_manager.reserve(amount, "Premium Sentiment", justification, symbol=symbol)
+                if not reservation_id:
                     return {"error": "Budget exceeded. Cannot purchase data."}
                     
                 # Pay
                 try:
                     receipt = await payment_manager.pay(address, amount, asset)
+                    if receipt.get("status") != "success":
+                        budget_manager.release(reservation_id)
+                        return {"error": f"Payment failed: {receipt.get('error', 'unknown')}"}
                     
                     # Record expense
-                    budget_manager.record_expense(
-                        amount, 
-                        "Premium Sentiment", 
-                        receipt["transaction_hash"],
-                        justification
-                    )
+                    budget_manager.commit(reservation_id, receipt["transaction_hash"])
                     
                     # Retry with "Proof" (simulated via token or just retrying if service tracks IP/mock)
                     # For this hackathon demo, we will pass a "X-Payment-Token: valid_token_123" header 
@@ -76,6 +87,8 @@ class PremiumMarketInsightTool:
                          return {"error": f"Failed after payment: {retry_resp.status_code}"}
                          
                 except Exception as e:
+                    # No-op if the expense was already committed
+                    budget_manager.release(reservation_id)
                     logger.error(f"Payment failed: {e}")
                     return {"error": f"Payment failed: {str(e)}"}
             
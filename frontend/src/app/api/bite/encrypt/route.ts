@@ -5,10 +5,81 @@ const BITE_SANDBOX_RPC = 'https://base-sepolia-testnet.skalenodes.com/v1/bite-v2
 const BITE_CHAIN_ID = 103698795;
 const BITE_CONTRACT = '0xc4083B1E81ceb461Ccef3FDa8A9F24F0d764B6D8';
 
+// Encrypt one intent and (if funded) submit it on-chain
+async function encryptIntent(bite: any, wallet: any, committeeInfo: any, intent: any, condition: string) {
+    // 2. Encrypt the intent
+    const intentJson = JSON.stringify(intent);
+    const intentHex = '0x' + Buffer.from(intentJson).toString('hex');
+    const encryptedMessage = await bite.encryptMessage(intentHex);
+
+    console.log(`BITE: Encrypting intent on Chain ${BITE_CHAIN_ID}...`);
+
+    // 3. Create and sign the BITE transaction
+    // The BITE SDK's encryptTransaction creates a tx object with:
+    // to: BITE_MAGIC_ADDRESS (0x23...), data: [epoch + encrypted blob]
+    const txInternal = {
+        to: BITE_CONTRACT,
+        data: intentHex,
+    };
+
+    let encryptedTx: any = null;
+    let txHash: string | null = null;
+    let explorerUrl: string | null = null;
+
+    try {
+        // Encrypts the tx payload (to + data) into the BITE format
+        encryptedTx = await bite.encryptTransaction(txInternal);
+        console.log('BITE: Transaction encrypted successfully');
+
+        // Send the encrypted transaction on-chain!
+        // On SKALE, this is gasless (if sFUEL is provided by faucet/POW), but here we assume user has sFUEL
+        const txResponse = await wallet.sendTransaction({
+            to: encryptedTx.to,
+            data: encryptedTx.data,
+            // SKALE BITE often needs manual gas limit adjustment
+            gasLimit: 6000000,
+        });
+
+        console.log(`BITE: Transaction sent! Hash: ${txResponse.hash}`);
+        txHash = txResponse.hash;
+        explorerUrl = `https://base-sepolia-testnet-explorer.skalenodes.com/tx/${txHash}`;
+
+    } catch (e: any) {
+        console.error('BITE: Transaction submission failed:', e.message);
+        // Fallback: return encrypted data without on-chain execution for UI demo if funds missing
+        if (e.message.includes('insufficient funds')) {
+            console.warn('BITE: Insufficient sFUEL. Returning encrypted data only.');
+        } else {
+            throw e;
+        }
+    }
+
+    // Build the BITE receipt
+    return {
+        status: txHash ? 'on_chain' : 'encrypted_only',
+        sdk: '@skalenetwork/bite',
+        chain: 'BITE V2 Sandbox 2',
+        chainId: BITE_CHAIN_ID,
+        rpc: BITE_SANDBOX_RPC,
+        biteContract: BITE_CONTRACT,
+        bite_tx_id: txHash || `bite_${Date.now()}`,
+        explorerUrl,
+        encryptedMessage: encryptedMessage.substring(0, 200) + '...',
+        encryptedMessageLength: encryptedMessage.length,
+        committee: committeeInfo ? {
+            epochId: committeeInfo[0]?.epochId,
+            publicKeyPreview: committeeInfo[0]?.commonBLSPublicKey?.substring(0, 40) + '...',
+            rotationActive: committeeInfo.length > 1,
+        } : null,
+        condition,
+        timestamp: new Date().toISOString(),
+    };
+}
+
+// POST: { intent, condition } -> receipt, or { intents: [{ intent, condition }] } -> { results: [...] }
 export async function POST(req: Request) {
     try {
         const body = await req.json();
-        const { intent, condition } = body;
 
         // Dynamically import dependencies
         const { BITE } = await import('@skalenetwork/bite');
@@ -25,7 +96,7 @@ export async function POST(req: Request) {
         const wallet = new ethers.Wallet(privateKey, provider);
         const bite = new BITE(BITE_SANDBOX_RPC);
 
-        // 1. Get committee info
+        // 1. Get committee info (once per request, shared by a batch)
         let committeeInfo: any = null;
         try {
             committeeInfo = await bite.getCommitteesInfo();
@@ -33,74 +104,21 @@ export async function POST(req: Request) {
             console.warn('BITE: Could not fetch committee info:', e.message);
         }
 
-        // 2. Encrypt the intent
-        const intentJson = JSON.stringify(intent);
-        const intentHex = '0x' + Buffer.from(intentJson).toString('hex');
-        const encryptedMessage = await bite.encryptMessage(intentHex);
-
-        console.log(`BITE: Encrypting intent on Chain ${BITE_CHAIN_ID}...`);
-
-        // 3. Create and sign the BITE transaction
-        // The BITE SDK's encryptTransaction creates a tx object with:
-        // to: BITE_MAGIC_ADDRESS (0x23...), data: [epoch + encrypted blob]
-        const txInternal = {
-            to: BITE_CONTRACT,
-            data: intentHex,
-        };
-
-        let encryptedTx: any = null;
-        let txHash: string | null = null;
-        let explorerUrl: string | null = null;
-
-        try {
-            // Encrypts the tx payload (to + data) into the BITE format
-            encryptedTx = await bite.encryptTransaction(txInternal);
-            console.log('BITE: Transaction encrypted successfully');
-
-            // Send the encrypted transaction on-chain!
-            // On SKALE, this is gasless (if sFUEL is provided by faucet/POW), but here we assume user has sFUEL
-            const txResponse = await wallet.sendTransaction({
-                to: encryptedTx.to,
-                data: encryptedTx.data,
-                // SKALE BITE often needs manual gas limit adjustment
-                gasLimit: 6000000,
-            });
-
-            console.log(`BITE: Transaction sent! Hash: ${txResponse.hash}`);
-            txHash = txResponse.hash;
-            explorerUrl = `https://base-sepolia-testnet-explorer.skalenodes.com/tx/${txHash}`;
-
-        } catch (e: any) {
-            console.error('BITE: Transaction submission failed:', e.message);
-            // Fallback: return encrypted data without on-chain execution for UI demo if funds missing
-            if (e.message.includes('insufficient funds')) {
-                console.warn('BITE: Insufficient sFUEL. Returning encrypted data only.');
-            } else {
-                throw e;
+        if (Array.isArray(body.intents)) {
+            // Sequential so the wallet's nonces stay in order
+            const results = [];
+            for (const item of body.intents) {
+                try {
+                    results.push(await encryptIntent(bite, wallet, committeeInfo, item.intent, item.condition));
+                } catch (e: any) {
+                    results.push({ status: 'error', message: e.message, condition: item.condition });
+                }
             }
+            return NextResponse.json({ results });
         }
 
-        // Build the BITE receipt
-        const biteReceipt = {
-            status: txHash ? 'on_chain' : 'encrypted_only',
-            sdk: '@skalenetwork/bite',
-            chain: 'BITE V2 Sandbox 2',
-            chainId: BITE_CHAIN_ID,
-            rpc: BITE_SANDBOX_RPC,
-            biteContract: BITE_CONTRACT,
-            bite_tx_id: txHash || `bite_${Date.now()}`,
-            explorerUrl,
-            encryptedMessage: encryptedMessage.substring(0, 200) + '...',
-            encryptedMessageLength: encryptedMessage.length,
-            committee: committeeInfo ? {
-                epochId: committeeInfo[0]?.epochId,
-                publicKeyPreview: committeeInfo[0]?.commonBLSPublicKey?.substring(0, 40) + '...',
-                rotationActive: committeeInfo.length > 1,
-            } : null,
-            condition,
-            timestamp: new Date().toISOString(),
-        };
-
+        const { intent, condition } = body;
+        const biteReceipt = await encryptIntent(bite, wallet, committeeInfo, intent, condition);
         return NextResponse.json(biteReceipt);
 
     } catch (error: any) {
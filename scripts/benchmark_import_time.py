@@ -0,0 +1,114 @@
+"""
+Import-time benchmark for the backend entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter from
+backend/, reports wall time and the slowest imports, and fails if any entry
+point goes over its budget. Run from the repo root:
+
+    python scripts/benchmark_import_time.py
+    python scripts/benchmark_import_time.py --budget-ms 800 --top 25 --repeat 5
+    python scripts/benchmark_import_time.py --module main --budget-ms 1000
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+# Entry point -> default budget (ms)
+ENTRY_POINTS = {
+    "main": 1000,
+    "api.index": 300,
+}
+
+# Modules that should never load at import time
+DEFERRED = ["boto3", "botocore", "pandas", "numpy", "websockets"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(module: str):
+    """Import `module` in a fresh interpreter. Returns (wall_ms, [(self_us, cumulative_us, depth, name)])."""
+    code = (
+        "import time, sys; t = time.perf_counter(); "
+        f"import {module}; "
+        "sys.stdout.write(str((time.perf_counter() - t) * 1000))"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        tail = "\n".join(errors[-15:])
+        raise RuntimeError(f"import {module} failed:\n{tail}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return float(proc.stdout.strip() or 0), rows
+
+
+def report(module: str, budget_ms: float, repeat: int, top: int) -> bool:
+    walls = []
+    rows = []
+    for _ in range(repeat):
+        wall, rows = run_once(module)
+        walls.append(wall)
+    wall_ms = statistics.median(walls)
+
+    loaded = {name for _, _, _, name in rows}
+    leaked = [name for name in DEFERRED if name in loaded]
+    ok = wall_ms <= budget_ms and not leaked
+
+    print("=" * 60)
+    print(f"  import {module}")
+    print("=" * 60)
+    print(f"  Wall time  : {wall_ms:.0f} ms (median of {repeat}, budget {budget_ms:.0f} ms)")
+    print(f"  Modules    : {len(rows)}")
+    if leaked:
+        print(f"  Eager heavy imports: {', '.join(leaked)}")
+
+    # Slowest imports, nested ones indented under their importer
+    print(f"\n  Top {top} by cumulative time:")
+    print(f"  {'cumulative':>12} {'self':>10}  module")
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {'  ' * depth}{name}")
+
+    print(f"\n  {'PASS' if ok else 'FAIL'}\n")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import-time benchmark")
+    parser.add_argument("--module", choices=list(ENTRY_POINTS), help="Only benchmark one entry point")
+    parser.add_argument("--budget-ms", type=float, help="Override the budget for every entry point")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreter runs per entry point")
+    parser.add_argument("--top", type=int, default=15, help="How many slow imports to list")
+    args = parser.parse_args()
+
+    modules = [args.module] if args.module else list(ENTRY_POINTS)
+    results = []
+    for module in modules:
+        budget = args.budget_ms if args.budget_ms is not None else ENTRY_POINTS[module]
+        try:
+            results.append(report(module, budget, args.repeat, args.top))
+        except RuntimeError as e:
+            print(e)
+            results.append(False)
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()